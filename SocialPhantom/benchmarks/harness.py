@@ -0,0 +1,97 @@
+"""Timing, result files and baseline comparison for the benchmark suite"""
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+# name -> (setup function, description); filled in by @benchmark
+BENCHMARKS = {}
+
+
+def benchmark(name: str, description: str):
+    """Register a benchmark
+
+    The decorated function receives a scratch directory and returns a callable
+    that performs one round and returns the number of operations it completed.
+    Setup done before returning is not timed. A generator function may yield the
+    callable instead and clean up after the yield.
+    """
+    def register(setup: Callable):
+        BENCHMARKS[name] = (setup, description)
+        return setup
+    return register
+
+
+def time_rounds(round_fn: Callable[[], int], repeat: int, warmup: int = 1) -> Dict:
+    """Run round_fn warmup + repeat times and summarise throughput of the timed rounds"""
+    for _ in range(warmup):
+        round_fn()
+    rates, seconds = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ops = round_fn()
+        elapsed = time.perf_counter() - started
+        seconds.append(elapsed)
+        rates.append(ops / elapsed if elapsed else 0.0)
+    return {
+        'ops_per_round': ops,
+        'rounds': repeat,
+        'ops_per_sec': round(statistics.median(rates), 1),
+        'best_ops_per_sec': round(max(rates), 1),
+        'median_round_ms': round(statistics.median(seconds) * 1000, 3),
+    }
+
+
+def run_benchmarks(names: Optional[Iterable[str]] = None, repeat: int = 5) -> Dict:
+    """Run the selected benchmarks (all by default) and return a result document"""
+    results = {}
+    for name in names or BENCHMARKS:
+        setup, description = BENCHMARKS[name]
+        with tempfile.TemporaryDirectory(prefix=f"socialphantom-bench-{name}-") as workdir:
+            prepared = setup(Path(workdir))
+            if hasattr(prepared, '__next__'):
+                round_fn = next(prepared)
+                try:
+                    results[name] = time_rounds(round_fn, repeat)
+                finally:
+                    next(prepared, None)
+            else:
+                results[name] = time_rounds(prepared, repeat)
+        results[name]['description'] = description
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.2) -> List[Dict]:
+    """Benchmarks whose median throughput fell more than threshold below the baseline"""
+    regressions = []
+    for name, result in current['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or not reference.get('ops_per_sec'):
+            continue
+        change = result['ops_per_sec'] / reference['ops_per_sec'] - 1
+        if change < -threshold:
+            regressions.append({'name': name, 'baseline': reference['ops_per_sec'],
+                                'current': result['ops_per_sec'], 'change': round(change, 3)})
+    return regressions
+
+
+def save_results(results: Dict, path: Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: Path) -> Dict:
+    with open(path) as f:
+        return json.load(f)
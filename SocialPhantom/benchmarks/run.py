@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Run the benchmark suite and check it against a stored baseline
+
+    python -m benchmarks.run --save-baseline             # record benchmarks/baseline.json
+    python -m benchmarks.run --threshold 0.2             # compare, exit 1 on a regression
+    python -m benchmarks.run --only mime_build tracking_pixel --repeat 10
+
+Results are written as JSON (benchmarks/results/latest.json by default, not tracked by
+git). A benchmark regresses when its median ops/sec falls more than --threshold below the
+baseline. No baseline is shipped because they are machine-specific; without one the
+comparison is skipped and the run exits 0.
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from benchmarks import suite  # noqa: F401 (registers the benchmarks)
+from benchmarks.harness import BENCHMARKS, compare, load_results, run_benchmarks, save_results
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SocialPhantom hot-path benchmarks")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument('--output', default=str(BENCH_DIR / 'results' / 'latest.json'))
+    parser.add_argument('--baseline', default=str(BENCH_DIR / 'baseline.json'))
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed fractional drop in ops/sec before a benchmark counts as regressed")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--list', action='store_true', help="List the benchmarks and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.list:
+        for name, (_, description) in BENCHMARKS.items():
+            print(f"{name:<20} {description}")
+        return 0
+
+    results = run_benchmarks(args.only, args.repeat)
+    for name, result in results['results'].items():
+        print(f"{name:<20} {result['ops_per_sec']:>12,.1f} ops/s  (median round {result['median_round_ms']} ms)")
+    save_results(results, Path(args.output))
+
+    if args.save_baseline:
+        save_results(results, Path(args.baseline))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not Path(args.baseline).exists():
+        print(f"Regression check skipped: no baseline at {args.baseline}. "
+              f"Record one on this machine with --save-baseline, or pass --baseline PATH")
+        return 0
+
+    regressions = compare(results, load_results(Path(args.baseline)), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: {regression['current']:,.1f} ops/s vs "
+              f"{regression['baseline']:,.1f} baseline ({regression['change']:+.1%})")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} of the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
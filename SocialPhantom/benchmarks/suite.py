@@ -0,0 +1,233 @@
+"""Benchmarks for the hot paths: rendering, MIME, queueing, stats, tracking and cloning
+
+Each benchmark works in its own scratch directory and talks only to servers it
+starts on 127.0.0.1, so results do not depend on the network.
+"""
+import os
+import json
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.harness import benchmark
+
+TEMPLATE = ("<html><body><p>Dear {{name}},</p>"
+            + "".join(f"<p>Section {i}: {{{{field{i % 8}}}}} for {{{{department}}}}.</p>" for i in range(40))
+            + '<a href="{{verification_link}}">Verify</a></body></html>')
+
+VARIABLES = dict({f"field{i}": f"value {i}" for i in range(8)}, name="Alex Doe", department="Finance",
+                 verification_link="https://portal.example.com/verify?r=abc123")
+
+
+def write_email_config(directory: Path) -> Path:
+    """Email config that never needs to reach a relay"""
+    path = directory / "email_config.json"
+    path.write_text(json.dumps({
+        "smtp_server": "127.0.0.1", "smtp_port": 2525, "smtp_ssl": False,
+        "username": "bench@example.com", "password": "bench",
+        "sender_email": "no-reply@example.com", "sender_name": "Benchmark",
+        "subject": "Benchmark", "pool_size": 1
+    }))
+    return path
+
+
+@benchmark("template_render", "Cached template lookup and render, per message")
+def template_render(workdir: Path):
+    from modules.template_engine import template_cache
+    path = workdir / "template.html"
+    path.write_text(TEMPLATE)
+
+    def run():
+        for _ in range(2000):
+            template_cache.get(path).render(VARIABLES)
+        return 2000
+    return run
+
+
+@benchmark("mime_build", "EmailSender.build_message plus serialisation, per message")
+def mime_build(workdir: Path):
+    from modules.email_sender import BaseEmailSender
+    path = workdir / "template.html"
+    path.write_text(TEMPLATE)
+    sender = BaseEmailSender(str(write_email_config(workdir)))
+
+    def run():
+        for i in range(500):
+            sender.build_message(str(path), f"user{i}@example.com", "bench", VARIABLES).as_bytes()
+        return 500
+    return run
+
+
+@benchmark("queue_throughput", "PersistentSendQueue enqueue, claim and acknowledge, per recipient")
+def queue_throughput(workdir: Path):
+    from modules.send_queue import PersistentSendQueue
+    rounds = iter(range(1000000))
+
+    def run():
+        queue = PersistentSendQueue(workdir / f"queue{next(rounds)}.db")
+        queue.enqueue({"email": f"user{i}@example.com", "name": f"User {i}"} for i in range(5000))
+        while True:
+            items = queue.claim()
+            if not items:
+                break
+            for item in items:
+                queue.mark_sent(item.id)
+        queue.close()
+        return 5000
+    return run
+
+
+@benchmark("process_event", "CampaignManager._process_event stats, event log and aggregates, per event")
+def process_event(workdir: Path):
+    from core.campaign_manager import CampaignManager
+    manager = CampaignManager(str(workdir / "campaigns"), email_config=str(write_email_config(workdir)))
+    manager.create_campaign("bench", "PHISHING")
+    events = []
+    for i in range(5000):
+        events.append({"campaign": "bench", "type": "email_sent", "timestamp": 1700000000.0 + i,
+                       "target": {"email": f"user{i}@example.com", "department": f"dept{i % 25}"}})
+        events.extend({"campaign": "bench", "type": event_type, "recipient": f"user{i}@example.com",
+                       "timestamp": 1700000600.0 + i} for event_type in ("open", "click", "credential"))
+
+    def run():
+        for event in events:
+            manager._process_event(event)
+        manager.stats_writer.flush()
+        manager.event_log.flush()
+        manager.aggregates.flush()
+        return len(events)
+    yield run
+    manager.shutdown()
+
+
+@benchmark("tracking_pixel", "Tracking pixel requests over one keep-alive connection, per request")
+def tracking_pixel(workdir: Path):
+    from modules.tracking_server import TrackingServer
+    from modules.tracking_store import TrackingStore
+    store = TrackingStore(str(workdir / "tracking.log"))
+    tokens = [store.register(f"user{i}@example.com") for i in range(1000)]
+    server = TrackingServer(store, port=0, host="127.0.0.1")
+    server.start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+
+    def run():
+        for token in tokens:
+            conn.request("GET", f"/track/{token}")
+            conn.getresponse().read()
+        return len(tokens)
+    yield run
+    conn.close()
+    server.stop()
+    store.close()
+
+
+@benchmark("web_server_capture", "web_server /capture submissions via the Flask test client, per request")
+def web_server_capture(workdir: Path):
+    # web_server opens its submission log relative to the working directory on import
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from core import web_server
+    finally:
+        os.chdir(cwd)
+    from core.submission_log import SubmissionLog
+    from core.ingest import RecipientTokens
+    from modules.send_queue import PersistentSendQueue
+    original = web_server.submission_log, web_server.recipient_tokens
+    web_server.submission_log = SubmissionLog(workdir / "submissions", salt="bench")
+    # Links carry the queue's per-recipient tokens, resolved on every submission
+    (workdir / "campaigns" / "bench").mkdir(parents=True)
+    queue = PersistentSendQueue(workdir / "campaigns" / "bench" / "queue.db")
+    queue.enqueue({"email": f"user{i}@example.com"} for i in range(500))
+    tokens = [item.token for item in queue.claim(500)]
+    queue.close()
+    web_server.recipient_tokens = RecipientTokens(workdir / "campaigns")
+    client = web_server.app.test_client()
+    form = {"campaign": "bench", "username": "alex", "password": "hunter2", "honeypot": ""}
+
+    def run():
+        for token in tokens:
+            client.post(f"/capture?r={token}", data=form)
+        return len(tokens)
+    yield run
+    web_server.submission_log.close()
+    web_server.recipient_tokens.close()
+    web_server.submission_log, web_server.recipient_tokens = original
+
+
+def fixture_site(pages: int = 5, blocks: int = 300) -> dict:
+    """Path -> (content type, body) for a small shop-like site with shared assets"""
+    site = {"/site.css": ("text/css", "".join(f".b{i} {{ background: url('/img/bg{i}.png') }}\n"
+                                               for i in range(10)))}
+    for i in range(10):
+        site[f"/img/bg{i}.png"] = ("image/png", "png" * 50)
+        site[f"/img/item{i}.png"] = ("image/png", "png" * 200)
+    for page in range(pages):
+        body = "".join(
+            f'<div class="b{i % 10}" id="item{i}"><img src="/img/item{i % 10}.png" alt="Item {i}">'
+            f'<a href="/p{page}/item{i}">Item &amp; details {i}</a><span style="color:#333">'
+            f'Price: {i}.99</span></div>' for i in range(blocks))
+        site[f"/p{page}"] = ("text/html", (
+            '<!DOCTYPE html><html><head><title>Shop</title><link rel="stylesheet" href="/site.css">'
+            '<script src="/app.js"></script><script>var cart = []; let total = 0;</script></head>'
+            f'<body>{body}<form action="/login" method="post"><input name="username">'
+            '<input type="password" name="password"></form></body></html>'))
+    site["/app.js"] = ("application/javascript", "var x = 1;" * 100)
+    return site
+
+
+@benchmark("web_cloner_rewrite", "WebCloner.clone_site of a local fixture site, per page")
+def web_cloner_rewrite(workdir: Path):
+    from modules.web_cloner import WebCloner
+    site = fixture_site()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            content_type, body = site.get(self.path, ("text/plain", ""))
+            body = body.encode()
+            self.send_response(200 if self.path in site else 404)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    cloner = WebCloner(min_delay=0)
+    pages = [path for path in site if path.startswith("/p")]
+
+    def run():
+        for page in pages:
+            if not cloner.clone_site(base + page, str(workdir / page.strip("/")), "bench"):
+                raise RuntimeError(f"Cloning {page} failed")
+        return len(pages)
+    yield run
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@benchmark("report_build", "Campaign report from a 100k-event log (load, aggregate, write), per event")
+def report_build(workdir: Path):
+    from core.reporting import build_report, load_event_log, write_report
+    path = workdir / "events.log"
+    types = ("open", "click", "credential", "report")
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(20000):
+            sent_at = 1700000000.0 + i
+            f.write(f"{sent_at:.3f}\temail_sent\tuser{i}@example.com\tdept{i % 25}\n")
+            for offset, event_type in enumerate(types):
+                f.write(f"{sent_at + 600 * (offset + 1) + i % 7200:.3f}\t{event_type}\tuser{i}@example.com\t\n")
+
+    def run():
+        columns = load_event_log(path)
+        write_report(build_report(columns), workdir / "reports", "bench")
+        return len(columns)
+    return run
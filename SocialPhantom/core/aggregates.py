@@ -0,0 +1,256 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.event_log import event_recipient, event_time
+from core.reporting import EVENT_TYPES, STAGES, UNKNOWN_DEPARTMENT, add_rates
+
+# Per-campaign store under campaigns/<name>/
+AGGREGATES_DB = 'aggregates.db'
+
+
+class DepartmentLookup:
+    """Department of the recipient an event is about
+
+    Deliveries carry the target and its department. Interactions only name the
+    recipient, so the department is read from the target variables in the campaign's
+    send queue (queue.db, unique per recipient) and kept in a bounded LRU cache.
+    """
+
+    def __init__(self, base_dir: Path, cache_size: int = 100000):
+        self.logger = logging.getLogger(__name__)
+        self.base_dir = Path(base_dir)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.connections = {}
+        self.lock = threading.Lock()
+
+    def department(self, campaign: str, event: Dict) -> str:
+        department = event.get('department') or (event.get('target') or {}).get('department')
+        if department:
+            return str(department)
+        recipient = event_recipient(event)
+        if not recipient:
+            return UNKNOWN_DEPARTMENT
+        key = (campaign, str(recipient).casefold())
+        with self.lock:
+            department = self.cache.get(key)
+            if department is not None:
+                self.cache.move_to_end(key)
+                return department
+            department = self._lookup(campaign, key[1]) or UNKNOWN_DEPARTMENT
+            self.cache[key] = department
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return department
+
+    def _lookup(self, campaign: str, recipient: str) -> Optional[str]:
+        """Read a recipient's department from the send queue; called with self.lock held"""
+        conn = self.connections.get(campaign)
+        if conn is None:
+            path = self.base_dir / campaign / 'queue.db'
+            if not path.exists():
+                return None
+            conn = self.connections[campaign] = sqlite3.connect(
+                path.resolve().as_uri() + '?mode=ro', uri=True, check_same_thread=False)
+        try:
+            row = conn.execute("SELECT variables FROM sends WHERE recipient = ?", (recipient,)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Department lookup failed for campaign '{campaign}': {e}")
+            return None
+        return json.loads(row[0]).get('department') if row and row[0] else None
+
+    def forget(self, campaign: str):
+        with self.lock:
+            conn = self.connections.pop(campaign, None)
+            for key in [key for key in self.cache if key[0] == campaign]:
+                del self.cache[key]
+        if conn:
+            conn.close()
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections = {}
+
+
+class CampaignAggregates:
+    """Materialised per-campaign counts keyed by (department, hour, event type)
+
+    Each campaign keeps an aggregates.db next to its config. For every group it holds
+    the number of events and the number of recipients reaching that type for the first
+    time, so department rates and the hourly funnel are read in O(groups) instead of
+    rescanning the event log. Events are buffered and applied per campaign in one
+    transaction every flush_events events or flush_interval seconds.
+    """
+
+    def __init__(self, base_dir: Path, flush_events: int = 1000, flush_interval: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.base_dir = Path(base_dir)
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.buffers = {}
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.connections = {}
+        self.lock = threading.Lock()
+
+    def _connect(self, campaign: str) -> Optional[sqlite3.Connection]:
+        """Open (creating if needed) a campaign's store; called with self.lock held"""
+        conn = self.connections.get(campaign)
+        if conn is None:
+            if not (self.base_dir / campaign).is_dir():
+                return None
+            conn = sqlite3.connect(str(self.base_dir / campaign / AGGREGATES_DB), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS groups (
+                    department TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    events INTEGER NOT NULL DEFAULT 0,
+                    recipients INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (department, hour, type)
+                );
+                CREATE TABLE IF NOT EXISTS reached (
+                    recipient TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    PRIMARY KEY (recipient, type)
+                ) WITHOUT ROWID;
+            """)
+            self.connections[campaign] = conn
+        return conn
+
+    def record(self, event: Dict, department: str):
+        """Buffer one event; events without a recipient or of an unknown type are not aggregated"""
+        recipient = event_recipient(event)
+        if not recipient or event.get('type') not in EVENT_TYPES:
+            return
+        row = (str(recipient), event['type'], department, int(event_time(event) // 3600))
+        with self.lock:
+            self.buffers.setdefault(event['campaign'], []).append(row)
+            self.pending += 1
+
+    def maybe_flush(self):
+        if self.pending and (self.pending >= self.flush_events or
+                             time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            for campaign, rows in self.buffers.items():
+                conn = self._connect(campaign)
+                if conn is None:
+                    self.logger.warning(f"Dropping {len(rows)} events for unknown campaign '{campaign}'")
+                    continue
+                try:
+                    self._apply(conn, rows)
+                except sqlite3.Error as e:
+                    self.logger.error(f"Failed to update aggregates for campaign '{campaign}': {e}")
+            self.buffers = {}
+            self.pending = 0
+            self.last_flush = time.monotonic()
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, rows: List[Tuple[str, str, str, int]]):
+        events, recipients = Counter(), Counter()
+        with conn:
+            for recipient, event_type, department, hour in rows:
+                group = (department, hour, event_type)
+                events[group] += 1
+                recipients[group] += conn.execute("INSERT OR IGNORE INTO reached (recipient, type) VALUES (?, ?)",
+                                                  (recipient, event_type)).rowcount
+            conn.executemany(
+                "INSERT INTO groups (department, hour, type, events, recipients) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (department, hour, type) DO UPDATE SET "
+                "events = events + excluded.events, recipients = recipients + excluded.recipients",
+                [group + (count, recipients[group]) for group, count in events.items()])
+
+    def groups(self, campaign: str) -> List[Tuple[str, int, str, int, int]]:
+        """(department, hour, type, events, recipients) rows, ordered by hour"""
+        with self.lock:
+            conn = self._connect(campaign)
+            if conn is None:
+                return []
+            return conn.execute("SELECT department, hour, type, events, recipients FROM groups "
+                                "ORDER BY hour, department, type").fetchall()
+
+    def summary(self, campaign: str) -> Dict:
+        """Overall and per-department rates, event counts and hourly funnel from the groups alone"""
+        departments, hourly = {}, {}
+        event_counts = dict.fromkeys(EVENT_TYPES, 0)
+        for department, hour, event_type, events, recipients in self.groups(campaign):
+            event_counts[event_type] += events
+            name = STAGES.get(event_type)
+            if name is None:
+                continue
+            departments.setdefault(department, dict.fromkeys(STAGES.values(), 0))[name] += recipients
+            hourly.setdefault(hour, dict.fromkeys(STAGES.values(), 0))[name] += recipients
+        overall = dict.fromkeys(STAGES.values(), 0)
+        for row in departments.values():
+            for name in overall:
+                overall[name] += row[name]
+        return {
+            'event_counts': event_counts,
+            'overall': add_rates(overall),
+            'departments': [add_rates(dict(departments[name], department=name)) for name in sorted(departments)],
+            'hourly_funnel': [dict(hour=time.strftime('%Y-%m-%d %H:00', time.gmtime(hour * 3600)), **hourly[hour])
+                              for hour in sorted(hourly)],
+        }
+
+    def rebuild(self, campaign: str, log_path: Path, lookup: Optional[DepartmentLookup] = None) -> int:
+        """Recompute a campaign's aggregates from its event log; returns the events replayed"""
+        lookup = lookup or DepartmentLookup(self.base_dir)
+        with self.lock:
+            self.pending -= len(self.buffers.pop(campaign, []))
+            conn = self._connect(campaign)
+            if conn is None:
+                raise ValueError(f"Campaign '{campaign}' not found")
+            with conn:
+                conn.execute("DELETE FROM groups")
+                conn.execute("DELETE FROM reached")
+        replayed = 0
+        if not Path(log_path).exists():
+            return replayed
+        batch = []
+        with open(log_path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 4 or not parts[2] or parts[1] not in EVENT_TYPES:
+                    continue
+                try:
+                    hour = int(float(parts[0]) // 3600)
+                except ValueError:
+                    continue
+                department = parts[3] or lookup.department(campaign, {'recipient': parts[2]})
+                batch.append((parts[2], parts[1], department, hour))
+                if len(batch) >= 10000:
+                    replayed += self._replay(conn, batch)
+                    batch = []
+        return replayed + self._replay(conn, batch)
+
+    def _replay(self, conn: sqlite3.Connection, rows: List) -> int:
+        with self.lock:
+            self._apply(conn, rows)
+        return len(rows)
+
+    def forget(self, campaign: str):
+        """Drop buffered events and close the store of a campaign being deleted"""
+        with self.lock:
+            self.pending -= len(self.buffers.pop(campaign, []))
+            conn = self.connections.pop(campaign, None)
+        if conn:
+            conn.close()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections = {}
@@ -1,64 +1,199 @@
-import os
+import secrets
+import shutil
 import json
 import logging
 import time
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional
-from threading import Thread
-from multiprocessing import Queue
-from modules.web_cloner import WebCloner
-from modules.email_sender import EmailSender
+from typing import Callable, Dict, List, Optional
+from threading import Thread, RLock
+from modules.send_queue import INFLIGHT, PENDING, PersistentSendQueue, QueueItem
+from modules.target_source import TargetFilter, TargetSource, read_targets
+from core.stats_writer import CampaignStatsWriter
+from core.campaign_store import CampaignIndex, campaign_dir
+from core.progress import RunProgress
+
+# Campaign types run_campaign can deliver
+RUNNABLE_TYPES = ("PHISHING", "BEC")
 
 class CampaignManager:
-    def __init__(self, base_dir: str = "campaigns"):
+    """Campaign lifecycle, delivery and event processing
+
+    Only the campaign index and stats writer are built up front. The cloner, the
+    delivery engine, the event pipeline and the report stores are imported and
+    constructed on first use, so listing or inspecting campaigns never pays for
+    requests, SMTP or worker threads.
+    """
+
+    def __init__(self, base_dir: str = "campaigns", stats_flush_interval: float = 1.0,
+                 stats_flush_events: int = 1000, email_config: str = "config/email_config.json"):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(exist_ok=True)
         self.logger = logging.getLogger(__name__)
-        self.web_cloner = WebCloner()
-        self.email_sender = EmailSender()
+        self.index = CampaignIndex(self.base_dir)
+        self.stats_writer = CampaignStatsWriter(self.base_dir, stats_flush_interval, stats_flush_events,
+                                                on_write=self.index.upsert)
+        self.email_config = email_config
         self.active_campaigns = {}
-        self.event_queue = Queue()
-        self.monitor_thread = Thread(target=self._monitor_campaigns, daemon=True)
-        self.monitor_thread.start()
+        # Campaigns events have been accepted for; see _known_campaign
+        self.known_campaigns = set()
+        # BEC pixel tokens per campaign, served by tracking_server until shutdown
+        self.tracking_stores = {}
+        self.subsystems = {}
+        self.subsystems_lock = RLock()
+        self.stats_subscription = None
+        self.monitor_thread = None
+
+    def _subsystem(self, name: str, factory: Callable):
+        """Construct a subsystem on first use and return the same instance afterwards"""
+        instance = self.subsystems.get(name)
+        if instance is None:
+            with self.subsystems_lock:
+                instance = self.subsystems.get(name)
+                if instance is None:
+                    instance = self.subsystems[name] = factory()
+        return instance
+
+    @property
+    def web_cloner(self):
+        def create():
+            from modules.web_cloner import WebCloner
+            from modules.asset_cache import AssetCache
+            return WebCloner(asset_cache=AssetCache(self.base_dir / ".asset_cache"))
+        return self._subsystem("web_cloner", create)
+
+    @property
+    def email_sender(self):
+        """Delivery engine selected by the email config; its workers start with the first send"""
+        def create():
+            from modules.email_sender import create_email_sender
+            return create_email_sender(self.email_config)
+        return self._subsystem("email_sender", create)
+
+    @property
+    def event_queue(self):
+        """Event bus; the stats consumer thread starts along with it"""
+        def create():
+            from core.event_bus import EventBus
+            bus = EventBus()
+            self.stats_subscription = bus.subscribe("stats")
+            self.monitor_thread = Thread(target=self._monitor_campaigns, daemon=True)
+            self.monitor_thread.start()
+            return bus
+        return self._subsystem("event_queue", create)
+
+    @property
+    def ingestor(self):
+        def create():
+            from core.ingest import EventIngestor
+            return EventIngestor(self.event_queue)
+        return self._subsystem("ingestor", create)
+
+    @property
+    def tracking_server(self):
+        """Pixel server for BEC opens, bound as the email config's tracking_server section says"""
+        def create():
+            from modules.tracking_server import TrackingServer, tracking_settings
+            from modules.tracking_store import TrackingStore
+            settings = tracking_settings(self.email_sender.config)
+            server = TrackingServer(TrackingStore(), settings["port"], settings["host"], self.ingestor)
+            server.start()
+            return server
+        return self._subsystem("tracking_server", create)
+
+    def _tracking_store(self, name: str):
+        """The BEC campaign's TrackingStore, registered with tracking_server on first use"""
+        with self.subsystems_lock:
+            store = self.tracking_stores.get(name)
+            if store is None:
+                from modules.tracking_store import TrackingStore
+                store = TrackingStore(self.base_dir / name / "logs" / "tracking.log")
+                self.tracking_server.add_campaign(name, store)
+                self.tracking_stores[name] = store
+            return store
+
+    @property
+    def event_log(self):
+        def create():
+            from core.event_log import CampaignEventLog
+            return CampaignEventLog(self.base_dir, self.stats_writer.flush_events, self.stats_writer.flush_interval)
+        return self._subsystem("event_log", create)
+
+    @property
+    def departments(self):
+        def create():
+            from core.aggregates import DepartmentLookup
+            return DepartmentLookup(self.base_dir)
+        return self._subsystem("departments", create)
+
+    @property
+    def aggregates(self):
+        def create():
+            from core.aggregates import CampaignAggregates
+            return CampaignAggregates(self.base_dir, self.stats_writer.flush_events,
+                                      self.stats_writer.flush_interval)
+        return self._subsystem("aggregates", create)
 
     def _monitor_campaigns(self):
-        """Background thread for real-time campaign monitoring"""
-        while True:
-            while not self.event_queue.empty():
-                event = self.event_queue.get()
-                self._process_event(event)
-            time.sleep(1)
+        """Background thread for real-time campaign monitoring
+
+        Blocks until events arrive and handles them in batches; the timeout only
+        exists so pending stats still get flushed when traffic stops. A bad event or
+        a failed flush is logged and skipped, so the thread never dies on one.
+        """
+        while not self.stats_subscription.closed:
+            for event in self.stats_subscription.get_batch(timeout=self.stats_writer.flush_interval):
+                try:
+                    self._process_event(event)
+                except Exception as e:
+                    self.logger.error(f"Failed to process event {event!r}: {e}", exc_info=True)
+            try:
+                self.stats_writer.maybe_flush()
+                self.event_log.maybe_flush()
+                self.aggregates.maybe_flush()
+            except Exception as e:
+                self.logger.error(f"Failed to flush campaign events: {e}", exc_info=True)
 
     def _process_event(self, event: Dict):
-        """Process campaign events in real-time"""
-        campaign = self.get_campaign(event['campaign'])
-        if campaign:
-            # Update stats based on event type
-            if event['type'] == 'email_sent':
-                campaign['stats']['emails_sent'] += 1
-            elif event['type'] == 'click':
-                campaign['stats']['clicks'] += 1
-            elif event['type'] == 'credential':
-                campaign['stats']['credentials_captured'] += 1
-            elif event['type'] == 'bec_reply':
-                campaign['stats']['bec_replies'] += 1
-            elif event['type'] == 'bec_transfer':
-                campaign['stats']['bec_transfers'] += 1
-            
-            # Calculate success rates
-            total = campaign['stats']['emails_sent']
-            successes = campaign['stats']['credentials_captured']
-            if campaign['type'] == 'BEC':
-                total = campaign['stats']['bec_replies']
-                successes = campaign['stats']['bec_transfers']
-            campaign['stats']['success_rate'] = successes / total if total > 0 else 0
-            
-            self._save_campaign(campaign)
+        """Process campaign events in real-time
+
+        Stats are aggregated in memory and written by the stats writer in batches;
+        every event is also appended to the campaign's event log and counted in its
+        (department, hour, type) aggregates for reporting.
+        """
+        if not isinstance(event, dict) or not isinstance(event.get('type'), str):
+            self.logger.warning(f"Ignoring malformed event {event!r}")
+            return
+        if not self._known_campaign(event.get('campaign')):
+            self.logger.warning(f"Ignoring {event.get('type')} event for unknown campaign {event.get('campaign')!r}")
+            return
+        department = self.departments.department(event['campaign'], event)
+        self.stats_writer.record(event)
+        self.event_log.record(event, department)
+        self.aggregates.record(event, department)
+
+    def _known_campaign(self, name) -> bool:
+        """Whether name is an indexed campaign whose directory lies directly in base_dir
+
+        Campaign names in events come from unauthenticated HTTP requests, so nothing is
+        logged or aggregated for a name that fails this check.
+        """
+        if not isinstance(name, str):
+            return False
+        if name in self.known_campaigns:
+            return True
+        if campaign_dir(self.base_dir, name) is None or self.index.get(name) is None:
+            return False
+        self.known_campaigns.add(name)
+        return True
 
     def create_campaign(self, name: str, campaign_type: str, config: Optional[Dict] = None) -> bool:
         """Create a new campaign with enhanced configuration"""
-        campaign_path = self.base_dir / name
+        campaign_path = campaign_dir(self.base_dir, name)
+        if campaign_path is None:
+            self.logger.error(f"Invalid campaign name {name!r}")
+            return False
         try:
             campaign_path.mkdir()
             
@@ -68,11 +203,13 @@ class CampaignManager:
                 "type": campaign_type,
                 "created": datetime.now().isoformat(),
                 "status": "draft",
-                "targets": [],
+                "client": None,
                 "stats": {
                 "emails_sent": 0,
+                "opens": 0,
                 "clicks": 0,
                 "credentials_captured": 0,
+                "reports": 0,
                 "bec_replies": 0,
                 "bec_transfers": 0,
                 "success_rate": 0.0,
@@ -81,15 +218,22 @@ class CampaignManager:
                 "settings": {
                     "template": "default",
                     "language": "en",
-                    "schedule": None
+                    "schedule": None,
+                    "send_window": None,
+                    "allowed_domains": None,
+                    "landing_page": "index.html"
                 }
             }
             
             if config:
+                config = dict(config)
+                # Settings given by the caller override the defaults one key at a time
+                default_config["settings"].update(config.pop("settings", None) or {})
                 default_config.update(config)
             
             with open(campaign_path / "config.json", "w") as f:
                 json.dump(default_config, f, indent=2)
+            self.index.upsert(default_config)
                 
             # Enhanced directory structure
             (campaign_path / "clones").mkdir()
@@ -104,59 +248,225 @@ class CampaignManager:
             self.logger.error(f"Failed to create campaign: {str(e)}", exc_info=True)
             return False
 
-    def run_campaign(self, name: str, targets: List[Dict], template: str) -> bool:
-        """Execute a campaign (phishing or BEC)"""
-        campaign_path = self.base_dir / name
-        if not campaign_path.exists():
+    def run_campaign(self, name: str, targets: TargetSource, template: str,
+                     progress: Optional[RunProgress] = None) -> bool:
+        """Execute a campaign (phishing or BEC); False if it is not indexed or of another type
+
+        targets is an iterable of dicts or the path of a .csv/.jsonl target file. They are
+        streamed through validation and the campaign's allowed_domains scope into the
+        campaign's persistent send queue (queue.db, unique per case-folded address), so
+        re-running an interrupted campaign resumes with the recipients not sent yet.
+
+        Delivery outcomes are counted in progress (a new RunProgress if not given), which
+        campaign_progress(name) reads while the run is going.
+        """
+        campaign_path = campaign_dir(self.base_dir, name)
+        indexed = self.index.get(name) if campaign_path is not None else None
+        if indexed is None or not campaign_path.is_dir():
             self.logger.error(f"Campaign '{name}' not found")
             return False
+        if indexed.get("type") not in RUNNABLE_TYPES:
+            self.logger.error(f"Campaign '{name}' is a {indexed.get('type')} campaign; only "
+                              f"{' and '.join(RUNNABLE_TYPES)} campaigns can be run")
+            return False
             
         try:
-            # Load campaign config
-            with open(campaign_path / "config.json") as f:
-                config = json.load(f)
-                
             # Update status
-            config["status"] = "running"
-            config["started"] = datetime.now().isoformat()
-            
-            # Send appropriate emails based on campaign type
-            if config["type"] == "PHISHING":
-                for target in targets:
-                    if self.email_sender.send_phishing_email(template, target, name):
-                        config["stats"]["emails_sent"] += 1
-                        self.event_queue.put({
-                            "campaign": name,
-                            "type": "email_sent",
-                            "target": target
-                        })
-            elif config["type"] == "BEC":
-                from modules.bec_simulator import BECSimulator
-                bec = BECSimulator()
-                for target in targets:
-                    if bec.send_bec_email(template, target, target.get("spoofed_sender")):
-                        config["stats"]["emails_sent"] += 1
-                        self.event_queue.put({
-                            "campaign": name,
-                            "type": "email_sent",
-                            "target": target
-                        })
+            config = self.stats_writer.update(name, lambda campaign: campaign.update(
+                status="running", started=datetime.now().isoformat()))
+            from modules.scheduler import SendWindow
+            # Passed with each send: the scheduler is shared with every other campaign
+            window = SendWindow.from_settings(config.get("settings", {}).get("send_window"))
+            scheduler = self.email_sender.scheduler
+
+            progress = progress or RunProgress()
+            self.active_campaigns[name] = progress
+            send_queue = PersistentSendQueue(campaign_path / "queue.db")
+            try:
+                target_filter = TargetFilter(config.get("settings", {}).get("allowed_domains"))
+                added = send_queue.enqueue(target_filter.filter(read_targets(targets)))
+                self.logger.info(f"Queued {added} new targets for campaign '{name}' "
+                                 f"({target_filter.stats['accepted'] - added} already queued)")
+                counts = send_queue.counts()
+                progress.queued = counts[PENDING] + counts[INFLIGHT]
+                record = partial(self._record_delivery, send_queue, name, progress=progress)
+
+                # Send appropriate emails based on campaign type
+                if config["type"] == "PHISHING" and hasattr(self.email_sender, "send_batch"):
+                    import asyncio
+
+                    async def send_all():
+                        # One loop for the whole run so pooled connections are reused across batches
+                        try:
+                            while True:
+                                batch = send_queue.claim()
+                                if not batch:
+                                    break
+                                results = await self.email_sender.send_batch(
+                                    template, [dict(item.variables, email=item.recipient, tracking_token=item.token)
+                                               for item in batch], name, keep_open=True, window=window)
+                                for item, result in zip(batch, results):
+                                    record(item, result["success"], result["attempts"], result["error"])
+                        finally:
+                            await self.email_sender.close()
+
+                    asyncio.run(send_all())
+                elif config["type"] == "PHISHING":
+                    while True:
+                        batch = send_queue.claim()
+                        if not batch:
+                            break
+                        for item in batch:
+                            on_done = partial(record, item)
+                            variables = dict(item.variables, tracking_token=item.token)
+                            if not self.email_sender.send_phishing_email(template, item.recipient, name, variables,
+                                                                         on_done=on_done, window=window):
+                                on_done(False, 0, "Failed to prepare email")
+                    self.email_sender.email_queue.join()
+                elif config["type"] == "BEC":
+                    from modules.bec_simulator import BECSimulator
+                    # Opens keep arriving after the run, so the store stays served until shutdown
+                    tracking_store = self._tracking_store(name)
+                    bec = BECSimulator(self.email_config, scheduler=scheduler, tracking_store=tracking_store)
+                    try:
+                        while True:
+                            batch = send_queue.claim()
+                            if not batch:
+                                break
+                            for item in batch:
+                                target = dict(item.variables, email=item.recipient, tracking_token=item.token)
+                                sent = bec.send_bec_email(template, target, target.get("spoofed_sender"), name,
+                                                          window)
+                                record(item, sent)
+                    finally:
+                        tracking_store.flush()
+
+                counts = send_queue.counts()
+            finally:
+                send_queue.close()
+                progress.finish()
+                self.active_campaigns.pop(name, None)
                     
-            # Save updated config
-            with open(campaign_path / "config.json", "w") as f:
-                json.dump(config, f, indent=2)
-                
-            self.logger.info(f"Started phishing campaign '{name}' with {len(targets)} targets")
+            # Encoded attachments are only shared within one run
+            self.email_sender.attachments.clear()
+
+            self.logger.info(f"Ran {config['type'].lower()} campaign '{name}': "
+                             f"{counts['sent']} sent, {counts['failed']} failed")
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to run campaign: {e}")
             return False
 
+    def _record_delivery(self, send_queue: PersistentSendQueue, name: str, item: QueueItem,
+                         success: bool, attempts: int = 1, error: Optional[str] = None,
+                         progress: Optional[RunProgress] = None):
+        """Acknowledge a delivery outcome in the send queue and publish it as an event"""
+        if progress:
+            progress.record(success)
+        if success:
+            send_queue.mark_sent(item.id, attempts)
+            self.event_queue.put({
+                "campaign": name,
+                "type": "email_sent",
+                "timestamp": time.time(),
+                "target": dict(item.variables, email=item.recipient)
+            })
+        else:
+            send_queue.mark_failed(item.id, error, attempts)
+
+    def campaign_progress(self, name: str) -> Optional[Dict]:
+        """Live delivery counters of a running campaign, or None if it is not running here"""
+        progress = self.active_campaigns.get(name)
+        return progress.snapshot() if progress else None
+
+    def record_interaction(self, name: str, event_type: str, recipient: Optional[str] = None,
+                           **details) -> bool:
+        """Count an open, click, submission or phish report through the deduplicating ingestor"""
+        if not self._known_campaign(name):
+            self.logger.warning(f"Ignoring {event_type} for unknown campaign {name!r}")
+            return False
+        return self.ingestor.submit(name, event_type, recipient, **details)
+
+    def generate_report(self, name: str) -> Optional[Dict]:
+        """Build the campaign report from its event log and write it to the reports/ directory
+
+        Returns the report with the written files under "files", or None if the campaign
+        does not exist.
+        """
+        campaign_path = self.base_dir / name
+        if not campaign_path.is_dir():
+            self.logger.error(f"Campaign '{name}' not found")
+            return None
+        from core.reporting import build_report, load_event_log, write_report
+        self.event_log.flush()
+        started = time.monotonic()
+        report = build_report(load_event_log(self.event_log.path(name)))
+        report["files"] = {key: str(path) for key, path in
+                           write_report(report, campaign_path / "reports", name).items()}
+        self.logger.info(f"Built report for '{name}' from {report['events']} events "
+                         f"in {time.monotonic() - started:.2f}s")
+        return report
+
+    def campaign_summary(self, name: str) -> Optional[Dict]:
+        """Department rates, event counts and hourly funnel served from the campaign's aggregates"""
+        if not (self.base_dir / name).is_dir():
+            self.logger.error(f"Campaign '{name}' not found")
+            return None
+        self.aggregates.flush()
+        return self.aggregates.summary(name)
+
+    def rebuild_aggregates(self, name: str) -> int:
+        """Recompute a campaign's aggregates from its event log, e.g. to check them for drift"""
+        self.event_log.flush()
+        self.aggregates.flush()
+        count = self.aggregates.rebuild(name, self.event_log.path(name), self.departments)
+        self.logger.info(f"Rebuilt aggregates for '{name}' from {count} events")
+        return count
+
+    def serve_events(self, port: int = 0, authkey: Optional[bytes] = None,
+                     host: str = "127.0.0.1") -> Dict[str, str]:
+        """Let web_server/tracking_server processes publish events into this manager
+
+        Without an authkey a random 32-byte key is generated. Returns the environment
+        (SOCIALPHANTOM_EVENT_BUS and the hex-encoded SOCIALPHANTOM_EVENT_AUTHKEY) to start
+        a front-end process with, see core.ingest.ingestor_from_env.
+        """
+        authkey = authkey or secrets.token_bytes(32)
+        address = self.event_queue.serve((host, port), authkey)
+        return {"SOCIALPHANTOM_EVENT_BUS": f"{address[0]}:{address[1]}",
+                "SOCIALPHANTOM_EVENT_AUTHKEY": authkey.hex()}
+
+    def event_metrics(self) -> Dict[str, Dict]:
+        """End-to-end event latency and backlog for every event consumer"""
+        return self.event_queue.metrics()
+
+    def shutdown(self):
+        """Stop event consumption, flush pending stats and stop the delivery workers
+
+        Only subsystems that were actually started are touched, and calling it again is harmless.
+        """
+        subsystems = dict(self.subsystems)
+        if "tracking_server" in subsystems:
+            subsystems["tracking_server"].stop()
+        for store in self.tracking_stores.values():
+            store.close()
+        if "ingestor" in subsystems:
+            subsystems["ingestor"].close()
+        if "event_queue" in subsystems:
+            subsystems["event_queue"].close()
+            self.monitor_thread.join(timeout=5)
+        self.stats_writer.flush()
+        for name in ("event_log", "aggregates", "departments"):
+            if name in subsystems:
+                subsystems[name].close()
+        if "email_sender" in subsystems:
+            subsystems["email_sender"].shutdown()
+
     def get_campaign(self, name: str) -> Dict:
         """Retrieve campaign details"""
-        campaign_path = self.base_dir / name
-        if not campaign_path.exists():
+        campaign_path = campaign_dir(self.base_dir, name)
+        if campaign_path is None or not campaign_path.exists():
             return None
             
         try:
@@ -166,12 +476,52 @@ class CampaignManager:
             self.logger.error(f"Failed to load campaign: {e}")
             return None
 
-    def list_campaigns(self) -> List[Dict]:
-        """List all available campaigns"""
-        campaigns = []
-        for campaign_dir in self.base_dir.iterdir():
-            if campaign_dir.is_dir():
-                campaign = self.get_campaign(campaign_dir.name)
-                if campaign:
-                    campaigns.append(campaign)
+    def list_campaigns(self, status: Optional[str] = None, campaign_type: Optional[str] = None,
+                       client: Optional[str] = None, created_after: Optional[str] = None,
+                       created_before: Optional[str] = None, limit: Optional[int] = None,
+                       offset: int = 0, with_summary: bool = False) -> List[Dict]:
+        """List campaigns from the index, optionally filtered and paginated
+
+        with_summary adds each campaign's overall funnel from its aggregates as "summary".
+        """
+        campaigns = self.index.query(status, campaign_type, client, created_after, created_before,
+                                     limit, offset)
+        if with_summary:
+            self.aggregates.flush()
+            for campaign in campaigns:
+                campaign["summary"] = self.aggregates.summary(campaign["name"])["overall"]
         return campaigns
+
+    def delete_campaign(self, name: str) -> bool:
+        """Delete a campaign directory and its index entry
+
+        Only indexed campaigns whose directory lies directly inside base_dir are removed,
+        so names like '', '.' or '..' can never delete base_dir or what contains it.
+        """
+        campaign_path = campaign_dir(self.base_dir, name)
+        if campaign_path is None or not campaign_path.is_dir() or self.index.get(name) is None:
+            self.logger.error(f"Campaign '{name}' not found")
+            return False
+        try:
+            self.known_campaigns.discard(name)
+            store = self.tracking_stores.pop(name, None)
+            if store is not None:
+                self.tracking_server.remove_campaign(name)
+                store.close()
+            for subsystem in ("event_log", "aggregates", "departments"):
+                if subsystem in self.subsystems:
+                    self.subsystems[subsystem].forget(name)
+            with self.stats_writer.write_lock:
+                shutil.rmtree(campaign_path)
+                self.index.remove(name)
+            self.logger.info(f"Deleted campaign '{name}'")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to delete campaign: {e}")
+            return False
+
+    def rebuild_index(self) -> int:
+        """Rebuild the campaign index from the campaign directories"""
+        self.known_campaigns.clear()
+        with self.stats_writer.write_lock:
+            return self.index.rebuild()
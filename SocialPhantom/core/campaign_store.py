@@ -0,0 +1,135 @@
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def valid_campaign_name(name) -> bool:
+    """A name that is one plain path component: not empty, '.', '..', and without separators"""
+    return (isinstance(name, str) and name not in ('', '.', '..') and
+            not any(char in name for char in ('/', '\\', '\0')))
+
+
+def campaign_dir(base_dir: Path, name) -> Optional[Path]:
+    """Directory of the campaign called name, or None if the name would resolve outside base_dir
+
+    Campaign names arrive from HTTP requests and the CLI, so they are checked before
+    they are joined onto a path.
+    """
+    if not valid_campaign_name(name):
+        return None
+    path = Path(base_dir) / name
+    if path.resolve().parent != Path(base_dir).resolve():
+        return None
+    return path
+
+
+class CampaignIndex:
+    """SQLite catalogue of campaigns mirroring each campaigns/<name>/config.json
+
+    config.json stays the source of truth; the index is updated on every write made
+    through CampaignManager and can be rebuilt from the directories at any time.
+    """
+
+    def __init__(self, base_dir: Path, filename: str = "index.db"):
+        self.logger = logging.getLogger(__name__)
+        self.base_dir = Path(base_dir)
+        self.path = self.base_dir / filename
+        is_new = not self.path.exists()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS campaigns (
+                name TEXT PRIMARY KEY,
+                type TEXT,
+                status TEXT,
+                client TEXT,
+                created TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS campaigns_status ON campaigns (status, created);
+            CREATE INDEX IF NOT EXISTS campaigns_type ON campaigns (type, created);
+            CREATE INDEX IF NOT EXISTS campaigns_client ON campaigns (client, created);
+            CREATE INDEX IF NOT EXISTS campaigns_created ON campaigns (created);
+        """)
+        if is_new:
+            self.rebuild()
+
+    def upsert(self, campaign: Dict):
+        """Add or refresh one campaign"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO campaigns (name, type, status, client, created, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (campaign['name'], campaign.get('type'), campaign.get('status'),
+                 campaign.get('client'), campaign.get('created'), json.dumps(campaign)))
+
+    def remove(self, name: str):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM campaigns WHERE name = ?", (name,))
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Look a campaign up by name through the primary key"""
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM campaigns WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, status: Optional[str] = None, campaign_type: Optional[str] = None,
+              client: Optional[str] = None, created_after: Optional[str] = None,
+              created_before: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0) -> List[Dict]:
+        """Filtered, paginated listing ordered by creation time (ISO dates compare as text)"""
+        clauses, params = [], []
+        for column, value in (('status', status), ('type', campaign_type), ('client', client)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if created_after:
+            clauses.append("created >= ?")
+            params.append(created_after)
+        if created_before:
+            clauses.append("created < ?")
+            params.append(created_before)
+        sql = "SELECT data FROM campaigns"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created, name LIMIT ? OFFSET ?"
+        params += [limit if limit is not None else -1, offset]
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM campaigns").fetchone()[0]
+
+    def rebuild(self) -> int:
+        """Re-read every campaign directory, e.g. after configs were edited by hand"""
+        campaigns = []
+        for campaign_dir in self.base_dir.iterdir():
+            config_path = campaign_dir / "config.json"
+            if not config_path.is_file():
+                continue
+            try:
+                with open(config_path) as f:
+                    campaign = json.load(f)
+                campaign.setdefault('name', campaign_dir.name)
+                campaigns.append(campaign)
+            except Exception as e:
+                self.logger.error(f"Skipping unreadable campaign '{campaign_dir.name}': {e}")
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM campaigns")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO campaigns (name, type, status, client, created, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(c['name'], c.get('type'), c.get('status'), c.get('client'), c.get('created'),
+                  json.dumps(c)) for c in campaigns])
+        self.logger.info(f"Rebuilt campaign index with {len(campaigns)} campaigns")
+        return len(campaigns)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
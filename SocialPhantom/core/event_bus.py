@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+from queue import Queue, Empty, Full
+from typing import Dict, List, Optional, Tuple
+
+_CLOSED = object()
+
+
+class LatencyTracker:
+    """Keeps the most recent publish-to-consume latencies and summarizes them"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def summary(self) -> Dict:
+        with self.lock:
+            samples = sorted(self.samples)
+            count = self.count
+        if not samples:
+            return {'events': count, 'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+        return {'events': count, 'p50_ms': pick(0.50), 'p99_ms': pick(0.99), 'max_ms': samples[-1] * 1000}
+
+
+class Subscription:
+    """One consumer's view of the bus with its own queue"""
+
+    def __init__(self, name: str, maxsize: int = 0):
+        self.name = name
+        self.queue = Queue(maxsize)
+        self.latency = LatencyTracker()
+        self.dropped = 0
+        self.closed = False
+
+    def _offer(self, event: Dict):
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            self.dropped += 1
+
+    def _close(self):
+        """Wake the consumer without blocking, making room in a full queue if needed"""
+        while True:
+            try:
+                self.queue.put_nowait(_CLOSED)
+                return
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+
+    def get_batch(self, max_items: int = 500, timeout: Optional[float] = None) -> List[Dict]:
+        """Block until at least one event arrives (or timeout), then drain up to max_items"""
+        if self.closed:
+            return []
+        try:
+            first = self.queue.get(timeout=timeout)
+        except Empty:
+            return []
+        batch = []
+        item = first
+        while True:
+            if item is _CLOSED:
+                self.closed = True
+                break
+            batch.append(item)
+            if len(batch) >= max_items:
+                break
+            try:
+                item = self.queue.get_nowait()
+            except Empty:
+                break
+        now = time.time()
+        for event in batch:
+            self.latency.add(now - event.get('published_at', now))
+        return batch
+
+    def metrics(self) -> Dict:
+        return dict(self.latency.summary(), backlog=self.queue.qsize(), dropped=self.dropped)
+
+
+class EventBus:
+    """In-process publish/subscribe bus fanning campaign events out to every subscriber
+
+    Producers in other processes (web_server, tracking_server) can publish through
+    EventBusClient once serve() is listening.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def subscribe(self, name: str, maxsize: int = 0) -> Subscription:
+        """Register a consumer; a bounded maxsize drops events for it rather than blocking publishers"""
+        with self.lock:
+            subscription = self.subscriptions[name] = Subscription(name, maxsize)
+        return subscription
+
+    def unsubscribe(self, name: str):
+        with self.lock:
+            subscription = self.subscriptions.pop(name, None)
+        if subscription:
+            subscription._close()
+
+    def publish(self, event: Dict):
+        """Stamp the event with its publish time and hand it to every subscriber"""
+        event.setdefault('published_at', time.time())
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+        for subscription in subscriptions:
+            subscription._offer(event)
+
+    def publish_many(self, events: List[Dict]):
+        for event in events:
+            self.publish(event)
+
+    # Queue-style alias so producers can keep calling event_queue.put(event)
+    put = publish
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Per-subscriber delivered count, latency percentiles, backlog and drops"""
+        with self.lock:
+            return {name: sub.metrics() for name, sub in self.subscriptions.items()}
+
+    def serve(self, address: Tuple[str, int], authkey: bytes):
+        """Accept events from other processes on address until close()
+
+        Connections unpickle what they receive, so an authkey is mandatory.
+        """
+        if not authkey:
+            raise ValueError("An authkey is required to accept events from other processes")
+        self.listener = Listener(address, authkey=authkey)
+        threading.Thread(target=self._accept, daemon=True).start()
+        self.logger.info(f"Event bus listening on {address[0]}:{self.listener.address[1]}")
+        return self.listener.address
+
+    def _accept(self):
+        while self.listener is not None:
+            try:
+                conn = self.listener.accept()
+            except Exception:
+                break
+            threading.Thread(target=self._receive, args=(conn,), daemon=True).start()
+
+    def _receive(self, conn):
+        with conn:
+            while True:
+                try:
+                    events = conn.recv()
+                except (EOFError, OSError):
+                    return
+                for event in events:
+                    self.publish(event)
+
+    def close(self):
+        """Stop the listener and wake every consumer"""
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            listener.close()
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+        for subscription in subscriptions:
+            subscription._close()
+
+
+class EventBusClient:
+    """Publishes events to an EventBus served by another process"""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def publish_many(self, events: List[Dict]):
+        now = time.time()
+        for event in events:
+            event.setdefault('published_at', now)
+        with self.lock:
+            if self.conn is None:
+                self.conn = Client(self.address, authkey=self.authkey)
+            try:
+                self.conn.send(events)
+            except (OSError, EOFError):
+                self.conn = None
+                raise
+
+    def publish(self, event: Dict):
+        self.publish_many([event])
+
+    put = publish
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+# Per-campaign log under campaigns/<name>/logs/
+EVENT_LOG = 'events.log'
+
+
+def _field(value) -> str:
+    return '' if value is None else str(value).replace('\t', ' ').replace('\n', ' ')
+
+
+def event_time(event: Dict) -> float:
+    return float(event.get('timestamp') or event.get('published_at') or time.time())
+
+
+def event_recipient(event: Dict) -> Optional[str]:
+    """Recipient an event is about: interactions name it, deliveries carry the target"""
+    return event.get('recipient') or (event.get('target') or {}).get('email')
+
+
+class CampaignEventLog:
+    """Append-only log of every campaign event, one file per campaign
+
+    Each line is `timestamp<TAB>type<TAB>recipient<TAB>department`. The reporting
+    engine loads it in bulk, so rows are kept to the fields reports group by. Writes
+    are buffered and flushed every flush_events events or flush_interval seconds.
+    CampaignManager passes the department in resolved (see core.aggregates.DepartmentLookup);
+    otherwise it is taken from the event or its target.
+    """
+
+    def __init__(self, base_dir: Path, flush_events: int = 1000, flush_interval: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.base_dir = Path(base_dir)
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.buffers = {}
+        self.files = {}
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+
+    def path(self, campaign: str) -> Path:
+        return self.base_dir / campaign / 'logs' / EVENT_LOG
+
+    @staticmethod
+    def row(event: Dict, department: Optional[str] = None) -> str:
+        if department is None:
+            department = event.get('department') or (event.get('target') or {}).get('department')
+        return (f"{event_time(event):.3f}\t{_field(event.get('type'))}\t"
+                f"{_field(event_recipient(event))}\t{_field(department)}\n")
+
+    def record(self, event: Dict, department: Optional[str] = None):
+        line = self.row(event, department)
+        with self.lock:
+            self.buffers.setdefault(event['campaign'], []).append(line)
+            self.pending += 1
+
+    def maybe_flush(self):
+        if self.pending and (self.pending >= self.flush_events or
+                             time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            for campaign, lines in self.buffers.items():
+                handle = self.files.get(campaign)
+                if handle is None:
+                    if not (self.base_dir / campaign).is_dir():
+                        self.logger.warning(f"Dropping {len(lines)} events for unknown campaign '{campaign}'")
+                        continue
+                    path = self.path(campaign)
+                    path.parent.mkdir(exist_ok=True)
+                    handle = self.files[campaign] = open(path, 'a', encoding='utf-8')
+                handle.write(''.join(lines))
+                handle.flush()
+            self.buffers = {}
+            self.pending = 0
+            self.last_flush = time.monotonic()
+
+    def forget(self, campaign: str):
+        """Drop buffered events and close the file of a campaign being deleted"""
+        with self.lock:
+            self.pending -= len(self.buffers.pop(campaign, []))
+            handle = self.files.pop(campaign, None)
+        if handle:
+            handle.close()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            for handle in self.files.values():
+                handle.close()
+            self.files = {}
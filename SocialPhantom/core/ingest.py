@@ -0,0 +1,208 @@
+import os
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+from core.campaign_store import campaign_dir, valid_campaign_name
+
+# Interaction types accepted from the HTTP front-ends
+INTERACTION_TYPES = {'open', 'click', 'credential', 'report'}
+
+
+class LoggingSink:
+    """Fallback sink for a front-end running without a campaign manager to publish to"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def publish_many(self, events: List[Dict]):
+        for event in events:
+            self.logger.info(f"{event['type']} for campaign {event['campaign']}")
+
+
+class EventIngestor:
+    """Single entry point for opens, clicks and submissions coming from the HTTP servers
+
+    submit() only takes a lock and appends to a buffer. A background thread forwards
+    batches to the sink (an EventBus or EventBusClient). Repeated hits for the same
+    (campaign, type, recipient) within dedupe_window are dropped, and the buffer is
+    bounded by max_pending. When the buffer is full, submit() waits up to block_timeout
+    for the forwarder to catch up and then drops the event.
+    """
+
+    def __init__(self, sink, batch_size: int = 500, flush_interval: float = 0.5,
+                 dedupe_window: float = 30.0, max_pending: int = 10000,
+                 block_timeout: float = 0.1, max_dedupe_keys: int = 100000):
+        self.logger = logging.getLogger(__name__)
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self.max_dedupe_keys = max_dedupe_keys
+        self.pending = []
+        self.recent = OrderedDict()
+        self.stats = {'accepted': 0, 'duplicates': 0, 'dropped': 0, 'rejected': 0, 'forwarded': 0, 'failed': 0}
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.running = True
+        self.thread = threading.Thread(target=self._forward_loop, daemon=True)
+        self.thread.start()
+
+    def _is_duplicate(self, key, now: float) -> bool:
+        # Keys are kept in first-seen order, so expired ones are always at the front
+        while self.recent:
+            oldest_key, seen = next(iter(self.recent.items()))
+            if now - seen < self.dedupe_window and len(self.recent) < self.max_dedupe_keys:
+                break
+            self.recent.popitem(last=False)
+        if key in self.recent:
+            return True
+        self.recent[key] = now
+        return False
+
+    def submit(self, campaign: str, event_type: str, recipient: Optional[str] = None,
+               **details) -> bool:
+        """Queue one interaction; False if it was a duplicate, had to be dropped or names no valid campaign"""
+        if event_type not in INTERACTION_TYPES:
+            raise ValueError(f"Unknown interaction type: {event_type}")
+        if not valid_campaign_name(campaign):
+            # Names come from request paths and form fields; never forward one that is not a plain name
+            with self.lock:
+                self.stats['rejected'] += 1
+            return False
+        now = time.monotonic()
+        event = dict(details, campaign=campaign, type=event_type, recipient=recipient,
+                     timestamp=time.time())
+        with self.lock:
+            if recipient is not None and self._is_duplicate((campaign, event_type, recipient), now):
+                self.stats['duplicates'] += 1
+                return False
+            if len(self.pending) >= self.max_pending:
+                self.not_full.wait_for(lambda: len(self.pending) < self.max_pending or not self.running,
+                                       self.block_timeout)
+                if len(self.pending) >= self.max_pending:
+                    self.stats['dropped'] += 1
+                    return False
+            self.pending.append(event)
+            self.stats['accepted'] += 1
+            if len(self.pending) >= self.batch_size:
+                self.not_empty.notify()
+        return True
+
+    def _take_batch(self) -> List[Dict]:
+        with self.lock:
+            self.not_empty.wait_for(lambda: len(self.pending) >= self.batch_size or not self.running,
+                                    self.flush_interval)
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            self.not_full.notify_all()
+        return batch
+
+    def _forward(self, batch: List[Dict]):
+        try:
+            self.sink.publish_many(batch)
+            with self.lock:
+                self.stats['forwarded'] += len(batch)
+        except Exception as e:
+            with self.lock:
+                self.stats['failed'] += len(batch)
+            self.logger.error(f"Failed to forward {len(batch)} events: {e}")
+
+    def _forward_loop(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._forward(batch)
+            elif not self.running:
+                return
+
+    def metrics(self) -> Dict:
+        with self.lock:
+            return dict(self.stats, pending=len(self.pending))
+
+    def close(self, timeout: Optional[float] = 5):
+        """Forward whatever is still buffered and stop the background thread"""
+        with self.lock:
+            self.running = False
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        self.thread.join(timeout)
+
+
+class RecipientTokens:
+    """Resolves the `r=` token of a tracked link to the recipient it was sent to
+
+    Tokens are assigned when targets are queued, so they are read from the campaign's
+    send queue (queue.db) through a read-only connection and kept in a bounded LRU cache.
+    Unknown tokens and campaign names that do not name a campaign directory resolve to None.
+    """
+
+    def __init__(self, base_dir: Path, cache_size: int = 100000):
+        self.logger = logging.getLogger(__name__)
+        self.base_dir = Path(base_dir)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.connections = {}
+        self.lock = threading.Lock()
+
+    def recipient(self, campaign: str, token: Optional[str]) -> Optional[str]:
+        if not token:
+            return None
+        key = (campaign, token)
+        with self.lock:
+            recipient = self.cache.get(key)
+            if recipient is not None:
+                self.cache.move_to_end(key)
+                return recipient
+            recipient = self._lookup(campaign, token)
+            if recipient is not None:
+                self.cache[key] = recipient
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return recipient
+
+    def _lookup(self, campaign: str, token: str) -> Optional[str]:
+        """Read the recipient behind a token from the send queue; called with self.lock held"""
+        conn = self.connections.get(campaign)
+        if conn is None:
+            path = campaign_dir(self.base_dir, campaign)
+            if path is None or not (path / 'queue.db').exists():
+                return None
+            conn = self.connections[campaign] = sqlite3.connect(
+                (path / 'queue.db').resolve().as_uri() + '?mode=ro', uri=True, check_same_thread=False)
+        try:
+            row = conn.execute("SELECT recipient FROM sends WHERE token = ?", (token,)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Token lookup failed for campaign '{campaign}': {e}")
+            return None
+        return row[0] if row else None
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections = {}
+
+
+def ingestor_from_env(**kwargs) -> EventIngestor:
+    """Build an ingestor for a front-end process
+
+    When SOCIALPHANTOM_EVENT_BUS is set to host:port of CampaignManager.serve_events(),
+    events are published there, authenticated with the hex-encoded key in
+    SOCIALPHANTOM_EVENT_AUTHKEY, which is then required. Otherwise they are only logged.
+    """
+    address = os.environ.get('SOCIALPHANTOM_EVENT_BUS')
+    if not address:
+        return EventIngestor(LoggingSink(), **kwargs)
+    from core.event_bus import EventBusClient
+    host, port = address.rsplit(':', 1)
+    key = os.environ.get('SOCIALPHANTOM_EVENT_AUTHKEY')
+    if not key:
+        raise ValueError("SOCIALPHANTOM_EVENT_AUTHKEY must be set to the key returned by serve_events()")
+    authkey = bytes.fromhex(key)
+    return EventIngestor(EventBusClient((host, int(port)), authkey), **kwargs)
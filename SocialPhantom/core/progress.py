@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, TextIO
+
+
+class RunProgress:
+    """In-memory delivery counters for one campaign run
+
+    The delivery callbacks count every outcome as it happens, so readers get queued,
+    sent, failed, current throughput and ETA from memory instead of polling queue.db
+    or the stats files. Throughput is measured over the last `window` seconds of
+    snapshots, so it follows the relay's current speed rather than the run average.
+    """
+
+    def __init__(self, queued: int = 0, window: float = 10.0):
+        self.queued = queued
+        self.sent = 0
+        self.failed = 0
+        self.window = window
+        self.started = time.monotonic()
+        self.finished = None
+        self.samples = deque([(self.started, 0)])
+        self.lock = threading.Lock()
+
+    def record(self, success: bool):
+        with self.lock:
+            if success:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        """Counters plus msgs/sec over the recent window and the ETA in seconds (None if unknown)"""
+        now = self.finished or time.monotonic()
+        with self.lock:
+            sent, failed = self.sent, self.failed
+            done = sent + failed
+            if now > self.samples[-1][0]:
+                self.samples.append((now, done))
+            while len(self.samples) > 2 and now - self.samples[1][0] >= self.window:
+                self.samples.popleft()
+            since, done_then = self.samples[0]
+        rate = (done - done_then) / (now - since) if now > since else 0.0
+        remaining = max(self.queued - done, 0)
+        return {
+            'queued': self.queued,
+            'sent': sent,
+            'failed': failed,
+            'remaining': remaining,
+            'rate': round(rate, 1),
+            'eta': round(remaining / rate) if rate > 0 else (0 if not remaining else None),
+            'elapsed': round(now - self.started, 1),
+        }
+
+
+def format_progress(snapshot: Dict) -> str:
+    eta = snapshot['eta']
+    eta = 'unknown' if eta is None else f"{eta // 3600}:{eta % 3600 // 60:02d}:{eta % 60:02d}"
+    return (f"queued {snapshot['queued']} | sent {snapshot['sent']} | failed {snapshot['failed']} | "
+            f"{snapshot['rate']:.1f} msg/s | ETA {eta}")
+
+
+class ProgressPrinter:
+    """Writes a RunProgress line to a stream every `interval` seconds from a daemon thread
+
+    On a terminal the line is redrawn in place; otherwise one line is written per update.
+    """
+
+    def __init__(self, progress: RunProgress, stream: TextIO, interval: float = 1.0):
+        self.progress = progress
+        self.stream = stream
+        self.interval = interval
+        self.in_place = hasattr(stream, 'isatty') and stream.isatty()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self._write()
+
+    def _write(self, final: bool = False):
+        line = format_progress(self.progress.snapshot())
+        if self.in_place:
+            self.stream.write('\r\x1b[K' + line + ('\n' if final else ''))
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+    def stop(self):
+        """Stop the thread and write the final counters"""
+        self.stopped.set()
+        self.thread.join()
+        self._write(final=True)
@@ -0,0 +1,213 @@
+import csv
+import html
+import math
+import logging
+import statistics
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import compress
+from pathlib import Path
+from typing import Dict, List
+
+EVENT_TYPES = ('email_sent', 'open', 'click', 'credential', 'report', 'bec_reply', 'bec_transfer')
+TYPE_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+# Recipient stages reported per department and per hour, with their column names
+STAGES = {'email_sent': 'sent', 'open': 'opened', 'click': 'clicked', 'credential': 'submitted',
+          'report': 'reported'}
+RATES = {'open': 'open_rate', 'click': 'click_rate', 'credential': 'submit_rate', 'report': 'report_rate'}
+# Interactions timed from delivery in the time-to-first-interaction histogram
+TIMED = ('open', 'click', 'credential')
+TTFI_BOUNDS = (300, 900, 3600, 4 * 3600, 24 * 3600)
+TTFI_LABELS = ('<5m', '5-15m', '15-60m', '1-4h', '4-24h', '>24h')
+UNKNOWN_DEPARTMENT = 'unknown'
+
+
+class EventColumns:
+    """A campaign event log held as parallel typed arrays, one slot per event
+
+    Recipients and departments are interned: rows refer to recipients by index, and
+    each recipient's department is stored once in recipient_departments.
+    """
+
+    def __init__(self):
+        self.times = array('d')
+        self.types = array('B')
+        self.recipients = array('L')
+        self.recipient_names = []
+        self.recipient_index = {}
+        self.recipient_departments = array('H')
+        self.department_names = [UNKNOWN_DEPARTMENT]
+        self.department_index = {UNKNOWN_DEPARTMENT: 0}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+def load_event_log(path: Path) -> EventColumns:
+    """Read a campaign events.log into columns, skipping unknown types and unattributed rows"""
+    columns = EventColumns()
+    times, types, recipients = columns.times, columns.types, columns.recipients
+    recipient_index, recipient_names = columns.recipient_index, columns.recipient_names
+    recipient_departments = columns.recipient_departments
+    department_index, department_names = columns.department_index, columns.department_names
+    if not Path(path).exists():
+        return columns
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) != 4 or not parts[2]:
+                continue
+            code = TYPE_CODES.get(parts[1])
+            if code is None:
+                continue
+            try:
+                timestamp = float(parts[0])
+            except ValueError:
+                continue
+            recipient = recipient_index.get(parts[2])
+            if recipient is None:
+                recipient = recipient_index[parts[2]] = len(recipient_names)
+                recipient_names.append(parts[2])
+                recipient_departments.append(0)
+            if parts[3] and parts[3] != UNKNOWN_DEPARTMENT:
+                department = department_index.get(parts[3])
+                if department is None:
+                    department = department_index[parts[3]] = len(department_names)
+                    department_names.append(parts[3])
+                recipient_departments[recipient] = department
+            times.append(timestamp)
+            types.append(code)
+            recipients.append(recipient)
+    return columns
+
+
+def first_times(columns: EventColumns) -> List[array]:
+    """Per event type, the earliest time each recipient reached it (inf if never)"""
+    first = [array('d', [math.inf]) * len(columns.recipient_names) for _ in EVENT_TYPES]
+    for timestamp, code, recipient in zip(columns.times, columns.types, columns.recipients):
+        column = first[code]
+        if timestamp < column[recipient]:
+            column[recipient] = timestamp
+    return first
+
+
+def add_rates(row: Dict) -> Dict:
+    """Add each interaction's rate per recipient sent to a row of stage counts"""
+    sent = row['sent']
+    for stage, rate in RATES.items():
+        row[rate] = round(row[STAGES[stage]] / sent, 4) if sent else 0.0
+    return row
+
+
+def _histogram(delays: List[float]) -> Dict:
+    """Bucket counts and median of sorted delays"""
+    edges = [bisect_left(delays, bound) for bound in TTFI_BOUNDS]
+    counts = [high - low for low, high in zip([0] + edges, edges + [len(delays)])]
+    return {'counts': counts, 'median': round(statistics.median(delays), 1) if delays else None}
+
+
+def build_report(columns: EventColumns) -> Dict:
+    """Department rates, time-to-first-interaction histograms and hourly funnel
+
+    Each measure is a bulk pass over a per-recipient column rather than a loop over events.
+    """
+    first = first_times(columns)
+    inf = math.inf
+
+    # Unique recipients reaching each stage, by department and by hour first reached
+    departments = [dict.fromkeys(STAGES.values(), 0) for _ in columns.department_names]
+    hourly = {}
+    for stage, name in STAGES.items():
+        column = first[TYPE_CODES[stage]]
+        reached = [timestamp != inf for timestamp in column]
+        for department, count in Counter(compress(columns.recipient_departments, reached)).items():
+            departments[department][name] = count
+        for hour, count in Counter(int(timestamp // 3600) for timestamp in compress(column, reached)).items():
+            hourly.setdefault(hour, dict.fromkeys(STAGES.values(), 0))[name] = count
+
+    sent = first[TYPE_CODES['email_sent']]
+    delays = {}
+    for name in TIMED:
+        delays[name] = sorted(max(timestamp - sent_at, 0.0)
+                              for sent_at, timestamp in zip(sent, first[TYPE_CODES[name]])
+                              if timestamp != inf and sent_at != inf)
+    earliest = map(min, *(first[TYPE_CODES[name]] for name in TIMED))
+    delays['any'] = sorted(max(timestamp - sent_at, 0.0) for sent_at, timestamp in zip(sent, earliest)
+                           if timestamp != inf and sent_at != inf)
+    histograms = {name: _histogram(values) for name, values in delays.items()}
+
+    overall = dict.fromkeys(STAGES.values(), 0)
+    for row in departments:
+        for name in overall:
+            overall[name] += row[name]
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'events': len(columns),
+        'recipients': len(columns.recipient_names),
+        'event_counts': {name: columns.types.count(code) for name, code in TYPE_CODES.items()},
+        'overall': add_rates(overall),
+        'departments': sorted((add_rates(dict(row, department=name))
+                               for name, row in zip(columns.department_names, departments) if any(row.values())),
+                              key=lambda row: row['department']),
+        'time_to_first_interaction': {
+            'buckets': list(TTFI_LABELS),
+            'counts': {name: histogram['counts'] for name, histogram in histograms.items()},
+            'median_seconds': {name: histogram['median'] for name, histogram in histograms.items()},
+        },
+        'hourly_funnel': [dict(hour=datetime.fromtimestamp(hour * 3600, timezone.utc).strftime('%Y-%m-%d %H:00'),
+                               **hourly[hour]) for hour in sorted(hourly)],
+    }
+
+
+def _write_csv(path: Path, fieldnames: List[str], rows: List[Dict]):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _html_table(fieldnames: List[str], rows: List[Dict]) -> str:
+    head = ''.join(f'<th>{html.escape(name)}</th>' for name in fieldnames)
+    body = ''.join('<tr>' + ''.join(f'<td>{html.escape(str(row.get(name, "")))}</td>' for name in fieldnames)
+                   + '</tr>' for row in rows)
+    return f'<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+def write_report(report: Dict, directory: Path, campaign_name: str) -> Dict[str, Path]:
+    """Write the report as CSV tables plus one HTML summary; returns the files by name"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    department_fields = ['department'] + list(STAGES.values()) + list(RATES.values())
+    funnel_fields = ['hour'] + list(STAGES.values())
+    ttfi = report['time_to_first_interaction']
+    ttfi_rows = [dict(bucket=label, **{name: counts[i] for name, counts in ttfi['counts'].items()})
+                 for i, label in enumerate(ttfi['buckets'])]
+    ttfi_fields = ['bucket'] + list(ttfi['counts'])
+
+    files = {name: directory / name for name in
+             ('departments.csv', 'time_to_first_interaction.csv', 'hourly_funnel.csv', 'report.html')}
+    _write_csv(files['departments.csv'], department_fields, report['departments'])
+    _write_csv(files['time_to_first_interaction.csv'], ttfi_fields, ttfi_rows)
+    _write_csv(files['hourly_funnel.csv'], funnel_fields, report['hourly_funnel'])
+
+    overall = dict(report['overall'], department='all')
+    medians = [dict(interaction=name, median_seconds=value) for name, value in ttfi['median_seconds'].items()]
+    with open(files['report.html'], 'w', encoding='utf-8') as f:
+        f.write(
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>Campaign report: {html.escape(campaign_name)}</title>'
+            '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:2em}'
+            'th,td{border:1px solid #ccc;padding:4px 8px;text-align:right}th{background:#eee}</style></head><body>'
+            f'<h1>Campaign report: {html.escape(campaign_name)}</h1>'
+            f'<p>Generated {html.escape(report["generated"])} from {report["events"]} events '
+            f'covering {report["recipients"]} recipients.</p>'
+            '<h2>Rates by department</h2>' + _html_table(department_fields, report['departments'] + [overall]) +
+            '<h2>Time to first interaction</h2>' + _html_table(ttfi_fields, ttfi_rows) +
+            _html_table(['interaction', 'median_seconds'], medians) +
+            '<h2>Hourly funnel (recipients first reaching each stage, UTC)</h2>' +
+            _html_table(funnel_fields, report['hourly_funnel']) +
+            '</body></html>')
+    logging.getLogger(__name__).info(f"Wrote report for campaign '{campaign_name}' to {directory}")
+    return files
@@ -0,0 +1,117 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+# Event type -> stats counter it increments
+EVENT_COUNTERS = {
+    'email_sent': 'emails_sent',
+    'open': 'opens',
+    'click': 'clicks',
+    'credential': 'credentials_captured',
+    'report': 'reports',
+    'bec_reply': 'bec_replies',
+    'bec_transfer': 'bec_transfers',
+}
+
+
+def atomic_write_json(path: Path, data: Dict):
+    """Write JSON to a temporary file in the same directory and rename it over the target"""
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+class CampaignStatsWriter:
+    """Aggregates campaign stat updates in memory and writes each campaign's config once per flush"""
+
+    def __init__(self, base_dir: Path, flush_interval: float = 1.0, flush_events: int = 1000,
+                 on_write: Optional[Callable[[Dict], None]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.base_dir = Path(base_dir)
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+        self.deltas = defaultdict(Counter)
+        self.last_activity = {}
+        self.pending_events = 0
+        self.last_flush = 0.0
+        self.lock = threading.Lock()
+        # Serializes every read-modify-write of a campaign config.json
+        self.write_lock = threading.RLock()
+        # Called with every campaign written, e.g. to keep the campaign index in sync
+        self.on_write = on_write
+
+    def record(self, event: Dict):
+        """Count an event against its campaign; O(1) regardless of config size"""
+        counter = EVENT_COUNTERS.get(event.get('type'))
+        with self.lock:
+            deltas = self.deltas[event['campaign']]
+            if counter:
+                deltas[counter] += 1
+            self.last_activity[event['campaign']] = datetime.now().isoformat()
+            self.pending_events += 1
+
+    def due(self) -> bool:
+        """Whether enough events or time accumulated since the last flush"""
+        return self.pending_events > 0 and (
+            self.pending_events >= self.flush_events or
+            time.monotonic() - self.last_flush >= self.flush_interval)
+
+    def maybe_flush(self):
+        if self.due():
+            self.flush()
+
+    def flush(self):
+        """Apply the accumulated deltas to each campaign's config.json atomically"""
+        with self.lock:
+            deltas, self.deltas = self.deltas, defaultdict(Counter)
+            last_activity, self.last_activity = self.last_activity, {}
+            self.pending_events = 0
+            self.last_flush = time.monotonic()
+
+        for name, counts in deltas.items():
+            try:
+                self.update(name, lambda campaign: self._apply(campaign, counts, last_activity.get(name)))
+            except Exception as e:
+                self.logger.error(f"Failed to flush stats for campaign '{name}': {e}")
+
+    def _apply(self, campaign: Dict, counts: Counter, last_activity: Optional[str]):
+        stats = campaign.setdefault('stats', {})
+        for key, value in counts.items():
+            stats[key] = stats.get(key, 0) + value
+        if last_activity:
+            stats['last_activity'] = last_activity
+
+        # Calculate success rates
+        total = stats.get('emails_sent', 0)
+        successes = stats.get('credentials_captured', 0)
+        if campaign.get('type') == 'BEC':
+            total = stats.get('bec_replies', 0)
+            successes = stats.get('bec_transfers', 0)
+        stats['success_rate'] = successes / total if total > 0 else 0
+
+    def update(self, name: str, change: Callable[[Dict], None]) -> Optional[Dict]:
+        """Read a campaign config, apply change to it and write it back atomically"""
+        config_path = self.base_dir / name / "config.json"
+        with self.write_lock:
+            if not config_path.exists():
+                self.logger.warning(f"Campaign '{name}' has no config.json")
+                return None
+            with open(config_path) as f:
+                campaign = json.load(f)
+            change(campaign)
+            atomic_write_json(config_path, campaign)
+            if self.on_write:
+                self.on_write(campaign)
+        return campaign
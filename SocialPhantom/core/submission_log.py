@@ -0,0 +1,108 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+# Form fields added by the cloner itself rather than typed by the user
+INTERNAL_FIELDS = {'campaign', 'r', 'honeypot'}
+
+
+class SubmissionLog:
+    """Append-only JSON-lines log of form submissions, one file per campaign per day
+
+    Field values never reach disk: an entry only says whether anything was entered
+    and which fields were present, as salted hashes of their names. Posts that fill the
+    hidden honeypot field are flagged as bots and never count as submitted. Buffered
+    entries are written within flush_interval even if no further submission arrives.
+    """
+
+    def __init__(self, directory: Path, flush_every: int = 50, flush_interval: float = 1.0,
+                 salt: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.salt = (salt or os.environ.get('SOCIALPHANTOM_SUBMISSION_SALT') or self._load_salt()).encode()
+        self.buffers = {}
+        self.files = {}
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def _load_salt(self) -> str:
+        """Per-installation salt, created on first use"""
+        salt_file = self.directory / '.salt'
+        if not salt_file.exists():
+            salt_file.write_text(secrets.token_hex(16))
+            os.chmod(salt_file, 0o600)
+        return salt_file.read_text().strip()
+
+    def hash_field(self, name: str) -> str:
+        return hashlib.sha256(self.salt + name.encode('utf-8')).hexdigest()[:16]
+
+    def record(self, campaign: str, form: Mapping[str, str], ip_address: Optional[str] = None,
+               user_agent: Optional[str] = None) -> Dict:
+        """Reduce a submission to flags and append it to today's file for the campaign"""
+        fields = [name for name in form.keys() if name not in INTERNAL_FIELDS]
+        bot = bool(str(form.get('honeypot', '')).strip())
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'campaign': campaign,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'submitted': not bot and any(str(form.get(name, '')).strip() for name in fields),
+            'bot': bot,
+            'fields': sorted(self.hash_field(name) for name in fields)
+        }
+        line = json.dumps(entry) + '\n'
+        safe_campaign = re.sub(r'[^A-Za-z0-9_.-]', '_', campaign).lstrip('.') or 'unknown'
+        filename = f"{safe_campaign}_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        with self.lock:
+            self.buffers.setdefault(filename, []).append(line)
+            self.pending += 1
+            if self.pending >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush_locked()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.flush_interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        return entry
+
+    def _flush_locked(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        for filename, lines in self.buffers.items():
+            handle = self.files.get(filename)
+            if handle is None:
+                handle = self.files[filename] = open(self.directory / filename, 'a', encoding='utf-8')
+            handle.write(''.join(lines))
+            handle.flush()
+        self.buffers = {}
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+        # Daily rotation: close handles for files from previous days
+        today = datetime.now().strftime('%Y%m%d')
+        for filename in [f for f in self.files if not f.endswith(f"_{today}.jsonl")]:
+            self.files.pop(filename).close()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            for handle in self.files.values():
+                handle.close()
+            self.files = {}
@@ -1,47 +1,74 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, redirect, send_from_directory, abort, url_for
+import atexit
+import html
+import json
 import logging
+import os
 from pathlib import Path
-import json
-from datetime import datetime
+from werkzeug.security import safe_join
+from core.campaign_store import campaign_dir
+from core.submission_log import SubmissionLog
+from core.ingest import RecipientTokens, ingestor_from_env
+from modules.html_rewriter import RECIPIENT_FIELD
+from modules.tracking_server import PIXEL
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
-CAPTURED_CREDS_DIR = Path("captured_credentials")
-CAPTURED_CREDS_DIR.mkdir(exist_ok=True)
+SUBMISSIONS_DIR = Path("submissions")
+submission_log = SubmissionLog(SUBMISSIONS_DIR)
+atexit.register(submission_log.close)
+# Forwards clicks and submissions to the campaign manager (see core/ingest.py)
+ingestor = ingestor_from_env()
+atexit.register(ingestor.close)
+# Resolves the r= token of tracked links through the campaigns' send queues
+recipient_tokens = RecipientTokens(Path(os.environ.get('SOCIALPHANTOM_CAMPAIGNS_DIR', 'campaigns')))
+atexit.register(recipient_tokens.close)
+
+def _recipient(campaign):
+    """Recipient behind the tracked link's r= token; None if the token is missing or unknown"""
+    return recipient_tokens.recipient(campaign, request.values.get('r'))
+
+def _landing_page(campaign):
+    """The campaign's landing_page setting, a path under campaigns/<name>/clones/"""
+    path = campaign_dir(recipient_tokens.base_dir, campaign)
+    try:
+        with open(path / "config.json") as f:
+            return json.load(f).get("settings", {}).get("landing_page") or "index.html"
+    except (OSError, TypeError, ValueError):
+        return "index.html"
+
+@app.route('/landing/<campaign>/<path:page>', methods=['GET'])
+def landing(campaign, page):
+    """Serve a cloned page or asset; forms on pages opened with a valid r= carry it to /capture"""
+    path = campaign_dir(recipient_tokens.base_dir, campaign)
+    if path is None:
+        abort(404)
+    clones = path.resolve() / "clones"
+    if not (page.endswith('.html') and _recipient(campaign)):
+        return send_from_directory(clones, page)
+    target = safe_join(str(clones), page)
+    if target is None or not os.path.isfile(target):
+        abort(404)
+    with open(target, encoding='utf-8') as f:
+        body = f.read().replace(RECIPIENT_FIELD,
+                                f'<input type="hidden" name="r" value="{html.escape(request.args["r"])}"/>')
+    return Response(body, mimetype='text/html', headers={'Cache-Control': 'no-store'})
 
 @app.route('/capture', methods=['POST'])
 def capture_credentials():
-    """Endpoint to capture submitted credentials"""
+    """Endpoint recording that a form was submitted (field values are never stored)"""
     try:
         data = request.form
         campaign = data.get('campaign', 'unknown')
         
-        # Log the credentials
-        creds_file = CAPTURED_CREDS_DIR / f"{campaign}_{datetime.now().strftime('%Y%m%d')}.json"
-        
-        entry = {
-            'timestamp': datetime.now().isoformat(),
-            'campaign': campaign,
-            'ip_address': request.remote_addr,
-            'user_agent': request.user_agent.string,
-            'credentials': dict(data)
-        }
-        
-        # Append to existing file or create new
-        if creds_file.exists():
-            with open(creds_file, 'r+') as f:
-                existing = json.load(f)
-                existing.append(entry)
-                f.seek(0)
-                json.dump(existing, f, indent=2)
-        else:
-            with open(creds_file, 'w') as f:
-                json.dump([entry], f, indent=2)
-        
-        logger.info(f"Captured credentials for campaign: {campaign}")
+        entry = submission_log.record(campaign, data, request.remote_addr, request.user_agent.string)
+        recipient = _recipient(campaign)
+        if entry['submitted'] and recipient:
+            ingestor.submit(campaign, 'credential', recipient)
+        logger.info(f"Recorded submission for campaign: {campaign}")
         
         # Redirect to original site or show success message
         return """
@@ -58,15 +85,27 @@ def capture_credentials():
         """
         
     except Exception as e:
-        logger.error(f"Failed to capture credentials: {e}")
+        logger.error(f"Failed to record submission: {e}")
         return jsonify({'status': 'error'}), 500
 
 @app.route('/track/<campaign>', methods=['GET'])
 def track_click(campaign):
-    """Endpoint to track email link clicks"""
+    """Endpoint to track email link clicks, and opens through the pixel (open=1)"""
     try:
-        logger.info(f"Click tracked for campaign: {campaign}")
-        return jsonify({'status': 'success'})
+        event_type = 'open' if request.args.get('open') else 'click'
+        recipient = _recipient(campaign)
+        if recipient:
+            ingestor.submit(campaign, event_type, recipient)
+            logger.debug(f"{event_type.capitalize()} tracked for campaign: {campaign}")
+        else:
+            # Unattributed hits would merge everyone behind one address and match no recipient
+            logger.debug(f"Ignoring {event_type} without a valid recipient token for campaign: {campaign}")
+        if event_type == 'open':
+            return Response(PIXEL, mimetype='image/png',
+                            headers={'Cache-Control': 'no-store, no-cache, must-revalidate'})
+        # Only a token that resolved is passed on to the landing page's forms
+        args = {'r': request.args['r']} if recipient else {}
+        return redirect(url_for('landing', campaign=campaign, page=_landing_page(campaign), **args))
     except Exception as e:
         logger.error(f"Failed to track click: {e}")
         return jsonify({'status': 'error'}), 500
@@ -0,0 +1,190 @@
+import os
+import shutil
+import hashlib
+import logging
+import mimetypes
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+class AssetCache:
+    """Content-addressed store of downloaded assets shared by every WebCloner run
+
+    Blobs are stored once under blobs/<sha256[:2]>/<sha256>, and a SQLite index maps
+    each URL to its blob and validators (ETag/Last-Modified). A cached URL is
+    revalidated with a conditional GET once max_age has passed. Blobs are hard-linked
+    into campaign asset directories, so a repeat clone takes no extra disk, and the
+    least recently used blobs are evicted once the store exceeds max_bytes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 256 * 1024 * 1024, max_age: float = 300):
+        self.logger = logging.getLogger(__name__)
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                checked REAL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+        """)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+
+    def _lookup(self, url: str) -> Optional[Tuple]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest, ext, etag, last_modified, checked FROM urls WHERE url = ?", (url,)).fetchone()
+        if row and not self.blob_path(row[0]).exists():
+            return None
+        return row
+
+    def _touch(self, url: str, digest: str, checked: Optional[float] = None):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (now, digest))
+            if checked:
+                self.conn.execute("UPDATE urls SET checked = ? WHERE url = ?", (checked, url))
+
+    def fetch(self, session, url: str, throttle=nullcontext) -> Tuple[str, str]:
+        """Return (digest, extension) for url, downloading only when it is new or changed
+
+        throttle() wraps every network request, e.g. a per-host politeness slot, so
+        fresh cache hits never wait on it.
+        """
+        headers = {}
+        cached = self._lookup(url)
+        if cached:
+            digest, ext, etag, last_modified, checked = cached
+            if time.time() - checked < self.max_age:
+                self._touch(url, digest)
+                return digest, ext
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        with throttle():
+            response = session.get(url, headers=headers, stream=True)
+            if cached and response.status_code == 304:
+                response.close()
+                self._touch(url, digest, checked=time.time())
+                return digest, ext
+            response.raise_for_status()
+            return self._store(url, response)
+
+    def _store(self, url: str, response) -> Tuple[str, str]:
+        """Stream a response into the store, hashing it on the way"""
+        ext = mimetypes.guess_extension(response.headers.get('content-type', '').split(';')[0].strip()) or '.bin'
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.blobs_dir), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(65536):
+                    sha256.update(chunk)
+                    f.write(chunk)
+            size = os.path.getsize(tmp_path)
+            digest = sha256.hexdigest()
+            blob = self.blob_path(digest)
+            blob.parent.mkdir(exist_ok=True)
+            if blob.exists():
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, blob)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO blobs (digest, size, last_used) VALUES (?, ?, ?)",
+                              (digest, size, now))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO urls (url, digest, ext, etag, last_modified, checked) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, ext, response.headers.get('ETag'), response.headers.get('Last-Modified'), now))
+        return digest, ext
+
+    def fetch_into(self, session, url: str, directory: Path, throttle=nullcontext) -> Path:
+        """fetch() url and place its blob in directory, then evict down to max_bytes"""
+        for _ in range(2):
+            digest, ext = self.fetch(session, url, throttle)
+            target = self.link_into(digest, ext, directory)
+            if target is not None:
+                self._evict(keep=digest)
+                return target
+        # Evicted by a concurrent fetch both times
+        raise FileNotFoundError(f"Cached asset for {url} was evicted before it could be linked")
+
+    def link_into(self, digest: str, ext: str, directory: Path) -> Optional[Path]:
+        """Place a blob in directory as <digest><ext>, hard-linked when the filesystem allows
+
+        Returns None if the blob is no longer in the store.
+        """
+        target = Path(directory) / f"{digest[:32]}{ext}"
+        blob = self.blob_path(digest)
+        # Held so eviction cannot remove the blob mid-link
+        with self.lock:
+            if not blob.exists():
+                return None
+            if not target.exists():
+                try:
+                    os.link(blob, target)
+                except FileExistsError:
+                    pass
+                except OSError:
+                    shutil.copyfile(blob, target)
+        return target
+
+    def size(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least recently used blobs (other than keep) until the store fits in max_bytes"""
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for digest, size in self.conn.execute(
+                    "SELECT digest, size FROM blobs WHERE digest IS NOT ? ORDER BY last_used", (keep,)).fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append(digest)
+                total -= size
+            self.conn.executemany("DELETE FROM blobs WHERE digest = ?", [(d,) for d in evicted])
+            self.conn.executemany("DELETE FROM urls WHERE digest = ?", [(d,) for d in evicted])
+            for digest in evicted:
+                try:
+                    os.unlink(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+        if evicted:
+            self.logger.info(f"Evicted {len(evicted)} cached assets")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,249 @@
+import asyncio
+import base64
+import logging
+import smtplib
+import socket
+from email import policy
+from email.utils import parseaddr
+from typing import Dict, List, Optional, Tuple, Union
+from .email_sender import BaseEmailSender
+from .scheduler import DeliveryScheduler, SendWindow
+
+
+class AsyncSMTPConnection:
+    """Minimal asyncio SMTP client speaking implicit TLS (SMTPS) like smtplib.SMTP_SSL"""
+
+    def __init__(self, config: Dict, ssl_context, max_messages: int = 100, timeout: float = 30):
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.ssl_context = ssl_context
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.esmtp_features = {}
+        self.messages_sent = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def _read_reply(self) -> Tuple[int, str]:
+        """Read a (possibly multi-line) SMTP reply"""
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not line:
+                self.reset()
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            code, sep, text = line[:3], line[3:4], line[4:].strip()
+            lines.append(text.decode('utf-8', 'replace'))
+            if sep != b'-':
+                try:
+                    return int(code), "\n".join(lines)
+                except ValueError:
+                    raise smtplib.SMTPResponseException(-1, line.decode('utf-8', 'replace'))
+
+    async def _command(self, command: str, expected=(250,)) -> Tuple[int, str]:
+        """Send one command line and check the reply code"""
+        self.writer.write(command.encode('utf-8') + b'\r\n')
+        await self.writer.drain()
+        code, text = await self._read_reply()
+        if code not in expected:
+            raise smtplib.SMTPResponseException(code, text)
+        return code, text
+
+    async def connect(self):
+        """Open the connection, say EHLO and authenticate"""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.config['smtp_server'], self.config['smtp_port'],
+                                    ssl=self.ssl_context),
+            self.timeout)
+        code, text = await self._read_reply()
+        if code != 220:
+            raise smtplib.SMTPConnectError(code, text)
+
+        _, text = await self._command(f"EHLO {socket.getfqdn()}")
+        self.esmtp_features = {}
+        for line in text.split("\n")[1:]:
+            keyword, _, params = line.partition(' ')
+            self.esmtp_features[keyword.lower()] = params
+
+        if self.config.get('username'):
+            await self._login(self.config['username'], self.config['password'])
+        self.messages_sent = 0
+
+    async def _login(self, username: str, password: str):
+        """Authenticate with AUTH PLAIN, falling back to AUTH LOGIN"""
+        mechanisms = self.esmtp_features.get('auth', '').upper().split()
+        if 'PLAIN' in mechanisms or not mechanisms:
+            token = base64.b64encode(f"\0{username}\0{password}".encode('utf-8')).decode('ascii')
+            await self._command(f"AUTH PLAIN {token}", expected=(235,))
+        else:
+            await self._command("AUTH LOGIN", expected=(334,))
+            await self._command(base64.b64encode(username.encode('utf-8')).decode('ascii'), expected=(334,))
+            await self._command(base64.b64encode(password.encode('utf-8')).decode('ascii'), expected=(235,))
+
+    async def send_message(self, msg, from_addr: Optional[str] = None,
+                           to_addrs: Optional[List[str]] = None):
+        """Send a message, reconnecting once if the relay dropped the session"""
+        if self.connected and self.max_messages and self.messages_sent >= self.max_messages:
+            await self.close()
+        if not self.connected:
+            await self.connect()
+        try:
+            await self._transaction(msg, from_addr, to_addrs)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.logger.debug("SMTP session dropped, reconnecting")
+            self.reset()
+            await self.connect()
+            await self._transaction(msg, from_addr, to_addrs)
+        self.messages_sent += 1
+
+    async def _transaction(self, msg, from_addr: Optional[str], to_addrs: Optional[List[str]]):
+        """Run MAIL/RCPT/DATA for a single message"""
+        from_addr = from_addr or parseaddr(msg['From'])[1]
+        to_addrs = to_addrs or [parseaddr(msg['To'])[1]]
+        try:
+            await self._command(f"MAIL FROM:<{from_addr}>")
+            for addr in to_addrs:
+                await self._command(f"RCPT TO:<{addr}>", expected=(250, 251))
+            await self._command("DATA", expected=(354,))
+        except smtplib.SMTPResponseException:
+            await self._command("RSET")
+            raise
+
+        data = msg.as_bytes(policy=policy.SMTP)
+        if data.startswith(b'.'):
+            data = b'.' + data
+        data = data.replace(b'\r\n.', b'\r\n..')
+        if not data.endswith(b'\r\n'):
+            data += b'\r\n'
+        self.writer.write(data + b'.\r\n')
+        await self.writer.drain()
+        code, text = await self._read_reply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, text)
+
+    def reset(self):
+        """Discard the current connection without a clean QUIT"""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def close(self):
+        """Close the connection gracefully"""
+        if not self.connected:
+            self.reset()
+            return
+        try:
+            await self._command("QUIT", expected=(221,))
+        except Exception:
+            pass
+        finally:
+            self.reset()
+
+
+class AsyncEmailSender(BaseEmailSender):
+    """asyncio delivery engine with bounded concurrency and pooled relay connections"""
+
+    def __init__(self, config_file='config/email_config.json', max_concurrency=None,
+                 scheduler: Optional[DeliveryScheduler] = None):
+        super().__init__(config_file, scheduler)
+        settings = self.config or {}
+        self.max_concurrency = max_concurrency or settings.get('max_concurrency', 100)
+        self.max_retries = 3
+        self._pools = {}
+
+    def _pool_for(self, relay: Tuple[str, int]) -> "asyncio.Queue":
+        """Return the idle-connection pool for a relay, creating it on first use"""
+        if relay not in self._pools:
+            pool = asyncio.Queue()
+            for _ in range(self.pool_size):
+                pool.put_nowait(AsyncSMTPConnection(self.config, self.ssl_context,
+                                                    max_messages=self.max_messages_per_connection))
+            self._pools[relay] = pool
+        return self._pools[relay]
+
+    async def _deliver(self, msg, recipient: str, window: Optional[SendWindow] = None) -> Dict:
+        """Send one message over a pooled connection with retries"""
+        pool = self._pool_for((self.config['smtp_server'], self.config['smtp_port']))
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            await self.scheduler.acquire_async(recipient, window)
+            connection = await pool.get()
+            try:
+                await connection.send_message(msg)
+                return {'recipient': recipient, 'success': True, 'attempts': attempt, 'error': None}
+            except Exception as e:
+                error = str(e)
+                connection.reset()
+            finally:
+                pool.put_nowait(connection)
+            if attempt < self.max_retries:
+                await asyncio.sleep(2 ** (attempt - 1))  # Exponential backoff
+        return {'recipient': recipient, 'success': False, 'attempts': self.max_retries, 'error': error}
+
+    async def send_phishing_email(self, template_file: str, recipient: str,
+                                  campaign_name: Optional[str] = None,
+                                  variables: Optional[Dict] = None,
+                                  attachments: Optional[List[str]] = None,
+                                  window: Optional[SendWindow] = None) -> Dict:
+        """Build and send one phishing email, returning its delivery result"""
+        if not self.config:
+            return {'recipient': recipient, 'success': False, 'attempts': 0,
+                    'error': "Email configuration not loaded"}
+        try:
+            msg = self.build_message(template_file, recipient, campaign_name, variables, attachments)
+        except Exception as e:
+            self.logger.error(f"Failed to prepare email: {e}", exc_info=True)
+            return {'recipient': recipient, 'success': False, 'attempts': 0, 'error': str(e)}
+
+        result = await self._deliver(msg, recipient, window)
+        if result['success']:
+            self.logger.info(f"Sent email to {recipient} (campaign: {campaign_name})")
+        else:
+            self.logger.error(f"Failed to send email to {recipient} after {result['attempts']} attempts: {result['error']}")
+        return result
+
+    async def send_batch(self, template_file: str, recipients: List[Union[str, Dict]],
+                         campaign_name: Optional[str] = None,
+                         variables: Optional[Dict] = None,
+                         attachments: Optional[List[str]] = None,
+                         keep_open: bool = False,
+                         window: Optional[SendWindow] = None) -> List[Dict]:
+        """Send to many recipients concurrently and return per-recipient results
+
+        Recipients may be addresses or target dicts with an 'email' key; target
+        fields are merged over the shared template variables, and window is the
+        campaign's send window. With keep_open the
+        pooled connections stay up for the next batch on the same event loop, and
+        the caller awaits close() once it is done.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send_one(target):
+            if isinstance(target, dict):
+                recipient = target['email']
+                merged = {**(variables or {}), **target}
+            else:
+                recipient, merged = target, variables
+            async with semaphore:
+                return await self.send_phishing_email(template_file, recipient, campaign_name,
+                                                      merged, attachments, window)
+
+        try:
+            return await asyncio.gather(*(send_one(target) for target in recipients))
+        finally:
+            if not keep_open:
+                await self.close()
+
+    async def close(self):
+        """Close every pooled connection"""
+        for pool in self._pools.values():
+            while not pool.empty():
+                await pool.get_nowait().close()
+        self._pools = {}
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Nothing runs in the background between batches"""
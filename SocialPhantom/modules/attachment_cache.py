@@ -0,0 +1,62 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from email.mime.application import MIMEApplication
+from pathlib import Path
+
+
+class AttachmentCache:
+    """Size-bounded LRU of pre-encoded attachment parts shared by every message that uses them"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.logger = logging.getLogger(__name__)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def _encode(self, path: str) -> MIMEApplication:
+        """Read and base64-encode an attachment into a MIME part"""
+        name = Path(path).name
+        with open(path, 'rb') as f:
+            part = MIMEApplication(f.read(), Name=name)
+        part['Content-Disposition'] = f'attachment; filename="{name}"'
+        return part
+
+    def get(self, path) -> MIMEApplication:
+        """Return the encoded part for a file, encoding it only on first use or after it changed
+
+        The same part object is attached to every message, so callers must not modify it.
+        """
+        path = str(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == stamp:
+                self.entries.move_to_end(path)
+                return entry[1]
+
+        part = self._encode(path)
+        encoded_size = len(part.get_payload())
+        if encoded_size > self.max_bytes:
+            self.logger.warning(f"Attachment {path} exceeds the attachment cache size, not caching it")
+            return part
+
+        with self.lock:
+            previous = self.entries.pop(path, None)
+            if previous:
+                self.size -= previous[2]
+            self.entries[path] = (stamp, part, encoded_size)
+            self.size += encoded_size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+        return part
+
+    def clear(self):
+        """Drop every cached part (messages already built keep theirs)"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
@@ -1,19 +1,31 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import html
 import logging
 from typing import List, Dict, Optional
 from pathlib import Path
 import json
-from datetime import datetime
+from .scheduler import DeliveryScheduler, SendWindow
+from .template_engine import template_cache
+from .tracking_store import TrackingStore
+from .tracking_server import TrackingServer, pixel_url, tracking_settings
+from .smtp_pool import connect_smtp
 
 class BECSimulator:
-    def __init__(self, config_path: str = "config/email_config.json"):
+    def __init__(self, config_path: str = "config/email_config.json",
+                 scheduler: Optional[DeliveryScheduler] = None,
+                 templates_dir: str = "templates/bec",
+                 tracking_store: Optional[TrackingStore] = None):
         self.logger = logging.getLogger(__name__)
         self.config = self._load_config(config_path)
-        self.templates_dir = Path("templates/bec")
+        self.scheduler = scheduler or DeliveryScheduler.from_config(self.config)
+        self.strict_templates = self.config.get('strict_templates', False)
+        self.templates_dir = Path(templates_dir)
         self.templates_dir.mkdir(parents=True, exist_ok=True)
-        self.tracking_data = {}  # Stores tracking information for each email
+        # An empty store is falsy (it has __len__), so test against None
+        self.tracking_store = tracking_store if tracking_store is not None else TrackingStore()
+        # Where the pixel server listens and the base URL pixels point at
+        self.tracking = tracking_settings(self.config)
         self.tracking_server = None
 
     def _load_config(self, config_path: str) -> Dict:
@@ -40,37 +52,40 @@ class BECSimulator:
         msg['To'] = target['email']
         msg['Subject'] = target.get('subject', 'Urgent: Wire Transfer Required')
         
-        with open(self.templates_dir / f"{template}.html") as f:
-            body = f.read()
-        
         # Personalize template with all target variables
-        for key, value in target.items():
-            body = body.replace(f'{{{{{key}}}}}', str(value))
+        body = template_cache.get(self.templates_dir / f"{template}.html").render(
+            target, strict=self.strict_templates)
         
         msg.attach(MIMEText(body, 'html'))
         return msg
 
-    def send_bec_email(self, template: str, target: Dict, sender_spoof: str) -> bool:
-        """Send BEC simulation email with spoofed sender"""
+    def send_bec_email(self, template: str, target: Dict, sender_spoof: str,
+                       campaign_name: Optional[str] = None, window: Optional[SendWindow] = None) -> bool:
+        """Send BEC simulation email with spoofed sender
+
+        The pixel carries target['tracking_token'] (the send queue's token) when given,
+        otherwise a fresh opaque token; with a campaign it uses the /track/<campaign>?r= route.
+        window is the campaign's send window, applied to this message only.
+        """
         try:
             message = self._create_message(template, target, sender_spoof)
             
-            # Add tracking pixel
-            tracking_pixel = f"<img src='http://localhost:8000/track/{target['email']}' style='display:none;'>"
+            # Add tracking pixel carrying an opaque token rather than the address
+            token = target.get('tracking_token') or self.tracking_store.new_token()
+            if campaign_name:
+                src = pixel_url(self.tracking['url'], campaign_name, token)
+            else:
+                src = f"{self.tracking['url']}/track/{token}"
+            tracking_pixel = f"<img src='{html.escape(src)}' style='display:none;'>"
             message.attach(MIMEText(tracking_pixel, 'html'))
             
-            with smtplib.SMTP_SSL(self.config['smtp_server'], self.config['smtp_port']) as server:
+            self.scheduler.acquire(target['email'], window)
+            with connect_smtp(self.config) as server:
                 server.login(self.config['username'], self.config['password'])
                 server.send_message(message)
-            
-            # Initialize tracking data
-            self.tracking_data[target['email']] = {
-                'sent_time': datetime.now(),
-                'opened': False,
-                'replied': False,
-                'forwarded': False,
-                'attachments_opened': 0
-            }
+            # Only delivered mails are tracked, timed from when they left rather than from
+            # before the rate-limit wait
+            self.tracking_store.register(target['email'], token=token)
             
             self.logger.info(f"Sent BEC email to {target['email']} spoofing {sender_spoof}")
             return True
@@ -80,19 +95,18 @@ class BECSimulator:
 
     def get_tracking_data(self, email: str) -> Optional[Dict]:
         """Get tracking data for a specific email"""
-        return self.tracking_data.get(email)
+        return self.tracking_store.get(email)
 
-    def start_tracking_server(self, port: int = 8000) -> bool:
-        """Start the tracking server"""
+    def start_tracking_server(self, port: Optional[int] = None, host: Optional[str] = None, ingestor=None,
+                              campaign: Optional[str] = None) -> bool:
+        """Start the tracking server, optionally forwarding opens to an event ingestor
+
+        host and port default to the config's tracking_server section.
+        """
         try:
-            from .tracking_server import run_tracking_server
-            import threading
-            
-            self.tracking_server = threading.Thread(
-                target=run_tracking_server,
-                args=(self.tracking_data, port),
-                daemon=True
-            )
+            port = self.tracking['port'] if port is None else port
+            host = host or self.tracking['host']
+            self.tracking_server = TrackingServer(self.tracking_store, port, host, ingestor, campaign)
             self.tracking_server.start()
             self.logger.info(f"Tracking server started on port {port}")
             return True
@@ -100,6 +114,12 @@ class BECSimulator:
             self.logger.error(f"Failed to start tracking server: {e}")
             return False
 
+    def stop_tracking_server(self):
+        """Stop the tracking server gracefully"""
+        if self.tracking_server:
+            self.tracking_server.stop()
+            self.tracking_server = None
+
     def get_available_templates(self) -> List[str]:
         """List all available BEC templates"""
         return [f.stem for f in self.templates_dir.glob("*.html") 
@@ -1,29 +1,72 @@
-import smtplib
+import html
 import logging
+import re
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
 from email.utils import formataddr
-import ssl
 import json
-from pathlib import Path
-from typing import Dict, List, Optional
-from queue import Queue
-from threading import Thread
+from typing import Callable, Dict, List, Optional
+from queue import Queue, Empty
+from threading import Lock, Thread
 import time
 import random
-import string
+from urllib.parse import quote
+from .smtp_pool import SMTPSession, connect_smtp, smtp_ssl_context
+from .scheduler import DeliveryScheduler, SendWindow
+from .template_engine import CompiledTemplate, TemplateValidationError, template_cache
+from .attachment_cache import AttachmentCache
+from .tracking_server import pixel_url
 
-class EmailSender:
-    def __init__(self, config_file='config/email_config.json', max_threads=5):
+# href/action URLs in a rendered body, as (prefix, url, closing quote)
+LINK_ATTRIBUTE = re.compile(r"""((?:href|action)\s*=\s*["'])([^"']*)(["'])""", re.IGNORECASE)
+
+
+def tag_tracked_links(html: str, tracking_url: str, token: str) -> str:
+    """Append r=<token> to every link and form action pointing at the tracking server"""
+    def tag(match):
+        url = match.group(2)
+        if not url.startswith(tracking_url) or re.search(r'[?&]r=', url):
+            return match.group(0)
+        separator = '&' if '?' in url else '?'
+        return f"{match.group(1)}{url}{separator}r={token}{match.group(3)}"
+    return LINK_ATTRIBUTE.sub(tag, html)
+
+
+class SendDescriptor:
+    """What to send to one recipient; the MIME message is only built when a worker sends it"""
+
+    __slots__ = ('template_file', 'recipient', 'campaign_name', 'variables', 'attachments', 'on_done',
+                 'window')
+
+    def __init__(self, template_file: str, recipient: str, campaign_name: Optional[str] = None,
+                 variables: Optional[Dict] = None, attachments: Optional[List[str]] = None,
+                 on_done: Optional[Callable] = None, window: Optional[SendWindow] = None):
+        self.template_file = template_file
+        self.recipient = recipient
+        self.campaign_name = campaign_name
+        self.variables = variables
+        self.attachments = attachments
+        self.on_done = on_done
+        self.window = window
+
+
+class BaseEmailSender:
+    """Configuration and message construction shared by the delivery engines"""
+
+    def __init__(self, config_file='config/email_config.json',
+                 scheduler: Optional[DeliveryScheduler] = None):
         self.logger = logging.getLogger(__name__)
         self.config = self._load_config(config_file)
-        self.ssl_context = ssl.create_default_context()
-        self.email_queue = Queue()
-        self.threads = []
-        self.max_threads = max_threads
-        self.running = False
-        self._start_workers()
+        self.ssl_context = smtp_ssl_context(self.config)
+        settings = self.config or {}
+        self.pool_size = settings.get('pool_size', 5)
+        self.max_messages_per_connection = settings.get('max_messages_per_connection', 100)
+        self.scheduler = scheduler or DeliveryScheduler.from_config(self.config)
+        self.strict_templates = settings.get('strict_templates', False)
+        # Base URL of core/web_server.py; links to it get the recipient's r= token
+        self.tracking_url = (settings.get('tracking_url') or '').rstrip('/')
+        self.attachments = AttachmentCache(int(settings.get('attachment_cache_mb', 64) * 1024 * 1024))
+        self.checked_templates = set()
 
     def _load_config(self, config_file):
         """Load email configuration from JSON file"""
@@ -34,99 +77,71 @@ class EmailSender:
             self.logger.error(f"Failed to load email config: {e}")
             return None
 
-    def _start_workers(self):
-        """Start email worker threads"""
-        if not self.config:
-            return
-            
-        self.running = True
-        for _ in range(self.max_threads):
-            thread = Thread(target=self._worker, daemon=True)
-            thread.start()
-            self.threads.append(thread)
+    def _template_variables(self, campaign_name: Optional[str], variables: Optional[Dict]) -> Optional[Dict]:
+        """The caller's variables plus the click link filled in for tracked recipients"""
+        token = (variables or {}).get('tracking_token')
+        if token and self.tracking_url and campaign_name and not variables.get('verification_link'):
+            variables = dict(variables, verification_link=f"{self.tracking_url}/track/{quote(campaign_name)}")
+        return variables
 
-    def _worker(self):
-        """Worker thread that processes emails from queue"""
-        while self.running or not self.email_queue.empty():
-            try:
-                email_data = self.email_queue.get(timeout=1)
-                self._send_email(**email_data)
-                self.email_queue.task_done()
-            except Exception as e:
-                self.logger.error(f"Email worker error: {e}")
-                time.sleep(1)
-
-    def send_phishing_email(self, template_file: str, recipient: str, 
-                          campaign_name: Optional[str] = None,
-                          variables: Optional[Dict] = None,
-                          attachments: Optional[List[str]] = None) -> bool:
-        """Send a phishing email with template variables and attachments"""
-        if not self.config:
-            self.logger.error("Email configuration not loaded")
-            return False
+    def compile_template(self, template_file: str, variables: Optional[Dict] = None) -> CompiledTemplate:
+        """Fetch the compiled template, checking its placeholders against the variables once
 
+        The first time a sender compiles a template, placeholders none of the variables
+        provide raise TemplateValidationError with strict_templates and are logged as a
+        warning otherwise (they are then sent verbatim).
+        """
+        if template_file in self.checked_templates:
+            return template_cache.get(template_file)
         try:
-            # Load and process template
-            with open(template_file) as f:
-                html_content = f.read()
-
-            # Apply template variables
-            if variables:
-                for key, value in variables.items():
-                    html_content = html_content.replace(f"{{{{{key}}}}}", str(value))
-
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = formataddr((self.config['sender_name'], self.config['sender_email']))
-            msg['To'] = recipient
-            msg['Subject'] = self._generate_subject(campaign_name)
-
-            # Add tracking if campaign specified
-            if campaign_name:
-                tracking_pixel = f'<img src="http://tracker.example.com/{campaign_name}/{hashlib.md5(recipient.encode()).hexdigest()}.png" width="1" height="1">'
-                html_content = html_content.replace('</body>', f'{tracking_pixel}</body>')
-
-            # Attach HTML content
-            msg.attach(MIMEText(html_content, 'html'))
-
-            # Add attachments
-            if attachments:
-                for attachment in attachments:
-                    with open(attachment, 'rb') as f:
-                        part = MIMEApplication(f.read(), Name=Path(attachment).name)
-                        part['Content-Disposition'] = f'attachment; filename="{Path(attachment).name}"'
-                        msg.attach(part)
-
-            # Queue email for sending
-            self.email_queue.put({
-                'msg': msg,
-                'recipient': recipient,
-                'campaign_name': campaign_name
-            })
+            template = template_cache.get(template_file, known_variables=variables or {})
+        except TemplateValidationError as e:
+            if self.strict_templates:
+                raise
+            self.logger.warning(str(e))
+            template = template_cache.get(template_file)
+        self.checked_templates.add(template_file)
+        return template
 
-            return True
+    def build_message(self, template_file: str, recipient: str,
+                      campaign_name: Optional[str] = None,
+                      variables: Optional[Dict] = None,
+                      attachments: Optional[List[str]] = None) -> MIMEMultipart:
+        """Render the template and build the MIME message for one recipient
 
-        except Exception as e:
-            self.logger.error(f"Failed to prepare email: {e}", exc_info=True)
-            return False
+        A `tracking_token` variable (the send queue's per-recipient token) is added as r=
+        to every link to tracking_url and carried by the open pixel; verification_link
+        defaults to the click endpoint.
+        """
+        token = (variables or {}).get('tracking_token')
+        variables = self._template_variables(campaign_name, variables)
 
-    def _send_email(self, msg, recipient, campaign_name):
-        """Actually send the email (called by worker thread)"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with smtplib.SMTP_SSL(self.config['smtp_server'],
-                                    self.config['smtp_port'],
-                                    context=self.ssl_context) as server:
-                    server.login(self.config['username'], self.config['password'])
-                    server.send_message(msg)
-                self.logger.info(f"Sent email to {recipient} (campaign: {campaign_name})")
-                return
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    self.logger.error(f"Failed to send email to {recipient} after {max_retries} attempts: {e}")
-                else:
-                    time.sleep(2 ** attempt)  # Exponential backoff
+        # Render the cached compiled template
+        html_content = self.compile_template(template_file, variables).render(variables,
+                                                                             strict=self.strict_templates)
+        if token and self.tracking_url:
+            html_content = tag_tracked_links(html_content, self.tracking_url, token)
+
+        # Create message
+        msg = MIMEMultipart('alternative')
+        msg['From'] = formataddr((self.config['sender_name'], self.config['sender_email']))
+        msg['To'] = recipient
+        msg['Subject'] = self._generate_subject(campaign_name)
+
+        # Open pixel, attributed through the same token as the links
+        if token and self.tracking_url and campaign_name:
+            tracking_pixel = f'<img src="{html.escape(pixel_url(self.tracking_url, campaign_name, token))}" width="1" height="1">'
+            html_content = html_content.replace('</body>', f'{tracking_pixel}</body>')
+
+        # Attach HTML content
+        msg.attach(MIMEText(html_content, 'html'))
+
+        # Add attachments, encoded once and shared across recipients
+        if attachments:
+            for attachment in attachments:
+                msg.attach(self.attachments.get(attachment))
+
+        return msg
 
     def _generate_subject(self, campaign_name: Optional[str]) -> str:
         """Generate a randomized email subject"""
@@ -152,17 +167,140 @@ class EmailSender:
         if not self.config:
             return False
         try:
-            with smtplib.SMTP_SSL(self.config['smtp_server'],
-                                self.config['smtp_port'],
-                                context=self.ssl_context) as server:
+            with connect_smtp(self.config, self.ssl_context) as server:
                 server.login(self.config['username'], self.config['password'])
             return True
         except Exception as e:
             self.logger.error(f"Email config validation failed: {e}")
             return False
 
-    def __del__(self):
-        """Clean up worker threads"""
+
+class EmailSender(BaseEmailSender):
+    def __init__(self, config_file='config/email_config.json', max_threads=None,
+                 scheduler: Optional[DeliveryScheduler] = None):
+        super().__init__(config_file, scheduler)
+        # Bounded so producers block instead of buffering a whole target list
+        self.email_queue = Queue(maxsize=(self.config or {}).get('queue_size', 1000))
+        self.threads = []
+        self.sessions = []
+        self.max_threads = max_threads or self.pool_size
+        self.running = False
+        # Workers start with the first send, so building a sender costs no threads
+        self.workers_lock = Lock()
+
+    def _start_workers(self):
+        """Start email worker threads unless they are already running"""
+        if not self.config or self.threads:
+            return
+        with self.workers_lock:
+            if self.threads:
+                return
+            self.running = True
+            for _ in range(self.max_threads):
+                thread = Thread(target=self._worker, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def _worker(self):
+        """Worker thread that processes emails from queue over its own SMTP session"""
+        session = SMTPSession(self.config, self.ssl_context,
+                              max_messages=self.max_messages_per_connection)
+        self.sessions.append(session)
+        try:
+            while self.running or not self.email_queue.empty():
+                try:
+                    descriptor = self.email_queue.get(timeout=1)
+                except Empty:
+                    continue
+                try:
+                    success, attempts, error = self._send_email(descriptor, session)
+                except Exception as e:
+                    self.logger.error(f"Email worker error: {e}")
+                    success, attempts, error = False, 0, str(e)
+                try:
+                    if descriptor.on_done:
+                        descriptor.on_done(success, attempts, error)
+                except Exception as e:
+                    self.logger.error(f"Delivery callback failed for {descriptor.recipient}: {e}")
+                finally:
+                    self.email_queue.task_done()
+        finally:
+            session.close()
+
+    def send_phishing_email(self, template_file: str, recipient: str, 
+                          campaign_name: Optional[str] = None,
+                          variables: Optional[Dict] = None,
+                          attachments: Optional[List[str]] = None,
+                          on_done: Optional[Callable] = None,
+                          window: Optional[SendWindow] = None) -> bool:
+        """Send a phishing email with template variables and attachments
+
+        on_done(success, attempts, error) is called from the worker once delivery finished.
+        window is the campaign's send window, applied to this message only.
+        """
+        if not self.config:
+            self.logger.error("Email configuration not loaded")
+            return False
+
+        try:
+            # Fail fast on a broken template; the message itself is built at send time
+            self.compile_template(template_file, self._template_variables(campaign_name, variables))
+            self._start_workers()
+
+            # Queue a lightweight descriptor for sending
+            self.email_queue.put(SendDescriptor(template_file, recipient, campaign_name,
+                                                variables, attachments, on_done, window))
+
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Failed to prepare email: {e}", exc_info=True)
+            return False
+
+    def _send_email(self, descriptor: SendDescriptor, session: SMTPSession):
+        """Build the message and stream it to the relay (called by worker thread)
+
+        Returns (success, attempts, error).
+        """
+        recipient, campaign_name = descriptor.recipient, descriptor.campaign_name
+        msg = self.build_message(descriptor.template_file, recipient, campaign_name,
+                                 descriptor.variables, descriptor.attachments)
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                self.scheduler.acquire(recipient, descriptor.window)
+                session.stream_message(msg)
+                self.logger.info(f"Sent email to {recipient} (campaign: {campaign_name})")
+                return True, attempt + 1, None
+            except Exception as e:
+                # Start the next attempt on a fresh connection
+                session.reset()
+                if attempt == max_retries - 1:
+                    self.logger.error(f"Failed to send email to {recipient} after {max_retries} attempts: {e}")
+                    return False, max_retries, str(e)
+                time.sleep(2 ** attempt)  # Exponential backoff
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Drain the queue, stop worker threads and close their SMTP sessions"""
         self.running = False
         for thread in self.threads:
-            thread.join()
+            thread.join(timeout)
+        self.threads = []
+
+    def __del__(self):
+        """Clean up worker threads"""
+        self.shutdown()
+
+
+def create_email_sender(config_file: str = 'config/email_config.json'):
+    """Build the delivery engine selected by 'delivery_engine' in the email config"""
+    engine = 'threaded'
+    try:
+        with open(config_file) as f:
+            engine = json.load(f).get('delivery_engine', engine)
+    except Exception:
+        pass
+    if engine == 'async':
+        from .async_email_sender import AsyncEmailSender
+        return AsyncEmailSender(config_file)
+    return EmailSender(config_file)
@@ -0,0 +1,326 @@
+import re
+import html
+import random
+import string
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, urldefrag
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from lxml import etree
+except ImportError:  # optional, faster parser backend
+    etree = None
+
+# Visible banner required on every cloned page by the security guide
+WATERMARK = ('<div id="socialphantom-watermark" style="position:fixed;top:0;left:0;right:0;'
+             'z-index:2147483647;background:#c00;color:#fff;text-align:center;'
+             'font:bold 14px sans-serif;padding:4px">TESTING ONLY - security awareness exercise</div>')
+
+# Filled with the visitor's link token when core/web_server.py serves the page, so
+# /capture can attribute the submission
+RECIPIENT_FIELD = '<input type="hidden" name="r" value=""/>'
+
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                 'param', 'source', 'track', 'wbr'}
+RAW_TEXT_ELEMENTS = {'script', 'style'}
+
+# url(...) references and @import "..." rules in stylesheets and style attributes
+CSS_REFERENCE = re.compile(r"""url\(\s*(['"]?)([^'")]+?)\1\s*\)|@import\s+(['"])([^'"]+)\3""")
+
+
+class AssetRef:
+    """Placeholder for an asset URL in the rewritten output, resolved once assets are fetched"""
+
+    __slots__ = ('url', 'original')
+
+    def __init__(self, url: str, original: str):
+        self.url = url
+        self.original = original
+
+
+def asset_ref(base_url: str, value: str, asset_type: str, assets: Dict[str, str]) -> Optional[AssetRef]:
+    """Resolve an asset reference and record it in assets; None for non-HTTP references"""
+    url = urljoin(base_url, value.strip())
+    if urlparse(url).scheme not in ('http', 'https'):
+        return None
+    assets.setdefault(url, asset_type)
+    return AssetRef(url, value)
+
+
+def css_parts(css: str, base_url: str, assets: Dict[str, str]) -> List:
+    """Split CSS into literal text and AssetRefs for its url() and @import references"""
+    parts, last = [], 0
+    for match in CSS_REFERENCE.finditer(css):
+        group = 2 if match.group(2) is not None else 4
+        ref = asset_ref(base_url, match.group(group), 'css' if group == 4 else 'images', assets)
+        if ref is not None:
+            parts.extend((css[last:match.start(group)], ref))
+            last = match.end(group)
+    parts.append(css[last:])
+    return parts
+
+
+def render_parts(parts: List, local_paths: Dict[str, str], escape: bool = True) -> str:
+    """Join text and AssetRefs, pointing each fetched asset at its local path"""
+    quote = html.escape if escape else str
+    return ''.join(quote(local_paths.get(part.url, part.original)) if isinstance(part, AssetRef) else part
+                   for part in parts)
+
+
+class RewriteResult:
+    """Rewritten page as output chunks plus the assets it references"""
+
+    def __init__(self, chunks: List, assets: Dict[str, str]):
+        self.chunks = chunks
+        # Absolute asset URL -> asset type ('css', 'js' or 'images')
+        self.assets = assets
+
+    def render(self, local_paths: Dict[str, str]) -> str:
+        """Join the output, pointing each fetched asset at its local path"""
+        return render_parts(self.chunks, local_paths)
+
+
+class PageRewriter:
+    """Rewriting rules applied to each tag as the parser streams past it
+
+    Asset references (including srcset candidates and CSS url()s) become AssetRef
+    placeholders, forms are pointed at /capture with the campaign, recipient token and
+    honeypot fields appended, and the watermark follows <body>. link_map, when given, maps absolute
+    <a>/<area> targets to local pages; targets it returns None for are made absolute
+    so they still reach the original site. Unchanged tags are copied from the source
+    verbatim when the backend provides it.
+    """
+
+    def __init__(self, page_url: str, campaign_name: Optional[str] = None,
+                 obfuscate_js: bool = True, randomize_ids: bool = True,
+                 link_map: Optional[Callable[[str], Optional[str]]] = None):
+        self.page_url = page_url
+        self.campaign_name = campaign_name
+        self.obfuscate_js = obfuscate_js
+        self.randomize_ids = randomize_ids
+        self.link_map = link_map
+        self.chunks = []
+        self.assets = {}
+        self.open_forms = 0
+        self.in_script = False
+        self.in_style = False
+        self.watermarked = False
+
+    def _asset(self, value: str, asset_type: str) -> Optional[AssetRef]:
+        return asset_ref(self.page_url, value, asset_type, self.assets)
+
+    def _srcset(self, value: str) -> List:
+        parts = []
+        for candidate in value.split(','):
+            fields = candidate.split(None, 1)
+            if not fields:
+                continue
+            if parts:
+                parts.append(', ')
+            parts.append(self._asset(fields[0], 'images') or fields[0])
+            if len(fields) > 1:
+                parts.append(' ' + fields[1].strip())
+        return parts
+
+    def _link(self, value: str) -> Optional[str]:
+        url, fragment = urldefrag(urljoin(self.page_url, value.strip()))
+        if urlparse(url).scheme not in ('http', 'https'):
+            return None
+        # Pages link_map does not provide keep pointing at the original site
+        local = self.link_map(url) or url
+        if fragment:
+            local += '#' + fragment
+        return local
+
+    def start(self, tag: str, attrs: List[Tuple[str, Optional[str]]], self_closing: bool = False,
+              source: Optional[str] = None):
+        values = dict(attrs)
+        changes = {}
+        if tag == 'link' and values.get('href') and 'stylesheet' in (values.get('rel') or '').lower().split():
+            changes['href'] = self._asset(values['href'], 'css')
+        elif tag in ('script', 'img') and values.get('src'):
+            changes['src'] = self._asset(values['src'], 'js' if tag == 'script' else 'images')
+        if tag in ('img', 'source') and values.get('srcset'):
+            changes['srcset'] = self._srcset(values['srcset'])
+        if values.get('style') and 'url(' in values['style']:
+            changes['style'] = css_parts(values['style'], self.page_url, self.assets)
+        if self.link_map and tag in ('a', 'area') and values.get('href'):
+            changes['href'] = self._link(values['href'])
+        changes = {name: value for name, value in changes.items() if value is not None}
+
+        if tag == 'form':
+            changes['action'] = '/capture'
+            changes['method'] = 'POST'
+            if not self_closing:
+                self.open_forms += 1
+        if self.randomize_ids and values.get('id'):
+            changes['id'] = ''.join(random.choices(string.ascii_lowercase + string.digits, k=12))
+        if tag == 'script' and not self_closing:
+            self.in_script = True
+        if tag == 'style' and not self_closing:
+            self.in_style = True
+
+        if not changes and source is not None:
+            self.chunks.append(source)
+        else:
+            self._emit_tag(tag, attrs, changes, self_closing)
+        if tag == 'body' and not self.watermarked:
+            self.chunks.append(WATERMARK)
+            self.watermarked = True
+
+    def _emit_tag(self, tag: str, attrs: List[Tuple[str, Optional[str]]], changes: Dict, self_closing: bool):
+        chunks = self.chunks
+        chunks.append(f'<{tag}')
+        existing = {name for name, _ in attrs}
+        seen = set()
+        for name, value in attrs + [(name, None) for name in changes if name not in existing]:
+            if name in seen:
+                continue
+            seen.add(name)
+            value = changes.get(name, value)
+            if value is None:
+                chunks.append(f' {name}')
+            elif isinstance(value, AssetRef):
+                chunks.extend((f' {name}="', value, '"'))
+            elif isinstance(value, list):
+                chunks.append(f' {name}="')
+                chunks.extend(part if isinstance(part, AssetRef) else html.escape(part) for part in value)
+                chunks.append('"')
+            else:
+                chunks.append(f' {name}="{html.escape(value)}"')
+        chunks.append('/>' if self_closing else '>')
+
+    def end(self, tag: str):
+        if tag == 'form' and self.open_forms:
+            self._close_form()
+        if tag == 'script':
+            self.in_script = False
+        if tag == 'style':
+            self.in_style = False
+        self.chunks.append(f'</{tag}>')
+
+    def _close_form(self):
+        """Append the tracking and honeypot fields before a form closes"""
+        if self.campaign_name:
+            self.chunks.append(f'<input type="hidden" name="campaign" value="{html.escape(self.campaign_name)}"/>')
+        self.chunks.append(RECIPIENT_FIELD)
+        self.chunks.append('<input type="text" name="honeypot" style="display:none"/>')
+        self.open_forms -= 1
+
+    def text(self, data: str, escape: bool = False):
+        """Character data; escape=True for backends that hand over decoded text"""
+        if self.in_script:
+            if self.obfuscate_js:
+                data = re.sub(r'\bvar\b', 'const', data)
+                data = re.sub(r'\blet\b', 'const', data)
+        elif self.in_style:
+            self.chunks.extend(css_parts(data, self.page_url, self.assets))
+            return
+        elif escape:
+            data = html.escape(data, quote=False)
+        self.chunks.append(data)
+
+    def markup(self, source: str):
+        """Comments, declarations and references, copied through unchanged"""
+        self.chunks.append(source)
+
+    def finish(self) -> RewriteResult:
+        while self.open_forms:
+            self._close_form()
+        if not self.watermarked:
+            self.chunks.insert(0, WATERMARK)
+        return RewriteResult(self.chunks, self.assets)
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser front-end; keeps entities and unchanged tags exactly as written"""
+
+    def __init__(self, rewriter: PageRewriter):
+        super().__init__(convert_charrefs=False)
+        self.rewriter = rewriter
+
+    def handle_starttag(self, tag, attrs):
+        self.rewriter.start(tag, attrs, False, self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        self.rewriter.start(tag, attrs, True, self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        self.rewriter.end(tag)
+
+    def handle_data(self, data):
+        self.rewriter.text(data)
+
+    def handle_entityref(self, name):
+        self.rewriter.markup(f'&{name};')
+
+    def handle_charref(self, name):
+        self.rewriter.markup(f'&#{name};')
+
+    def handle_comment(self, data):
+        self.rewriter.markup(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.rewriter.markup(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self.rewriter.markup(f'<?{data}>')
+
+    def unknown_decl(self, data):
+        self.rewriter.markup(f'<![{data}]>')
+
+
+class _LxmlTarget:
+    """lxml parser-target front-end; libxml2 hands over decoded text and attributes"""
+
+    def __init__(self, rewriter: PageRewriter):
+        self.rewriter = rewriter
+        self.raw_depth = 0
+
+    def start(self, tag, attrib):
+        if tag in RAW_TEXT_ELEMENTS:
+            self.raw_depth += 1
+        self.rewriter.start(tag, list(attrib.items()))
+
+    def end(self, tag):
+        if tag in RAW_TEXT_ELEMENTS:
+            self.raw_depth -= 1
+        if tag not in VOID_ELEMENTS:
+            self.rewriter.end(tag)
+
+    def data(self, data):
+        self.rewriter.text(data, escape=not self.raw_depth)
+
+    def comment(self, text):
+        self.rewriter.markup(f'<!--{text}-->')
+
+    def doctype(self, name, pubid, system):
+        self.rewriter.markup(f'<!DOCTYPE {name}>')
+
+    def close(self):
+        return None
+
+
+def rewrite_html(source: str, page_url: str, campaign_name: Optional[str] = None,
+                 obfuscate_js: bool = True, randomize_ids: bool = True,
+                 backend: str = 'auto', link_map: Optional[Callable[[str], Optional[str]]] = None) -> RewriteResult:
+    """Rewrite a page for cloning in a single streaming pass
+
+    backend is 'html.parser', 'lxml', or 'auto' to use lxml when it is installed.
+    """
+    rewriter = PageRewriter(page_url, campaign_name, obfuscate_js, randomize_ids, link_map)
+    if backend == 'auto':
+        backend = 'lxml' if etree is not None else 'html.parser'
+    if backend == 'lxml':
+        if etree is None:
+            raise ValueError("lxml backend requested but lxml is not installed")
+        parser = etree.HTMLParser(target=_LxmlTarget(rewriter))
+        parser.feed(source)
+        parser.close()
+    elif backend == 'html.parser':
+        parser = _StdlibParser(rewriter)
+        parser.feed(source)
+        parser.close()
+    else:
+        raise ValueError(f"Unknown HTML parser backend: {backend}")
+    return rewriter.finish()
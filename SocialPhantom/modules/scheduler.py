@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from typing import Dict, Optional
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+class TokenBucket:
+    """Thread-safe token bucket where callers reserve a token and wait out the returned delay"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst else max(1, int(self.rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token, returning how many seconds to wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class SendWindow:
+    """Daily time-of-day window (optionally limited to some weekdays) in which sending is allowed"""
+
+    def __init__(self, start: dtime, end: dtime, days: Optional[set] = None):
+        self.start = start
+        self.end = end
+        self.days = days
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict]) -> Optional["SendWindow"]:
+        """Build from campaign settings like {"start": "09:00", "end": "17:00", "days": ["mon", "fri"]}"""
+        if not settings:
+            return None
+        days = settings.get('days')
+        return cls(dtime.fromisoformat(settings.get('start', '00:00')),
+                   dtime.fromisoformat(settings.get('end', '23:59')),
+                   {WEEKDAYS.index(d.lower()[:3]) for d in days} if days else None)
+
+    def _is_open(self, moment: datetime) -> bool:
+        # A window whose end precedes its start wraps past midnight
+        current = moment.time()
+        if self.start <= self.end:
+            in_hours = self.start <= current < self.end
+            day = moment.weekday()
+        else:
+            in_hours = current >= self.start or current < self.end
+            day = moment.weekday() if current >= self.start else (moment.weekday() - 1) % 7
+        return in_hours and (self.days is None or day in self.days)
+
+    def seconds_until_open(self, now: Optional[datetime] = None) -> float:
+        """Seconds until the window next opens (0 when it is open now)"""
+        now = now or datetime.now()
+        if self._is_open(now):
+            return 0.0
+        for offset in range(8):
+            opening = datetime.combine(now.date() + timedelta(days=offset), self.start)
+            if opening > now and self._is_open(opening):
+                return (opening - now).total_seconds()
+        return 0.0
+
+
+class DeliveryScheduler:
+    """Paces deliveries under a global and per-recipient-domain rate limit inside a send window
+
+    The scheduler and its buckets are shared by every campaign a sender delivers, so a
+    campaign's own window is passed to acquire() per send; self.window is only the default.
+    """
+
+    def __init__(self, global_per_minute: float = 0, per_domain_per_minute: float = 0,
+                 domain_limits: Optional[Dict[str, float]] = None, burst: Optional[int] = None,
+                 window: Optional[SendWindow] = None):
+        self.logger = logging.getLogger(__name__)
+        self.global_bucket = TokenBucket(global_per_minute, burst) if global_per_minute else None
+        self.per_domain_per_minute = per_domain_per_minute
+        self.domain_limits = {d.lower(): r for d, r in (domain_limits or {}).items()}
+        self.burst = burst
+        self.window = window
+        self.domain_buckets = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "DeliveryScheduler":
+        """Build from the 'rate_limits' section of the email config"""
+        limits = (config or {}).get('rate_limits') or {}
+        return cls(global_per_minute=limits.get('global_per_minute', 0),
+                   per_domain_per_minute=limits.get('per_domain_per_minute', 0),
+                   domain_limits=limits.get('domains'),
+                   burst=limits.get('burst'))
+
+    def _domain_bucket(self, recipient: str) -> Optional[TokenBucket]:
+        domain = recipient.rpartition('@')[2].lower()
+        rate = self.domain_limits.get(domain, self.per_domain_per_minute)
+        if not rate:
+            return None
+        with self.lock:
+            bucket = self.domain_buckets.get(domain)
+            if bucket is None:
+                bucket = self.domain_buckets[domain] = TokenBucket(rate, self.burst)
+            return bucket
+
+    def window_delay(self, window: Optional[SendWindow] = None) -> float:
+        """Seconds until the send window (default self.window) opens (0 when open or unrestricted)"""
+        window = window or self.window
+        return window.seconds_until_open() if window else 0.0
+
+    def reserve(self, recipient: str) -> float:
+        """Reserve a send slot for the recipient and return the seconds to wait for it"""
+        delay = 0.0
+        domain_bucket = self._domain_bucket(recipient)
+        if domain_bucket:
+            delay = domain_bucket.reserve()
+        if self.global_bucket:
+            delay = max(delay, self.global_bucket.reserve())
+        return delay
+
+    def acquire(self, recipient: str, window: Optional[SendWindow] = None):
+        """Block the calling thread until the recipient may be sent to"""
+        closed_for = self.window_delay(window)
+        while closed_for:
+            self.logger.info(f"Outside send window, pausing {closed_for:.0f}s")
+            time.sleep(closed_for)
+            closed_for = self.window_delay(window)
+        delay = self.reserve(recipient)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, recipient: str, window: Optional[SendWindow] = None):
+        """Wait in the event loop until the recipient may be sent to"""
+        closed_for = self.window_delay(window)
+        while closed_for:
+            self.logger.info(f"Outside send window, pausing {closed_for:.0f}s")
+            await asyncio.sleep(closed_for)
+            closed_for = self.window_delay(window)
+        delay = self.reserve(recipient)
+        if delay:
+            await asyncio.sleep(delay)
@@ -0,0 +1,169 @@
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PENDING = 'pending'
+INFLIGHT = 'inflight'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class QueueItem:
+    """One recipient claimed from the persistent queue
+
+    token is the opaque per-recipient value carried as `r=` in tracked links.
+    """
+
+    __slots__ = ('id', 'recipient', 'variables', 'token')
+
+    def __init__(self, id: int, recipient: str, variables: Dict, token: Optional[str] = None):
+        self.id = id
+        self.recipient = recipient
+        self.variables = variables
+        self.token = token
+
+
+class PersistentSendQueue:
+    """SQLite-backed per-campaign send queue recording pending/inflight/sent/failed per recipient
+
+    A delivery is committed as sent before mark_sent returns, so a crash never re-sends
+    a message that went out. Failures are buffered and committed in batches (and before
+    the next claim); items left inflight are re-queued and retried on the next open.
+    Every recipient gets a random link token when queued, which front-ends resolve back
+    to the address (see core.ingest.RecipientTokens).
+    """
+
+    def __init__(self, path, flush_every: int = 100, flush_interval: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sends (
+                id INTEGER PRIMARY KEY,
+                recipient TEXT NOT NULL UNIQUE,
+                variables TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated REAL,
+                token TEXT
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sends_state ON sends (state, id)")
+        self._add_tokens()
+        self.pending_updates = []
+        self.last_flush = time.monotonic()
+        self.recovered = self._recover()
+
+    def _add_tokens(self):
+        """Give queues created before link tokens existed a token column and backfill it"""
+        with self.lock:
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sends)")]
+            if 'token' not in columns:
+                self.conn.execute("ALTER TABLE sends ADD COLUMN token TEXT")
+            ids = [row[0] for row in self.conn.execute("SELECT id FROM sends WHERE token IS NULL")]
+            if ids:
+                self.conn.execute("BEGIN")
+                self.conn.executemany("UPDATE sends SET token = ? WHERE id = ?",
+                                      [(secrets.token_urlsafe(12), item_id) for item_id in ids])
+                self.conn.execute("COMMIT")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS sends_token ON sends (token)")
+
+    def _recover(self) -> int:
+        """Re-queue items a previous run claimed but never acknowledged"""
+        with self.lock:
+            cursor = self.conn.execute("UPDATE sends SET state = ? WHERE state = ?", (PENDING, INFLIGHT))
+        if cursor.rowcount:
+            self.logger.warning(f"Re-queued {cursor.rowcount} unacknowledged sends from {self.path}")
+        return cursor.rowcount
+
+    def enqueue(self, targets: Iterable[Dict], batch_size: int = 1000) -> int:
+        """Add targets not already queued, streaming them in batches; returns how many were added"""
+        added = 0
+        batch = []
+        for target in targets:
+            batch.append((target['email'], json.dumps(target), secrets.token_urlsafe(12)))
+            if len(batch) >= batch_size:
+                added += self._insert(batch)
+                batch = []
+        if batch:
+            added += self._insert(batch)
+        return added
+
+    def _insert(self, rows: List) -> int:
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT OR IGNORE INTO sends (recipient, variables, token) VALUES (?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+            return self.conn.total_changes - before
+
+    def claim(self, limit: int = 500) -> List[QueueItem]:
+        """Mark up to limit pending items inflight and return them"""
+        self.flush()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT id, recipient, variables, token FROM sends WHERE state = ? ORDER BY id LIMIT ?",
+                (PENDING, limit)).fetchall()
+            self.conn.executemany("UPDATE sends SET state = ?, updated = ? WHERE id = ?",
+                                  [(INFLIGHT, time.time(), row[0]) for row in rows])
+            self.conn.execute("COMMIT")
+        return [QueueItem(row[0], row[1], json.loads(row[2]) if row[2] else {}, row[3]) for row in rows]
+
+    def mark_sent(self, item_id: int, attempts: int = 1):
+        """Commit the delivery at once; recovery must never re-queue a message that went out"""
+        with self.lock:
+            self.conn.execute("UPDATE sends SET state = ?, attempts = attempts + ?, error = NULL, updated = ? "
+                              "WHERE id = ?", (SENT, attempts, time.time(), item_id))
+
+    def mark_failed(self, item_id: int, error: Optional[str] = None, attempts: int = 1):
+        self._record(item_id, FAILED, attempts, error)
+
+    def _record(self, item_id: int, state: str, attempts: int, error: Optional[str]):
+        with self.lock:
+            self.pending_updates.append((state, attempts, error, time.time(), item_id))
+            due = (len(self.pending_updates) >= self.flush_every or
+                   time.monotonic() - self.last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Commit buffered state changes in one transaction"""
+        with self.lock:
+            if self.pending_updates:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "UPDATE sends SET state = ?, attempts = attempts + ?, error = ?, updated = ? WHERE id = ?",
+                    self.pending_updates)
+                self.conn.execute("COMMIT")
+                self.pending_updates = []
+            self.last_flush = time.monotonic()
+
+    def retry_failed(self) -> int:
+        """Put failed items back in the queue"""
+        with self.lock:
+            return self.conn.execute("UPDATE sends SET state = ? WHERE state = ?", (PENDING, FAILED)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of items in each state"""
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM sends GROUP BY state").fetchall()
+        counts = {PENDING: 0, INFLIGHT: 0, SENT: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import html
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse, urlunparse, urlencode, parse_qsl
+from urllib.robotparser import RobotFileParser
+from .web_cloner import WebCloner, DEFAULT_HEADERS
+
+STATE_FILE = 'crawl_state.json'
+
+# Links to these are downloads or assets, never pages, so they are not queued
+NON_HTML_SUFFIXES = {
+    '.pdf', '.zip', '.gz', '.tgz', '.tar', '.rar', '.7z', '.exe', '.msi', '.dmg', '.iso', '.apk',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods', '.csv', '.txt', '.rtf',
+    '.json', '.xml', '.rss', '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg',
+    '.ico', '.bmp', '.tif', '.tiff', '.mp3', '.mp4', '.m4a', '.wav', '.avi', '.mov', '.webm',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+}
+
+PAGE_LINK = re.compile(r'(href=")(page_[0-9a-f]{16}\.html)((?:#[^"]*)?")')
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to deduplicate the frontier
+
+    Lower-cases scheme and host, drops default ports and fragments, and sorts the query.
+    """
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and (scheme, parsed.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parsed.port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, query, ''))
+
+
+class SiteCrawler:
+    """Bounded same-origin mirror of a site built on WebCloner.clone_page
+
+    Pages are discovered from <a>/<area> links on the same scheme and host and
+    admitted to the frontier until max_pages URLs have been admitted. Links to
+    downloads, and to pages that turned out not to be HTML or could not be
+    fetched, keep their absolute URL instead of a local filename. Admitted and
+    finished URLs are checkpointed to crawl_state.json, and an interrupted crawl
+    resumes with the pages it had not finished.
+    """
+
+    def __init__(self, cloner: Optional[WebCloner] = None, max_depth: int = 2, max_pages: int = 50,
+                 workers: int = 4, respect_robots: bool = True, checkpoint_interval: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.cloner = cloner or WebCloner()
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.workers = workers
+        self.respect_robots = respect_robots
+        self.checkpoint_interval = checkpoint_interval
+        self.robots = {}
+        self.lock = threading.Lock()
+        self.work_ready = threading.Condition(self.lock)
+
+    @staticmethod
+    def page_filename(url: str, start_url: str) -> str:
+        if url == start_url:
+            return 'index.html'
+        return f"page_{hashlib.sha1(url.encode()).hexdigest()[:16]}.html"
+
+    def _allowed(self, url: str) -> bool:
+        """robots.txt check, fetching each origin's rules once"""
+        if not self.respect_robots:
+            return True
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        parser = self.robots.get(origin)
+        if parser is None:
+            parser = RobotFileParser(origin + '/robots.txt')
+            try:
+                response = self.cloner._thread_session().get(origin + '/robots.txt', timeout=10)
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                elif response.ok:
+                    parser.parse(response.text.splitlines())
+                else:
+                    parser.allow_all = True
+            except Exception as e:
+                self.logger.warning(f"Could not fetch robots.txt for {origin}: {e}")
+                parser.allow_all = True
+            self.robots[origin] = parser
+        return parser.can_fetch(DEFAULT_HEADERS['User-Agent'], url)
+
+    def _load_state(self, state_path: Path, start_url: str) -> Dict:
+        if state_path.exists():
+            with open(state_path) as f:
+                state = json.load(f)
+            if state.get('start_url') == start_url:
+                return state
+            self.logger.warning(f"Ignoring crawl state for a different start URL in {state_path}")
+        return {'start_url': start_url, 'seen': {start_url: 0}, 'done': [], 'failed': []}
+
+    def _save_state(self, state_path: Path):
+        """Checkpoint the crawl; called with self.lock held"""
+        tmp_path = state_path.with_name(state_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, state_path)
+        self.last_checkpoint = time.monotonic()
+
+    def _admit(self, url: str, depth: int, start_url: str) -> Optional[str]:
+        """link_map for the page rewriter: queue in-scope links, return their local filename"""
+        url = normalize_url(url)
+        parsed, start = urlparse(url), urlparse(start_url)
+        if (parsed.scheme, parsed.netloc) != (start.scheme, start.netloc):
+            return None
+        if Path(parsed.path).suffix.lower() in NON_HTML_SUFFIXES:
+            return None
+        with self.lock:
+            if url in self.unwritten:
+                return None
+            if url in self.state['seen']:
+                return self.page_filename(url, start_url)
+            if depth > self.max_depth or len(self.state['seen']) >= self.max_pages:
+                return None
+        # Outside the lock: may fetch robots.txt
+        if not self._allowed(url):
+            with self.lock:
+                self.stats['robots_skipped'] += 1
+            return None
+        with self.lock:
+            if url not in self.state['seen']:
+                if len(self.state['seen']) >= self.max_pages:
+                    return None
+                self.state['seen'][url] = depth
+                self.frontier.append((url, depth))
+                self.work_ready.notify()
+        return self.page_filename(url, start_url)
+
+    def _worker(self, start_url: str, output_path: Path, campaign_name: Optional[str], state_path: Path):
+        while True:
+            with self.lock:
+                self.work_ready.wait_for(lambda: self.frontier or not self.active)
+                if not self.frontier:
+                    return
+                url, depth = self.frontier.popleft()
+                self.active += 1
+
+            outcome = 'failed'
+            try:
+                cloned = self.cloner.clone_page(
+                    url, output_path, campaign_name, self.page_filename(url, start_url),
+                    link_map=lambda link: self._admit(link, depth + 1, start_url), html_only=True)
+                outcome = 'pages' if cloned else 'skipped'
+            except Exception as e:
+                self.logger.warning(f"Failed to clone {url}: {e}")
+
+            with self.lock:
+                self.active -= 1
+                self.state['failed' if outcome == 'failed' else 'done'].append(url)
+                if outcome != 'pages':
+                    self.unwritten.add(url)
+                self.stats[outcome] += 1
+                if time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+                    self._save_state(state_path)
+                done = self.stats['pages'] + self.stats['skipped'] + self.stats['failed']
+                elapsed = time.monotonic() - self.started
+                self.logger.info(f"Crawled {done}/{len(self.state['seen'])} pages "
+                                 f"({done / elapsed:.1f} pages/s)")
+                self.work_ready.notify_all()
+
+    def _unlink_missing_pages(self, output_path: Path, start_url: str):
+        """Point links at pages that were never written back at their absolute URL
+
+        Pages linked before their fetch showed them to be non-HTML (or failed) were
+        already rendered with a local filename; those links are restored here.
+        """
+        missing = {}
+        for url in self.state['seen']:
+            filename = self.page_filename(url, start_url)
+            if not (output_path / filename).exists():
+                missing[filename] = html.escape(url)
+        if not missing:
+            return
+
+        def restore(match):
+            target = missing.get(match.group(2))
+            return match.group(1) + target + match.group(3) if target else match.group(0)
+
+        for page in output_path.glob('*.html'):
+            text = page.read_text(encoding='utf-8')
+            fixed = PAGE_LINK.sub(restore, text)
+            if fixed != text:
+                page.write_text(fixed, encoding='utf-8')
+
+    def crawl(self, start_url: str, output_dir: str, campaign_name: Optional[str] = None) -> Dict:
+        """Mirror start_url and the pages it links to into output_dir; returns crawl stats"""
+        if not urlparse(start_url).scheme:
+            start_url = 'https://' + start_url
+        start_url = normalize_url(start_url)
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        state_path = output_path / STATE_FILE
+
+        self.state = self._load_state(state_path, start_url)
+        finished = set(self.state['done'])
+        # Failed pages are retried on resume along with those that never finished
+        self.state['failed'] = []
+        self.unwritten = set()
+        self.frontier = deque(sorted(((url, depth) for url, depth in self.state['seen'].items()
+                                      if url not in finished), key=lambda item: item[1]))
+        self.stats = {'pages': 0, 'skipped': 0, 'failed': 0, 'robots_skipped': 0, 'resumed': len(finished)}
+        if self.frontier and start_url not in finished and not self._allowed(start_url):
+            self.logger.error(f"robots.txt disallows crawling {start_url}")
+            self.stats['robots_skipped'] += 1
+            return self.stats
+        self.active = 0
+        self.started = self.last_checkpoint = time.monotonic()
+
+        threads = [threading.Thread(target=self._worker, args=(start_url, output_path, campaign_name, state_path),
+                                    daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self._unlink_missing_pages(output_path, start_url)
+        with self.lock:
+            self._save_state(state_path)
+        elapsed = time.monotonic() - self.started
+        stats = dict(self.stats, seconds=round(elapsed, 3),
+                     pages_per_second=round(self.stats['pages'] / elapsed, 2) if elapsed else 0.0)
+        self.logger.info(f"Crawl of {start_url} finished: {stats}")
+        return stats
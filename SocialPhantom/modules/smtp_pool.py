@@ -0,0 +1,158 @@
+import smtplib
+import logging
+import ssl
+import time
+from email.generator import BytesGenerator
+from email.utils import parseaddr
+from typing import Dict, Optional
+
+
+def smtp_ssl_context(config: Optional[Dict]) -> Optional[ssl.SSLContext]:
+    """TLS context for the relay; None when 'smtp_ssl' is false (plain SMTP, e.g. a local sink)
+
+    'smtp_cafile' adds a CA bundle to trust, such as a test sink's self-signed certificate.
+    """
+    config = config or {}
+    if not config.get('smtp_ssl', True):
+        return None
+    return ssl.create_default_context(cafile=config.get('smtp_cafile'))
+
+
+def connect_smtp(config: Dict, ssl_context: Optional[ssl.SSLContext] = None, timeout: float = 30) -> smtplib.SMTP:
+    """Connect to the configured relay over implicit TLS, or plain SMTP when 'smtp_ssl' is false"""
+    if config.get('smtp_ssl', True):
+        server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'],
+                                  context=ssl_context or smtp_ssl_context(config), timeout=timeout)
+    else:
+        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'], timeout=timeout)
+    return server
+
+
+class DotStuffingWriter:
+    """File-like sink that dot-stuffs DATA bytes and writes them to the socket in chunks"""
+
+    def __init__(self, sock, chunk_size: int = 64 * 1024):
+        self.sock = sock
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.at_line_start = True
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        if self.at_line_start and data[:1] == b'.':
+            self.buffer += b'.'
+        self.buffer += data.replace(b'\n.', b'\n..')
+        self.at_line_start = data.endswith(b'\n')
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.sock.sendall(self.buffer)
+            self.buffer.clear()
+
+    def finish(self):
+        """Terminate the DATA section"""
+        if not self.at_line_start:
+            self.buffer += b'\r\n'
+        self.buffer += b'.\r\n'
+        self.flush()
+
+
+class SMTPSession:
+    """Long-lived authenticated SMTP connection owned by a single worker"""
+
+    def __init__(self, config: Dict, ssl_context: Optional[ssl.SSLContext] = None,
+                 max_messages: int = 100, timeout: float = 30):
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.ssl_context = ssl_context
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.server = None
+        self.messages_sent = 0
+        self.connected_at = None
+
+    def _connect(self):
+        """Open the connection and authenticate"""
+        self.server = connect_smtp(self.config, self.ssl_context, self.timeout)
+        self.server.login(self.config['username'], self.config['password'])
+        self.messages_sent = 0
+        self.connected_at = time.monotonic()
+        self.logger.debug(f"Opened SMTP session to {self.config['smtp_server']}")
+
+    def _ensure_connected(self):
+        """Connect lazily and recycle the connection once it hit its message cap"""
+        if self.server is not None and self.max_messages and self.messages_sent >= self.max_messages:
+            self.logger.debug(f"Recycling SMTP session after {self.messages_sent} messages")
+            self.close()
+        if self.server is None:
+            self._connect()
+
+    def _with_reconnect(self, send):
+        """Run a send, reconnecting once if the relay dropped the session"""
+        self._ensure_connected()
+        try:
+            send()
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Idle sessions are routinely dropped by relays; reconnect and retry once
+            self.logger.debug("SMTP session dropped, reconnecting")
+            self.reset()
+            self._connect()
+            send()
+        self.messages_sent += 1
+
+    def send_message(self, msg, from_addr: Optional[str] = None, to_addrs=None):
+        """Send a message serialized in memory by smtplib"""
+        self._with_reconnect(lambda: self.server.send_message(msg, from_addr, to_addrs))
+
+    def stream_message(self, msg, from_addr: Optional[str] = None, to_addrs=None):
+        """Send a message, serializing it straight onto the socket instead of into a buffer"""
+        self._with_reconnect(lambda: self._stream(msg, from_addr, to_addrs))
+
+    def _stream(self, msg, from_addr: Optional[str], to_addrs):
+        server = self.server
+        from_addr = from_addr or parseaddr(msg['From'])[1]
+        to_addrs = to_addrs or [parseaddr(msg['To'])[1]]
+
+        code, resp = server.mail(from_addr)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        for addr in to_addrs:
+            code, resp = server.rcpt(addr)
+            if code not in (250, 251):
+                server.rset()
+                raise smtplib.SMTPRecipientsRefused({addr: (code, resp)})
+        code, resp = server.docmd('data')
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, resp)
+
+        writer = DotStuffingWriter(server.sock)
+        BytesGenerator(writer, policy=msg.policy.clone(linesep='\r\n')).flatten(msg)
+        writer.finish()
+        code, resp = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+
+    def reset(self):
+        """Discard the current connection without a clean QUIT"""
+        if self.server is not None:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+        self.server = None
+
+    def close(self):
+        """Close the connection gracefully"""
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        finally:
+            self.reset()
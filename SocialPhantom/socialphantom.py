@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 import argparse
-import os
 import logging
-import json
-from datetime import datetime
-from typing import Optional
+import sys
 from enum import Enum, auto
+from core.campaign_manager import CampaignManager
+from core.progress import ProgressPrinter, RunProgress
 
 class CampaignType(Enum):
     PHISHING = auto()
@@ -21,59 +20,29 @@ class CampaignType(Enum):
     OSINT = auto()
     METADATA = auto()
 
-# Advanced logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('socialphantom.log'),
-        logging.StreamHandler()
-    ]
-)
 VERSION = "1.0.0"
 
-def create_campaign(name: str, campaign_type: CampaignType, config: Optional[dict] = None) -> bool:
-    """Create a new campaign with enhanced directory structure"""
-    try:
-        campaign_path = f"campaigns/{name}"
-        os.makedirs(campaign_path, exist_ok=True)
-        
-        # Default enhanced configuration
-        default_config = {
-            'name': name,
-            'type': campaign_type.name,
-            'created': datetime.now().isoformat(),
-            'status': 'draft',
-            'targets': [],
-            'schedule': None,
-            'language': 'en',
-            'stats': {
-                'targets_reached': 0,
-                'interactions': 0,
-                'success_rate': 0.0
-            }
-        }
-        
-        # Merge with provided config
-        if config:
-            default_config.update(config)
-        
-        # Save config
-        with open(f"{campaign_path}/config.json", 'w') as f:
-            json.dump(default_config, f, indent=2)
-            
-        # Create subdirectories
-        os.makedirs(f"{campaign_path}/templates", exist_ok=True)
-        os.makedirs(f"{campaign_path}/logs", exist_ok=True)
-        os.makedirs(f"{campaign_path}/reports", exist_ok=True)
-        
-        logging.info(f"Created advanced campaign: {name} ({campaign_type.name})")
-        return True
-    except Exception as e:
-        logging.error(f"Failed to create campaign: {str(e)}", exc_info=True)
-        return False
+# `campaign run` template when --template is omitted: a template file for phishing,
+# a template name under templates/bec/ for BEC
+DEFAULT_TEMPLATES = {
+    'PHISHING': 'templates/phishing_template.html',
+    'BEC': 'ceo_fraud',
+}
+
+def configure_logging(console_level: int = logging.INFO):
+    """Advanced logging configuration, applied when the CLI runs rather than on import"""
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('socialphantom.log'),
+            console
+        ]
+    )
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description=f"SocialPhantom v{VERSION} - Advanced Cybersecurity Toolkit",
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -97,25 +66,90 @@ def main():
     
     # List campaigns
     list_parser = campaign_subparsers.add_parser('list', help='List all campaigns')
+    list_parser.add_argument('--status', help='Only campaigns with this status')
+    list_parser.add_argument('--type', choices=[t.name.lower() for t in CampaignType], help='Only campaigns of this type')
+    list_parser.add_argument('--client', help='Only campaigns for this client')
+    list_parser.add_argument('--since', help='Created on or after this date (ISO format)')
+    list_parser.add_argument('--until', help='Created before this date (ISO format)')
+    list_parser.add_argument('--limit', type=int, default=50, help='Page size')
+    list_parser.add_argument('--offset', type=int, default=0, help='Number of campaigns to skip')
+    
+    # Rebuild campaign index
+    campaign_subparsers.add_parser('reindex', help='Rebuild the campaign index from campaign directories')
+
+    # Rebuild report aggregates
+    reaggregate_parser = campaign_subparsers.add_parser(
+        'reaggregate', help="Rebuild a campaign's report aggregates from its event log")
+    reaggregate_parser.add_argument('--name', required=True, help='Campaign name')
     
     # Run campaign
     run_parser = campaign_subparsers.add_parser('run', help='Run existing campaign')
     run_parser.add_argument('--name', required=True, help='Campaign name to run')
+    run_parser.add_argument('--targets', help='Target file (.csv, .jsonl or .json); omit to resume the queued targets')
+    run_parser.add_argument('--template', help="Email template; defaults to one for the campaign's type")
+    run_parser.add_argument('--progress-interval', type=float, default=1.0,
+                            help='Seconds between progress updates')
     
     # Delete campaign
     del_parser = campaign_subparsers.add_parser('delete', help='Delete campaign')
     del_parser.add_argument('--name', required=True, help='Campaign name to delete')
     
-    args = parser.parse_args()
-    
-    if args.command == 'campaign':
-        if args.action == 'create':
-            campaign_type = CampaignType[args.type.upper()]
-            config = {
-                'language': args.language,
-                'schedule': args.schedule
-            }
-            create_campaign(args.name, campaign_type, config)
+    args = parser.parse_args(argv)
+    # Per-message delivery logs would bury the progress line; they still go to the log file
+    configure_logging(logging.WARNING if args.action == 'run' else logging.INFO)
+
+    manager = CampaignManager()
+    try:
+        return run_command(manager, args)
+    finally:
+        manager.shutdown()
+
+def run_command(manager: CampaignManager, args) -> int:
+    """Carry out a parsed `campaign` action; returns the exit status"""
+    if args.action == 'create':
+        settings = {'language': args.language, 'schedule': args.schedule}
+        created = manager.create_campaign(args.name, CampaignType[args.type.upper()].name,
+                                          {'settings': settings})
+        return 0 if created else 1
+    elif args.action == 'list':
+        campaigns = manager.list_campaigns(status=args.status,
+                                           campaign_type=args.type.upper() if args.type else None,
+                                           client=args.client, created_after=args.since,
+                                           created_before=args.until, limit=args.limit, offset=args.offset)
+        for campaign in campaigns:
+            print(f"{campaign['name']:<30} {campaign.get('type', ''):<12} "
+                  f"{campaign.get('status', ''):<10} {campaign.get('created', '')}")
+    elif args.action == 'reindex':
+        print(f"Indexed {manager.rebuild_index()} campaigns")
+    elif args.action == 'reaggregate':
+        try:
+            count = manager.rebuild_aggregates(args.name)
+        except ValueError as e:
+            print(e)
+            return 1
+        print(f"Rebuilt aggregates for {args.name} from {count} events")
+    elif args.action == 'run':
+        template = args.template
+        if template is None:
+            campaign = manager.get_campaign(args.name)
+            if campaign is None:
+                print(f"Campaign '{args.name}' not found")
+                return 1
+            template = DEFAULT_TEMPLATES.get(campaign.get('type'))
+            if template is None:
+                print(f"No default template for {campaign.get('type')} campaigns; pass --template")
+                return 1
+        progress = RunProgress()
+        printer = ProgressPrinter(progress, sys.stdout, args.progress_interval)
+        printer.start()
+        try:
+            succeeded = manager.run_campaign(args.name, args.targets or [], template, progress)
+        finally:
+            printer.stop()
+        return 0 if succeeded else 1
+    elif args.action == 'delete':
+        return 0 if manager.delete_campaign(args.name) else 1
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
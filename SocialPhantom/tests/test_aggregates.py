@@ -0,0 +1,107 @@
+import unittest
+import json
+import shutil
+from pathlib import Path
+from core.aggregates import CampaignAggregates, DepartmentLookup
+from core.campaign_manager import CampaignManager
+from core.event_log import CampaignEventLog
+from core.reporting import build_report, load_event_log
+from modules.send_queue import PersistentSendQueue
+
+T0 = 1700000000.0
+
+EVENTS = [
+    {"campaign": "demo", "type": "email_sent", "timestamp": T0,
+     "target": {"email": "a@example.com", "department": "Finance"}},
+    {"campaign": "demo", "type": "email_sent", "timestamp": T0 + 1,
+     "target": {"email": "b@example.com", "department": "IT"}},
+    {"campaign": "demo", "type": "open", "recipient": "a@example.com", "timestamp": T0 + 60},
+    {"campaign": "demo", "type": "open", "recipient": "a@example.com", "timestamp": T0 + 90},
+    {"campaign": "demo", "type": "click", "recipient": "A@Example.com", "timestamp": T0 + 4000},
+    {"campaign": "demo", "type": "report", "recipient": "b@example.com", "timestamp": T0 + 7300},
+    {"campaign": "demo", "type": "open", "recipient": "token123", "timestamp": T0 + 50},
+]
+
+class TestAggregates(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/aggregates_test")
+        (self.test_dir / "demo").mkdir(parents=True, exist_ok=True)
+        queue = PersistentSendQueue(self.test_dir / "demo" / "queue.db")
+        queue.enqueue([{"email": "a@example.com", "department": "Finance"},
+                       {"email": "b@example.com", "department": "IT"}])
+        queue.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _ingest(self):
+        lookup = DepartmentLookup(self.test_dir)
+        log = CampaignEventLog(self.test_dir)
+        aggregates = CampaignAggregates(self.test_dir, flush_events=3)
+        for event in EVENTS:
+            department = lookup.department("demo", event)
+            log.record(event, department)
+            aggregates.record(event, department)
+            aggregates.maybe_flush()
+        aggregates.flush()
+        log.close()
+        return lookup, log, aggregates
+
+    def test_department_lookup_from_send_queue(self):
+        lookup = DepartmentLookup(self.test_dir)
+        self.assertEqual(lookup.department("demo", {"recipient": "A@example.com"}), "Finance")
+        self.assertEqual(lookup.department("demo", {"recipient": "nobody@example.com"}), "unknown")
+        self.assertEqual(lookup.department("other", {"recipient": "a@example.com"}), "unknown")
+        self.assertEqual(lookup.department("demo", {"department": "Sales", "recipient": "a@example.com"}), "Sales")
+        lookup.close()
+
+    def test_incremental_groups_match_batch_report(self):
+        lookup, log, aggregates = self._ingest()
+        summary = aggregates.summary("demo")
+        report = build_report(load_event_log(log.path("demo")))
+
+        self.assertEqual(summary["overall"], report["overall"])
+        self.assertEqual(summary["departments"], report["departments"])
+        self.assertEqual(summary["hourly_funnel"], report["hourly_funnel"])
+        self.assertEqual(summary["event_counts"]["open"], 3)
+        self.assertIn(("Finance", int(T0 // 3600), "open", 2, 1), aggregates.groups("demo"))
+        aggregates.close()
+        lookup.close()
+
+    def test_rebuild_from_log_reproduces_groups(self):
+        lookup, log, aggregates = self._ingest()
+        before = aggregates.groups("demo")
+
+        self.assertEqual(aggregates.rebuild("demo", log.path("demo"), lookup), len(EVENTS))
+        self.assertEqual(aggregates.groups("demo"), before)
+        with self.assertRaises(ValueError):
+            aggregates.rebuild("missing", log.path("missing"))
+        aggregates.close()
+        lookup.close()
+
+    def test_campaign_manager_serves_views_from_aggregates(self):
+        config = self.test_dir / "email_config.json"
+        config.write_text(json.dumps({"smtp_server": "127.0.0.1", "smtp_port": 2525, "smtp_ssl": False,
+                                      "username": "u", "password": "p", "sender_email": "s@example.com",
+                                      "sender_name": "S", "pool_size": 1}))
+        cm = CampaignManager(str(self.test_dir / "campaigns"), email_config=str(config))
+        try:
+            cm.create_campaign("demo", "PHISHING")
+            for event in EVENTS[:3]:
+                cm._process_event(dict(event))
+
+            summary = cm.campaign_summary("demo")
+            self.assertEqual(summary["overall"]["sent"], 2)
+            self.assertEqual(summary["overall"]["open_rate"], 0.5)
+            listed = cm.list_campaigns(with_summary=True)
+            self.assertEqual(listed[0]["summary"]["opened"], 1)
+            self.assertNotIn("summary", cm.list_campaigns()[0])
+            self.assertEqual(cm.rebuild_aggregates("demo"), 3)
+            self.assertEqual(cm.campaign_summary("demo"), summary)
+            self.assertIsNone(cm.campaign_summary("missing"))
+            self.assertTrue(cm.delete_campaign("demo"))
+        finally:
+            cm.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import os
+import json
 import shutil
 from pathlib import Path
 from unittest.mock import patch, MagicMock
@@ -39,7 +40,7 @@ class TestBECSimulator(unittest.TestCase):
         mock_smtp.return_value.__enter__.return_value = mock_server
         
         # Test BEC email
-        bec = BECSimulator(str(self.config_path))
+        bec = BECSimulator(str(self.config_path), templates_dir=str(self.template_dir))
         target = {
             "email": "target@example.com",
             "name": "John Doe",
@@ -52,6 +53,62 @@ class TestBECSimulator(unittest.TestCase):
         mock_server.login.assert_called_once()
         mock_server.send_message.assert_called_once()
 
+    @patch('smtplib.SMTP_SSL')
+    def test_failed_send_is_not_tracked(self, mock_smtp):
+        mock_smtp.return_value.__enter__.return_value.send_message.side_effect = OSError("relay down")
+        bec = BECSimulator(str(self.config_path), templates_dir=str(self.template_dir))
+
+        self.assertFalse(bec.send_bec_email("test_template", {"email": "target@example.com"}, "ceo@company.com"))
+        self.assertIsNone(bec.get_tracking_data("target@example.com"))
+        self.assertEqual(len(bec.tracking_store), 0)
+
+        mock_smtp.return_value.__enter__.return_value.send_message.side_effect = None
+        self.assertTrue(bec.send_bec_email("test_template", {"email": "target@example.com"}, "ceo@company.com"))
+        self.assertIsNotNone(bec.get_tracking_data("target@example.com")["token"])
+
+    @patch('smtplib.SMTP_SSL')
+    def test_pixel_uses_configured_tracking_url(self, mock_smtp):
+        mock_server = mock_smtp.return_value.__enter__.return_value
+        config = json.loads(self.config_path.read_text())
+        config["tracking_server"] = {"port": 8100, "url": "https://pixel.test/"}
+        self.config_path.write_text(json.dumps(config))
+        bec = BECSimulator(str(self.config_path), templates_dir=str(self.template_dir))
+
+        target = {"email": "target@example.com", "tracking_token": "tok1"}
+        self.assertTrue(bec.send_bec_email("test_template", target, "ceo@company.com", "q3"))
+        message = mock_server.send_message.call_args[0][0].as_string()
+        self.assertIn("https://pixel.test/track/q3?r=tok1&amp;open=1", message)
+        self.assertEqual(bec.get_tracking_data("target@example.com")["token"], "tok1")
+        self.assertEqual((bec.tracking["host"], bec.tracking["port"]), ("127.0.0.1", 8100))
+
+    @patch('smtplib.SMTP_SSL')
+    def test_bec_run_serves_pixels_and_counts_opens(self, mock_smtp):
+        import http.client
+        import time
+        from modules.send_queue import PersistentSendQueue
+        config = json.loads(self.config_path.read_text())
+        config.update(tracking_server={"host": "127.0.0.1", "port": 0},
+                      rate_limits={"global_per_minute": 0, "per_domain_per_minute": 0})
+        self.config_path.write_text(json.dumps(config))
+        cm = CampaignManager(str(self.test_dir / "campaigns"), email_config=str(self.config_path))
+        try:
+            self.assertTrue(cm.create_campaign("wire", "BEC"))
+            self.assertTrue(cm.run_campaign("wire", [{"email": "cfo@example.com"}], "ceo_fraud"))
+            queue = PersistentSendQueue(self.test_dir / "campaigns" / "wire" / "queue.db")
+            token = queue.conn.execute("SELECT token FROM sends").fetchone()[0]
+            queue.close()
+
+            conn = http.client.HTTPConnection("127.0.0.1", cm.tracking_server.port, timeout=5)
+            conn.request("GET", f"/track/wire?r={token}&open=1")
+            self.assertEqual(conn.getresponse().read()[:4], b"\x89PNG")
+            conn.close()
+            deadline = time.monotonic() + 5
+            while cm.get_campaign("wire")["stats"]["opens"] < 1 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(cm.get_campaign("wire")["stats"]["opens"], 1)
+        finally:
+            cm.shutdown()
+
     def test_bec_campaign_events(self):
         # Test campaign manager integration
         cm = CampaignManager(str(self.test_dir / "campaigns"))
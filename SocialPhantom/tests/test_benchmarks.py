@@ -0,0 +1,39 @@
+import unittest
+import shutil
+from pathlib import Path
+from benchmarks import suite  # noqa: F401
+from benchmarks.harness import BENCHMARKS, compare, load_results, run_benchmarks, save_results
+
+def document(**rates):
+    return {'results': {name: {'ops_per_sec': rate} for name, rate in rates.items()}}
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/bench_test")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_compare_flags_drops_beyond_threshold(self):
+        baseline = document(render=1000.0, mime=500.0, queue=200.0)
+        current = document(render=850.0, mime=350.0, queue=400.0, new=10.0)
+
+        regressions = compare(current, baseline, threshold=0.2)
+
+        self.assertEqual([r['name'] for r in regressions], ['mime'])
+        self.assertEqual(regressions[0]['change'], -0.3)
+        self.assertEqual(compare(current, baseline, threshold=0.4), [])
+
+    def test_every_benchmark_runs(self):
+        results = run_benchmarks(repeat=1)
+
+        self.assertEqual(set(results['results']), set(BENCHMARKS))
+        for name, result in results['results'].items():
+            self.assertGreater(result['ops_per_sec'], 0, name)
+
+        path = self.test_dir / "results.json"
+        save_results(results, path)
+        self.assertEqual(compare(load_results(path), results), [])
+
+if __name__ == '__main__':
+    unittest.main()
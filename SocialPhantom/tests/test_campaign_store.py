@@ -0,0 +1,73 @@
+import unittest
+import json
+import shutil
+from pathlib import Path
+from core.campaign_store import CampaignIndex
+from core.campaign_manager import CampaignManager
+
+class TestCampaignIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/index_test")
+        self.test_dir.mkdir(exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _campaign(self, name, created, status="draft", campaign_type="PHISHING", client=None):
+        return {"name": name, "type": campaign_type, "status": status, "client": client,
+                "created": created, "stats": {}}
+
+    def test_filtered_paginated_listing(self):
+        index = CampaignIndex(self.test_dir)
+        index.upsert(self._campaign("a", "2024-01-05T10:00:00", client="acme"))
+        index.upsert(self._campaign("b", "2024-02-05T10:00:00", status="running", client="acme"))
+        index.upsert(self._campaign("c", "2024-03-05T10:00:00", campaign_type="BEC"))
+        index.upsert(self._campaign("d", "2024-04-05T10:00:00", client="acme"))
+
+        self.assertEqual([c["name"] for c in index.query(client="acme")], ["a", "b", "d"])
+        self.assertEqual([c["name"] for c in index.query(status="draft", campaign_type="PHISHING")], ["a", "d"])
+        self.assertEqual([c["name"] for c in index.query(created_after="2024-02-01", created_before="2024-04-01")], ["b", "c"])
+        self.assertEqual([c["name"] for c in index.query(limit=2, offset=1)], ["b", "c"])
+        self.assertEqual(index.get("c")["type"], "BEC")
+        index.remove("c")
+        self.assertIsNone(index.get("c"))
+
+    def test_rebuild_from_directories(self):
+        for name in ("x", "y"):
+            (self.test_dir / name).mkdir()
+            (self.test_dir / name / "config.json").write_text(
+                json.dumps(self._campaign(name, "2024-01-01T00:00:00")))
+
+        # A fresh index file is built from the existing directories
+        index = CampaignIndex(self.test_dir)
+        self.assertEqual(index.count(), 2)
+
+        (self.test_dir / "x" / "config.json").write_text(
+            json.dumps(self._campaign("x", "2024-01-01T00:00:00", status="completed")))
+        shutil.rmtree(self.test_dir / "y")
+        self.assertEqual(index.rebuild(), 1)
+        self.assertEqual(index.get("x")["status"], "completed")
+
+class TestRunCampaignLookup(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/run_lookup_test")
+        self.manager = CampaignManager(str(self.test_dir))
+
+    def tearDown(self):
+        self.manager.shutdown()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_unsupported_types_are_not_run(self):
+        self.manager.create_campaign("call", "VISHING")
+        self.assertFalse(self.manager.run_campaign("call", [{"email": "a@example.com"}], "template.html"))
+        self.assertEqual(self.manager.get_campaign("call")["status"], "draft")
+        self.assertFalse((self.test_dir / "call" / "queue.db").exists())
+
+    def test_only_indexed_campaigns_are_run(self):
+        (self.test_dir / "stray").mkdir()
+        for name in ("stray", "..", "", "missing"):
+            self.assertFalse(self.manager.run_campaign(name, [], "template.html"))
+        self.assertFalse((self.test_dir / "stray" / "queue.db").exists())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from core.progress import RunProgress, format_progress
+from tools.smtp_sink import SMTPSink
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+class TestRunProgress(unittest.TestCase):
+    def test_counters_rate_and_eta(self):
+        progress = RunProgress(queued=10, window=60)
+        # As if the run had started two seconds ago
+        progress.samples[0] = (progress.started - 2, 0)
+        for success in (True, True, True, False):
+            progress.record(success)
+        snapshot = progress.snapshot()
+        self.assertEqual((snapshot["sent"], snapshot["failed"], snapshot["remaining"]), (3, 1, 6))
+        self.assertAlmostEqual(snapshot["rate"], 2.0, delta=0.2)
+        self.assertEqual(snapshot["eta"], 3)
+        self.assertIn("queued 10 | sent 3 | failed 1", format_progress(snapshot))
+
+    def test_eta_unknown_until_something_is_delivered(self):
+        snapshot = RunProgress(queued=5).snapshot()
+        self.assertIsNone(snapshot["eta"])
+        self.assertIn("ETA unknown", format_progress(snapshot))
+
+
+class TestCLI(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/cli_test")
+        (self.test_dir / "config").mkdir(parents=True, exist_ok=True)
+        (self.test_dir / "template.html").write_text("<p>Hello {{name}}</p>")
+        with open(self.test_dir / "targets.jsonl", "w") as f:
+            for i in range(20):
+                f.write(json.dumps({"email": f"user{i}@example.com", "name": f"User {i}"}) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _cli(self, *args):
+        env = dict(os.environ, PYTHONPATH=str(REPO_DIR))
+        return subprocess.run([sys.executable, str(REPO_DIR / "socialphantom.py"), "campaign", *args],
+                              cwd=self.test_dir, env=env, capture_output=True, text=True, timeout=120)
+
+    def test_campaign_lifecycle_through_manager(self):
+        with SMTPSink() as sink:
+            (self.test_dir / "config" / "email_config.json").write_text(json.dumps({
+                "smtp_server": "127.0.0.1", "smtp_port": sink.port, "smtp_ssl": False,
+                "username": "user", "password": "secret", "sender_email": "no-reply@example.com",
+                "sender_name": "Test", "subject": "Test", "pool_size": 2,
+                "rate_limits": {"global_per_minute": 0, "per_domain_per_minute": 0}}))
+            self.assertEqual(self._cli("create", "--name", "q3", "--type", "phishing", "--language", "de").returncode, 0)
+            config = json.loads((self.test_dir / "campaigns" / "q3" / "config.json").read_text())
+            self.assertEqual(config["settings"]["language"], "de")
+            self.assertIsNone(config["settings"]["allowed_domains"])
+
+            run = self._cli("run", "--name", "q3", "--targets", "targets.jsonl", "--template", "template.html",
+                            "--progress-interval", "0.05")
+            self.assertEqual(run.returncode, 0, run.stderr)
+            self.assertIn("queued 20 | sent 20 | failed 0", run.stdout.splitlines()[-1])
+            self.assertEqual(sink.metrics()["messages"], 20)
+
+        self.assertIn("q3", self._cli("list").stdout)
+        self.assertIn("from 20 events", self._cli("reaggregate", "--name", "q3").stdout)
+        self.assertEqual(self._cli("delete", "--name", "q3").returncode, 0)
+        self.assertEqual(self._cli("list").stdout.strip(), "")
+        self.assertEqual(self._cli("delete", "--name", "q3").returncode, 1)
+
+    def test_run_defaults_the_template_to_the_campaign_type(self):
+        (self.test_dir / "templates" / "bec").mkdir(parents=True)
+        shutil.copy(REPO_DIR / "templates" / "bec" / "ceo_fraud.html", self.test_dir / "templates" / "bec")
+        with SMTPSink(store=True) as sink:
+            (self.test_dir / "config" / "email_config.json").write_text(json.dumps({
+                "smtp_server": "127.0.0.1", "smtp_port": sink.port, "smtp_ssl": False,
+                "username": "user", "password": "secret", "tracking_server": {"port": 0},
+                "rate_limits": {"global_per_minute": 0, "per_domain_per_minute": 0}}))
+            self.assertEqual(self._cli("create", "--name", "wire", "--type", "bec").returncode, 0)
+            run = self._cli("run", "--name", "wire", "--targets", "targets.jsonl")
+            self.assertEqual(run.returncode, 0, run.stderr)
+            self.assertEqual(len(sink.messages), 20)
+            self.assertIn(b"urgent wire transfer", sink.messages[0])
+
+        self.assertEqual(self._cli("create", "--name", "call", "--type", "vishing").returncode, 0)
+        self.assertEqual(self._cli("run", "--name", "call").returncode, 1)
+
+    def test_delete_refuses_names_outside_the_campaigns(self):
+        (self.test_dir / "campaigns" / "keep").mkdir(parents=True)
+        for name in ("..", ".", "", "keep/..", "keep"):
+            self.assertEqual(self._cli("delete", "--name", name).returncode, 1)
+        self.assertTrue((self.test_dir / "targets.jsonl").exists())
+        self.assertTrue((self.test_dir / "campaigns" / "keep").is_dir())
+
+
+if __name__ == '__main__':
+    unittest.main()
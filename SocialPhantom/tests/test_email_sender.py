@@ -0,0 +1,311 @@
+import unittest
+import asyncio
+import json
+import shutil
+import smtplib
+import threading
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from modules.smtp_pool import SMTPSession, DotStuffingWriter
+from modules.email_sender import EmailSender, SendDescriptor
+from modules.async_email_sender import AsyncEmailSender
+from modules.attachment_cache import AttachmentCache
+
+CONFIG = {
+    "smtp_server": "smtp.test.com",
+    "smtp_port": 465,
+    "username": "test@test.com",
+    "password": "test123"
+}
+
+class TestSMTPSession(unittest.TestCase):
+    @patch('smtplib.SMTP_SSL')
+    def test_session_is_reused(self, mock_smtp):
+        session = SMTPSession(CONFIG, max_messages=10)
+        for _ in range(3):
+            session.send_message(MagicMock())
+
+        mock_smtp.assert_called_once()
+        mock_smtp.return_value.login.assert_called_once()
+        self.assertEqual(mock_smtp.return_value.send_message.call_count, 3)
+
+    @patch('smtplib.SMTP_SSL')
+    def test_session_recycled_after_cap(self, mock_smtp):
+        session = SMTPSession(CONFIG, max_messages=2)
+        for _ in range(5):
+            session.send_message(MagicMock())
+
+        self.assertEqual(mock_smtp.call_count, 3)
+
+    @patch('smtplib.SMTP_SSL')
+    def test_reconnect_on_disconnect(self, mock_smtp):
+        server = MagicMock()
+        server.send_message.side_effect = [None, smtplib.SMTPServerDisconnected(), None]
+        mock_smtp.return_value = server
+
+        session = SMTPSession(CONFIG, max_messages=0)
+        session.send_message(MagicMock())
+        session.send_message(MagicMock())
+
+        self.assertEqual(mock_smtp.call_count, 2)
+        self.assertEqual(session.messages_sent, 1)
+
+    @patch('smtplib.SMTP_SSL')
+    def test_close_quits_server(self, mock_smtp):
+        session = SMTPSession(CONFIG)
+        session.send_message(MagicMock())
+        session.close()
+
+        mock_smtp.return_value.quit.assert_called_once()
+        self.assertIsNone(session.server)
+
+class FakeSMTPServer:
+    """Just enough of an SMTP server to accept messages over plain TCP"""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 fake ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.strip().upper()
+            if command.startswith(b"EHLO"):
+                writer.write(b"250-fake\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command.startswith(b"AUTH"):
+                writer.write(b"235 ok\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 go ahead\r\n")
+                await writer.drain()
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self.messages.append(data)
+                writer.write(b"250 queued\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+class TestAsyncEmailSender(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/async_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.template = self.test_dir / "template.html"
+        self.template.write_text("<html><body>Hello {{name}}</body></html>")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _sender(self, port):
+        config_path = self.test_dir / "email_config.json"
+        config_path.write_text(json.dumps({
+            **CONFIG,
+            "smtp_server": "127.0.0.1",
+            "smtp_port": port,
+            "sender_email": "no-reply@test.com",
+            "sender_name": "Security Team",
+            "pool_size": 2,
+            "tracking_url": "http://tracker.example.com"
+        }))
+        sender = AsyncEmailSender(str(config_path), max_concurrency=10)
+        sender.ssl_context = None  # plain TCP for the fake server
+        return sender
+
+    def test_send_batch(self):
+        fake = FakeSMTPServer()
+
+        async def run():
+            server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            targets = [{"email": f"user{i}@test.com", "name": f"User {i}", "tracking_token": f"tok{i}"}
+                       for i in range(20)]
+            async with server:
+                return await self._sender(port).send_batch(str(self.template), targets, "demo")
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(r["success"] for r in results))
+        self.assertEqual(results[3]["recipient"], "user3@test.com")
+        self.assertEqual(len(fake.messages), 20)
+        self.assertLessEqual(fake.connections, 2)
+        self.assertIn(b"tracker.example.com/track/demo?r=tok3&amp;open=1", b"".join(fake.messages))
+
+    def test_pool_kept_open_across_batches(self):
+        fake = FakeSMTPServer()
+
+        async def run():
+            server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+            sender = self._sender(server.sockets[0].getsockname()[1])
+            results = []
+            async with server:
+                for batch in range(3):
+                    targets = [f"user{batch}-{i}@test.com" for i in range(10)]
+                    results += await sender.send_batch(str(self.template), targets, "demo", keep_open=True)
+                await sender.close()
+            return results
+
+        results = asyncio.run(run())
+
+        self.assertTrue(all(r["success"] for r in results))
+        self.assertEqual(len(fake.messages), 30)
+        self.assertLessEqual(fake.connections, 2)
+
+class TestTrackedLinks(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/links_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.template = self.test_dir / "template.html"
+        self.template.write_text('<html><body><a href="{{verification_link}}">Verify</a>'
+                                 '<form action="http://track.test:5000/capture"></form>'
+                                 '<a href="https://elsewhere.test/">Help</a></body></html>')
+        self.config_path = self.test_dir / "email_config.json"
+        self.config_path.write_text(json.dumps(dict(CONFIG, sender_email="no-reply@test.com", sender_name="IT",
+                                                    tracking_url="http://track.test:5000/")))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_links_carry_the_recipient_token(self):
+        sender = EmailSender(str(self.config_path))
+        msg = sender.build_message(str(self.template), "a@test.com", "q3", {"tracking_token": "tok123"})
+        html = msg.get_payload()[0].get_payload(decode=True).decode()
+        self.assertIn('href="http://track.test:5000/track/q3?r=tok123"', html)
+        self.assertIn('action="http://track.test:5000/capture?r=tok123"', html)
+        self.assertIn('href="https://elsewhere.test/"', html)
+        self.assertIn('<img src="http://track.test:5000/track/q3?r=tok123&amp;open=1"', html)
+
+class TestTemplateValidation(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/validation_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.template = self.test_dir / "template.html"
+        self.template.write_text("<html><body>Hi {{nmae}}</body></html>")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _sender(self, sender_class, strict):
+        config_path = self.test_dir / "email_config.json"
+        config_path.write_text(json.dumps(dict(CONFIG, sender_email="no-reply@test.com", sender_name="IT",
+                                               strict_templates=strict)))
+        return sender_class(str(config_path))
+
+    def test_strict_senders_refuse_unknown_placeholders(self):
+        sender = self._sender(EmailSender, True)
+        self.assertFalse(sender.send_phishing_email(str(self.template), "a@test.com", "demo", {"name": "A"}))
+        self.assertEqual(sender.threads, [])
+
+        result = asyncio.run(self._sender(AsyncEmailSender, True).send_batch(
+            str(self.template), [{"email": "a@test.com", "name": "A"}], "demo"))
+        self.assertFalse(result[0]["success"])
+        self.assertIn("nmae", result[0]["error"])
+
+    def test_template_checked_once_when_compiled(self):
+        sender = self._sender(EmailSender, False)
+        with self.assertLogs("modules.email_sender", "WARNING") as logs:
+            for _ in range(3):
+                sender.build_message(str(self.template), "a@test.com", "demo", {"name": "A"})
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("nmae", logs.output[0])
+
+class TestStreamingDelivery(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/stream_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.template = self.test_dir / "template.html"
+        self.template.write_text("<html><body>Hi {{name}}\n.hidden line\n</body></html>")
+
+        self.fake = FakeSMTPServer()
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.fake.handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_dot_stuffing_across_writes(self):
+        sent = []
+        sock = MagicMock()
+        sock.sendall.side_effect = lambda data: sent.append(bytes(data))
+        writer = DotStuffingWriter(sock)
+        writer.write(b"a\r\n")
+        writer.write(b".b\r\n.c")
+        writer.finish()
+
+        self.assertEqual(sent, [b"a\r\n..b\r\n..c\r\n.\r\n"])
+
+    def test_queue_holds_descriptors_and_worker_streams(self):
+        config_path = self.test_dir / "email_config.json"
+        config_path.write_text(json.dumps({
+            **CONFIG,
+            "smtp_server": "127.0.0.1",
+            "smtp_port": self.port,
+            "sender_email": "no-reply@test.com",
+            "sender_name": "Security Team",
+            "pool_size": 1
+        }))
+        plain_smtp = lambda host, port, context=None, timeout=None: smtplib.SMTP(host, port, timeout=timeout)
+        with patch('smtplib.SMTP_SSL', plain_smtp):
+            sender = EmailSender(str(config_path))
+            with patch.object(sender.email_queue, 'put', wraps=sender.email_queue.put) as put:
+                for i in range(3):
+                    self.assertTrue(sender.send_phishing_email(str(self.template), f"u{i}@test.com",
+                                                               "demo", {"name": f"U{i}"}))
+            sender.email_queue.join()
+            sender.shutdown()
+
+        self.assertIsInstance(put.call_args[0][0], SendDescriptor)
+        self.assertEqual(len(self.fake.messages), 3)
+        self.assertIn(b"\r\n..hidden line", self.fake.messages[0])
+        self.assertEqual(self.fake.connections, 1)
+
+class TestAttachmentCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/attachment_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.pdf = self.test_dir / "training.pdf"
+        self.pdf.write_bytes(b"%PDF" + bytes(range(256)) * 40)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_part_encoded_once_and_shared(self):
+        cache = AttachmentCache()
+        with patch.object(cache, '_encode', wraps=cache._encode) as encode:
+            first = cache.get(self.pdf)
+            second = cache.get(self.pdf)
+
+        encode.assert_called_once()
+        self.assertIs(first, second)
+        self.assertIn(b'filename="training.pdf"', first.as_bytes())
+
+    def test_size_bound(self):
+        other = self.test_dir / "other.pdf"
+        other.write_bytes(b"x" * 100)
+        cache = AttachmentCache(max_bytes=len(cache_payload(self.pdf)) + 10)
+        cache.get(self.pdf)
+        cache.get(other)
+
+        self.assertEqual(list(cache.entries), [str(other)])
+        self.assertLessEqual(cache.size, cache.max_bytes)
+
+def cache_payload(path):
+    return AttachmentCache()._encode(str(path)).get_payload()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+from core.event_bus import EventBus, EventBusClient
+from core.campaign_manager import CampaignManager
+from core.ingest import ingestor_from_env
+
+class TestEventBus(unittest.TestCase):
+    def setUp(self):
+        self.bus = EventBus()
+
+    def tearDown(self):
+        self.bus.close()
+
+    def test_fan_out_to_every_subscriber(self):
+        stats = self.bus.subscribe("stats")
+        dashboard = self.bus.subscribe("dashboard")
+        for i in range(3):
+            self.bus.publish({"campaign": "demo", "type": "click", "n": i})
+
+        self.assertEqual([e["n"] for e in stats.get_batch(timeout=1)], [0, 1, 2])
+        self.assertEqual(len(dashboard.get_batch(timeout=1)), 3)
+
+    def test_get_batch_blocks_until_arrival(self):
+        stats = self.bus.subscribe("stats")
+        threading.Timer(0.05, self.bus.put, args=({"campaign": "demo", "type": "click"},)).start()
+
+        started = time.monotonic()
+        batch = stats.get_batch(timeout=5)
+        self.assertEqual(len(batch), 1)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_batch_size_and_latency_metrics(self):
+        stats = self.bus.subscribe("stats")
+        for _ in range(10):
+            self.bus.publish({"campaign": "demo", "type": "email_sent"})
+
+        self.assertEqual(len(stats.get_batch(max_items=4, timeout=1)), 4)
+        self.assertEqual(len(stats.get_batch(timeout=1)), 6)
+        metrics = self.bus.metrics()["stats"]
+        self.assertEqual(metrics["events"], 10)
+        self.assertEqual(metrics["backlog"], 0)
+        self.assertGreaterEqual(metrics["p99_ms"], metrics["p50_ms"])
+
+    def test_bounded_subscriber_drops_instead_of_blocking(self):
+        slow = self.bus.subscribe("slow", maxsize=2)
+        for _ in range(5):
+            self.bus.publish({"campaign": "demo", "type": "click"})
+
+        self.assertEqual(slow.dropped, 3)
+
+    def test_close_wakes_consumers(self):
+        stats = self.bus.subscribe("stats")
+        self.bus.close()
+
+        self.assertEqual(stats.get_batch(timeout=5), [])
+        self.assertTrue(stats.closed)
+
+    def test_events_from_another_process(self):
+        stats = self.bus.subscribe("stats")
+        address = self.bus.serve(("127.0.0.1", 0), b"test")
+        client = EventBusClient(address, b"test")
+        client.publish_many([{"campaign": "demo", "type": "click"}] * 2)
+
+        batch = []
+        while len(batch) < 2:
+            batch += stats.get_batch(timeout=5)
+        client.close()
+        self.assertEqual(batch[0]["type"], "click")
+
+    def test_serving_requires_an_authkey(self):
+        with self.assertRaises(ValueError):
+            self.bus.serve(("127.0.0.1", 0), b"")
+
+class TestCampaignMonitor(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/monitor_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.manager = CampaignManager(str(self.test_dir / "campaigns"))
+        self.manager.create_campaign("demo", "PHISHING")
+
+    def tearDown(self):
+        self.manager.shutdown()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_malformed_events_do_not_stop_the_monitor(self):
+        for event in ({"campaign": None, "type": "open", "recipient": "a@example.com"},
+                      {"campaign": ["demo"], "type": "click"}, {"campaign": "demo"},
+                      {"campaign": "demo", "type": "click", "recipient": "a@example.com"}):
+            self.manager.event_queue.put(event)
+        # The click is only counted if the monitor survived the events before it
+        self.manager.shutdown()
+        self.assertEqual(self.manager.get_campaign("demo")["stats"]["clicks"], 1)
+
+    def test_served_bus_uses_a_generated_key(self):
+        env = self.manager.serve_events()
+        self.assertEqual(len(bytes.fromhex(env["SOCIALPHANTOM_EVENT_AUTHKEY"])), 32)
+        stats = self.manager.event_queue.subscribe("probe")
+        with patch.dict(os.environ, env):
+            ingestor = ingestor_from_env(flush_interval=0.05)
+        ingestor.submit("demo", "click", "a@example.com")
+        ingestor.close()
+        self.assertEqual(stats.get_batch(timeout=5)[0]["type"], "click")
+        with patch.dict(os.environ, {"SOCIALPHANTOM_EVENT_BUS": env["SOCIALPHANTOM_EVENT_BUS"],
+                                     "SOCIALPHANTOM_EVENT_AUTHKEY": ""}):
+            with self.assertRaises(ValueError):
+                ingestor_from_env()
+
+if __name__ == '__main__':
+    unittest.main()
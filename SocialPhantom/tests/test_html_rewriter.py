@@ -0,0 +1,87 @@
+import unittest
+from modules.html_rewriter import rewrite_html, WATERMARK
+
+PAGE = """<!DOCTYPE html>
+<html><head>
+<link rel="preload stylesheet" href="css/site.css">
+<script src="/js/app.js"></script>
+<script>var a = 1; let b = 2;</script>
+</head><body class="main">
+<p id="intro">Fish &amp; chips &copy; 2024<br/></p>
+<img src="logo.png" alt="Logo"><img src="data:image/png;base64,AAAA">
+<form action="https://portal.example.com/login" method="get"><input name="user"></form>
+<!-- footer -->
+</body></html>"""
+
+class TestHtmlRewriter(unittest.TestCase):
+    def rewrite(self, **kwargs):
+        return rewrite_html(PAGE, "https://portal.example.com/app/index.html", "demo",
+                            backend="html.parser", **kwargs)
+
+    def test_assets_resolved_against_page_url(self):
+        result = self.rewrite()
+        self.assertEqual(result.assets, {
+            "https://portal.example.com/app/css/site.css": "css",
+            "https://portal.example.com/js/app.js": "js",
+            "https://portal.example.com/app/logo.png": "images",
+        })
+
+        page = result.render({"https://portal.example.com/app/logo.png": "assets/logo.png"})
+        self.assertIn('<img src="assets/logo.png" alt="Logo">', page)
+        # Unfetched assets keep their original reference
+        self.assertIn('href="css/site.css"', page)
+        self.assertIn('src="data:image/png;base64,AAAA"', page)
+
+    def test_form_rewritten_and_fields_appended(self):
+        page = self.rewrite().render({})
+        self.assertIn('<form action="/capture" method="POST">', page)
+        self.assertIn('<input name="user"><input type="hidden" name="campaign" value="demo"/>'
+                      '<input type="hidden" name="r" value=""/>'
+                      '<input type="text" name="honeypot" style="display:none"/></form>', page)
+
+    def test_watermark_follows_body(self):
+        page = self.rewrite().render({})
+        self.assertIn('<body class="main">' + WATERMARK, page)
+        self.assertEqual(page.count("TESTING ONLY"), 1)
+
+    def test_unchanged_markup_preserved(self):
+        page = self.rewrite(randomize_ids=False).render({})
+        for fragment in ("<!DOCTYPE html>", '<p id="intro">Fish &amp; chips &copy; 2024<br/></p>',
+                         "<!-- footer -->", "</body></html>"):
+            self.assertIn(fragment, page)
+
+    def test_inline_script_and_ids(self):
+        page = self.rewrite().render({})
+        self.assertIn("<script>const a = 1; const b = 2;</script>", page)
+        self.assertNotIn('id="intro"', page)
+
+        page = self.rewrite(obfuscate_js=False, randomize_ids=False).render({})
+        self.assertIn("<script>var a = 1; let b = 2;</script>", page)
+        self.assertIn('id="intro"', page)
+
+    def test_srcset_and_css_references(self):
+        source = ('<style>.hero { background: url(img/hero.jpg) }</style>'
+                  '<div style="background-image: url(\'/bg.png\')"></div>'
+                  '<img srcset="a.png 1x, b.png 2x">')
+        result = rewrite_html(source, "https://example.com/", backend="html.parser", randomize_ids=False)
+        self.assertEqual(set(result.assets), {"https://example.com/img/hero.jpg", "https://example.com/bg.png",
+                                              "https://example.com/a.png", "https://example.com/b.png"})
+
+        page = result.render({url: "assets/" + url.rsplit("/", 1)[1] for url in result.assets})
+        self.assertIn("url(assets/hero.jpg)", page)
+        self.assertIn('style="background-image: url(&#x27;assets/bg.png&#x27;)"', page)
+        self.assertIn('srcset="assets/a.png 1x, assets/b.png 2x"', page)
+
+    def test_links_mapped_to_local_pages(self):
+        source = '<a href="/about#team">About</a><a href="mailto:x@example.com">Mail</a>'
+        page = rewrite_html(source, "https://example.com/", backend="html.parser",
+                            link_map=lambda url: "about.html" if url.endswith("/about") else None).render({})
+        self.assertIn('<a href="about.html#team">', page)
+        self.assertIn('<a href="mailto:x@example.com">', page)
+
+    def test_watermark_added_to_fragment_without_body(self):
+        page = rewrite_html("<p>hi</p>", "https://example.com/", backend="html.parser").render({})
+        self.assertTrue(page.startswith(WATERMARK))
+
+if __name__ == '__main__':
+    unittest.main()
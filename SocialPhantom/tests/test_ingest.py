@@ -0,0 +1,200 @@
+import unittest
+import shutil
+import threading
+from pathlib import Path
+from core.event_bus import EventBus
+from core.ingest import EventIngestor, RecipientTokens
+from core.campaign_manager import CampaignManager
+from modules.send_queue import PersistentSendQueue
+
+class BlockedSink:
+    """Sink whose publish_many waits until released, to back the ingestor up"""
+    def __init__(self):
+        self.release = threading.Event()
+        self.events = []
+
+    def publish_many(self, events):
+        self.release.wait(5)
+        self.events.extend(events)
+
+class TestEventIngestor(unittest.TestCase):
+    def setUp(self):
+        self.bus = EventBus()
+        self.stats = self.bus.subscribe("stats")
+
+    def tearDown(self):
+        self.bus.close()
+
+    def collect(self, count):
+        events = []
+        while len(events) < count:
+            batch = self.stats.get_batch(timeout=5)
+            if not batch:
+                break
+            events += batch
+        return events
+
+    def test_events_reach_the_bus(self):
+        ingestor = EventIngestor(self.bus, flush_interval=0.05)
+        self.assertTrue(ingestor.submit("demo", "click", "tok1"))
+        self.assertTrue(ingestor.submit("demo", "open", "tok1"))
+
+        events = self.collect(2)
+        ingestor.close()
+        self.assertEqual([e["type"] for e in events], ["click", "open"])
+        self.assertEqual(events[0]["campaign"], "demo")
+        self.assertEqual(ingestor.metrics()["forwarded"], 2)
+
+    def test_repeated_hits_are_deduplicated(self):
+        ingestor = EventIngestor(self.bus, flush_interval=0.05, dedupe_window=60)
+        for _ in range(5):
+            ingestor.submit("demo", "open", "tok1")
+        ingestor.submit("demo", "open", "tok2")
+        ingestor.close()
+
+        self.assertEqual(len(self.collect(2)), 2)
+        self.assertEqual(ingestor.metrics()["duplicates"], 4)
+
+    def test_dedupe_window_expires(self):
+        ingestor = EventIngestor(self.bus, dedupe_window=0)
+        self.assertTrue(ingestor.submit("demo", "click", "tok1"))
+        self.assertTrue(ingestor.submit("demo", "click", "tok1"))
+        ingestor.close()
+
+    def test_full_buffer_drops_after_waiting(self):
+        sink = BlockedSink()
+        ingestor = EventIngestor(sink, batch_size=1, flush_interval=0.01, max_pending=2,
+                                 block_timeout=0.05)
+        results = [ingestor.submit("demo", "click", f"tok{i}") for i in range(10)]
+        sink.release.set()
+        ingestor.close()
+
+        self.assertIn(False, results)
+        metrics = ingestor.metrics()
+        self.assertGreater(metrics["dropped"], 0)
+        self.assertEqual(metrics["accepted"], len(sink.events))
+        self.assertEqual(metrics["pending"], 0)
+
+    def test_close_forwards_buffered_events(self):
+        ingestor = EventIngestor(self.bus, batch_size=100, flush_interval=60)
+        for i in range(3):
+            ingestor.submit("demo", "credential", f"tok{i}")
+        ingestor.close()
+
+        self.assertEqual(len(self.collect(3)), 3)
+
+    def test_unknown_type_rejected(self):
+        ingestor = EventIngestor(self.bus)
+        with self.assertRaises(ValueError):
+            ingestor.submit("demo", "email_sent")
+        ingestor.close()
+
+    def test_campaign_names_that_are_not_plain_are_rejected(self):
+        ingestor = EventIngestor(self.bus)
+        for name in (None, "", ".", "..", "../x", "a/b"):
+            self.assertFalse(ingestor.submit(name, "click", "a@example.com"))
+        ingestor.close()
+        self.assertEqual(ingestor.metrics()["rejected"], 6)
+
+class TestRecipientAttribution(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/attribution_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.manager = CampaignManager(str(self.test_dir / "campaigns"))
+        self.manager.create_campaign("q3", "PHISHING")
+
+    def tearDown(self):
+        self.manager.shutdown()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_link_tokens_resolve_to_the_queued_address(self):
+        queue = PersistentSendQueue(self.test_dir / "campaigns" / "q3" / "queue.db")
+        queue.enqueue([{"email": "alex@example.com"}])
+        token = queue.claim()[0].token
+        queue.close()
+
+        tokens = RecipientTokens(self.test_dir / "campaigns")
+        self.assertEqual(tokens.recipient("q3", token), "alex@example.com")
+        self.assertIsNone(tokens.recipient("q3", "forged"))
+        self.assertIsNone(tokens.recipient("q3", None))
+        self.assertIsNone(tokens.recipient("..", token))
+        tokens.close()
+
+    def test_web_server_attributes_clicks_by_link_token(self):
+        from core import web_server
+        queue = PersistentSendQueue(self.test_dir / "campaigns" / "q3" / "queue.db")
+        queue.enqueue([{"email": "alex@example.com"}])
+        token = queue.claim()[0].token
+        queue.close()
+        bus = EventBus()
+        stats = bus.subscribe("stats")
+        original = web_server.ingestor, web_server.recipient_tokens
+        web_server.ingestor = EventIngestor(bus, flush_interval=0.05)
+        web_server.recipient_tokens = RecipientTokens(self.test_dir / "campaigns")
+        try:
+            client = web_server.app.test_client()
+            client.get(f"/track/q3?r={token}")
+            client.get("/track/q3?r=forged")
+            client.get("/track/q3")
+            pixel = client.get(f"/track/q3?r={token}&open=1")
+            web_server.ingestor.close()
+            events = stats.get_batch(timeout=5)
+        finally:
+            web_server.recipient_tokens.close()
+            web_server.ingestor, web_server.recipient_tokens = original
+            bus.close()
+        self.assertEqual(pixel.mimetype, "image/png")
+        self.assertEqual([(e["type"], e["recipient"]) for e in events],
+                         [("click", "alex@example.com"), ("open", "alex@example.com")])
+
+    def test_click_landing_and_capture_carry_the_token(self):
+        from core import web_server
+        from modules.html_rewriter import rewrite_html
+        queue = PersistentSendQueue(self.test_dir / "campaigns" / "q3" / "queue.db")
+        queue.enqueue([{"email": "alex@example.com"}])
+        token = queue.claim()[0].token
+        queue.close()
+        page = rewrite_html('<form action="/login"><input name="user"></form>', "https://example.com/",
+                            "q3", backend="html.parser").render({})
+        (self.test_dir / "campaigns" / "q3" / "clones" / "index.html").write_text(page)
+        bus = EventBus()
+        stats = bus.subscribe("stats")
+        original = web_server.ingestor, web_server.recipient_tokens
+        web_server.ingestor = EventIngestor(bus, flush_interval=0.05)
+        web_server.recipient_tokens = RecipientTokens(self.test_dir / "campaigns")
+        try:
+            client = web_server.app.test_client()
+            click = client.get(f"/track/q3?r={token}")
+            landing = client.get(click.location)
+            capture = client.post("/capture", data={"campaign": "q3", "r": token, "user": "alex",
+                                                     "honeypot": ""})
+            forged = client.get("/track/q3?r=forged")
+            unattributed = client.get(forged.location).get_data(as_text=True)
+            web_server.ingestor.close()
+            events = stats.get_batch(timeout=5)
+        finally:
+            web_server.recipient_tokens.close()
+            web_server.ingestor, web_server.recipient_tokens = original
+            bus.close()
+        self.assertEqual(click.status_code, 302)
+        self.assertTrue(click.location.endswith(f"/landing/q3/index.html?r={token}"))
+        self.assertIn(f'<input type="hidden" name="r" value="{token}"/>', landing.get_data(as_text=True))
+        self.assertEqual(capture.status_code, 200)
+        self.assertTrue(forged.location.endswith("/landing/q3/index.html"))
+        self.assertIn('<input type="hidden" name="r" value=""/>', unattributed)
+        self.assertEqual([(e["type"], e["recipient"]) for e in events],
+                         [("click", "alex@example.com"), ("credential", "alex@example.com")])
+
+    def test_events_for_unknown_campaigns_are_not_logged(self):
+        self.assertFalse(self.manager.record_interaction("..", "click", "a@example.com"))
+        self.manager._process_event({"campaign": "..", "type": "click", "recipient": "a@example.com"})
+        self.manager._process_event({"campaign": "ghost", "type": "click", "recipient": "a@example.com"})
+        self.manager.event_log.flush()
+        self.manager.aggregates.flush()
+        self.assertFalse((self.test_dir / "logs").exists())
+        self.assertFalse((self.test_dir / "aggregates.db").exists())
+        self.assertFalse((self.test_dir / "campaigns" / "ghost").exists())
+        self.assertTrue(self.manager.record_interaction("q3", "click", "a@example.com"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import csv
+import json
+import shutil
+from pathlib import Path
+from core.campaign_manager import CampaignManager
+from core.event_log import CampaignEventLog
+from core.reporting import build_report, load_event_log, write_report
+
+T0 = 1700000000.0  # 2023-11-14 22:13:20 UTC
+
+def sent(email, department, at=T0):
+    return {"campaign": "demo", "type": "email_sent", "timestamp": at,
+            "target": {"email": email, "department": department}}
+
+def interaction(event_type, recipient, at):
+    return {"campaign": "demo", "type": event_type, "recipient": recipient, "timestamp": at}
+
+EVENTS = [
+    sent("a@example.com", "Finance"), sent("b@example.com", "Finance"), sent("c@example.com", "IT\tOps"),
+    interaction("open", "a@example.com", T0 + 60), interaction("open", "a@example.com", T0 + 30),
+    interaction("click", "a@example.com", T0 + 4000),
+    interaction("credential", "a@example.com", T0 + 4100),
+    interaction("open", "c@example.com", T0 + 7200), interaction("report", "c@example.com", T0 + 7300),
+    interaction("click", "stranger", T0 + 10),
+    {"campaign": "demo", "type": "unknown_type", "recipient": "a@example.com", "timestamp": T0},
+]
+
+class TestReporting(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/reporting_test")
+        (self.test_dir / "demo").mkdir(parents=True, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _log(self):
+        log = CampaignEventLog(self.test_dir, flush_events=1000, flush_interval=3600)
+        for event in EVENTS:
+            log.record(event)
+        log.record({"campaign": "missing", "type": "open", "recipient": "x"})
+        log.close()
+        self.assertFalse((self.test_dir / "missing").exists())
+        return log.path("demo")
+
+    def test_event_log_rows(self):
+        lines = self._log().read_text().splitlines()
+        self.assertEqual(len(lines), len(EVENTS))
+        self.assertEqual(lines[0], f"{T0:.3f}\temail_sent\ta@example.com\tFinance")
+        self.assertEqual(lines[2].split("\t")[3], "IT Ops")
+
+    def test_report_measures(self):
+        columns = load_event_log(self._log())
+        self.assertEqual(len(columns), len(EVENTS) - 1)
+        report = build_report(columns)
+
+        departments = {row["department"]: row for row in report["departments"]}
+        self.assertEqual(departments["Finance"]["sent"], 2)
+        self.assertEqual(departments["Finance"]["open_rate"], 0.5)
+        self.assertEqual(departments["Finance"]["submit_rate"], 0.5)
+        self.assertEqual(departments["IT Ops"]["report_rate"], 1.0)
+        self.assertEqual(departments["unknown"]["clicked"], 1)
+        self.assertEqual(report["overall"]["sent"], 3)
+        self.assertEqual(report["overall"]["opened"], 2)
+
+        ttfi = report["time_to_first_interaction"]
+        self.assertEqual(ttfi["counts"]["open"], [1, 0, 0, 1, 0, 0])
+        self.assertEqual(ttfi["counts"]["any"], [1, 0, 0, 1, 0, 0])
+        self.assertEqual(ttfi["median_seconds"]["click"], 4000.0)
+
+        funnel = report["hourly_funnel"]
+        self.assertEqual([row["hour"] for row in funnel], ["2023-11-14 22:00", "2023-11-14 23:00",
+                                                           "2023-11-15 00:00"])
+        self.assertEqual((funnel[0]["sent"], funnel[0]["opened"], funnel[0]["clicked"]), (3, 1, 1))
+        self.assertEqual(funnel[2]["reported"], 1)
+
+    def test_write_report(self):
+        report = build_report(load_event_log(self._log()))
+        files = write_report(report, self.test_dir / "demo" / "reports", "<demo>")
+
+        with open(files["departments.csv"], newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["department"] for row in rows], ["Finance", "IT Ops", "unknown"])
+        page = files["report.html"].read_text()
+        self.assertIn("&lt;demo&gt;", page)
+        self.assertIn("<td>Finance</td>", page)
+
+    def test_campaign_manager_report(self):
+        config = self.test_dir / "email_config.json"
+        config.write_text(json.dumps({"smtp_server": "127.0.0.1", "smtp_port": 2525, "smtp_ssl": False,
+                                      "username": "u", "password": "p", "sender_email": "s@example.com",
+                                      "sender_name": "S", "pool_size": 1}))
+        cm = CampaignManager(str(self.test_dir / "campaigns"), email_config=str(config))
+        try:
+            cm.create_campaign("demo", "PHISHING")
+            for event in EVENTS:
+                cm.event_queue.put(dict(event))
+            cm.record_interaction("demo", "report", "b@example.com")
+            cm.shutdown()
+
+            report = cm.generate_report("demo")
+            self.assertEqual(report["overall"]["reported"], 2)
+            self.assertTrue(Path(report["files"]["report.html"]).exists())
+            self.assertEqual(cm.get_campaign("demo")["stats"]["reports"], 2)
+            self.assertIsNone(cm.generate_report("missing"))
+        finally:
+            cm.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
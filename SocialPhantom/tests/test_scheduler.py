@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime, time as dtime
+from modules.scheduler import TokenBucket, SendWindow, DeliveryScheduler
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_paced(self):
+        bucket = TokenBucket(rate_per_minute=60, burst=3)
+        delays = [bucket.reserve() for _ in range(5)]
+
+        self.assertEqual(delays[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(delays[3], 1.0, places=1)
+        self.assertAlmostEqual(delays[4], 2.0, places=1)
+
+class TestDeliveryScheduler(unittest.TestCase):
+    def test_domains_are_limited_independently(self):
+        scheduler = DeliveryScheduler(per_domain_per_minute=60, burst=1)
+
+        self.assertEqual(scheduler.reserve("a@one.com"), 0.0)
+        self.assertEqual(scheduler.reserve("b@two.com"), 0.0)
+        self.assertGreater(scheduler.reserve("c@one.com"), 0.0)
+
+    def test_global_limit_applies_across_domains(self):
+        scheduler = DeliveryScheduler(global_per_minute=60, burst=1)
+
+        self.assertEqual(scheduler.reserve("a@one.com"), 0.0)
+        self.assertGreater(scheduler.reserve("b@two.com"), 0.0)
+
+    def test_domain_override(self):
+        scheduler = DeliveryScheduler.from_config({"rate_limits": {"domains": {"Slow.com": 1}, "burst": 1}})
+
+        self.assertEqual(scheduler.reserve("a@slow.com"), 0.0)
+        self.assertAlmostEqual(scheduler.reserve("b@slow.com"), 60.0, places=0)
+        self.assertEqual(scheduler.reserve("a@fast.com"), 0.0)
+
+    def test_window_passed_per_send_leaves_shared_window_alone(self):
+        scheduler = DeliveryScheduler()
+        later = datetime.now().hour + 2
+        window = SendWindow(dtime(later % 24, 0), dtime((later + 1) % 24, 0))
+
+        self.assertGreater(scheduler.window_delay(window), 0.0)
+        self.assertEqual(scheduler.window_delay(), 0.0)
+        self.assertIsNone(scheduler.window)
+
+class TestSendWindow(unittest.TestCase):
+    def test_office_hours(self):
+        window = SendWindow.from_settings({"start": "09:00", "end": "17:00", "days": ["mon", "tue", "wed", "thu", "fri"]})
+        monday_noon = datetime(2024, 1, 1, 12, 0)
+        friday_evening = datetime(2024, 1, 5, 18, 0)
+
+        self.assertEqual(window.seconds_until_open(monday_noon), 0.0)
+        # Next opening is Monday 09:00
+        self.assertEqual(window.seconds_until_open(friday_evening), (2 * 24 + 15) * 3600)
+
+    def test_overnight_window(self):
+        window = SendWindow(dtime(22, 0), dtime(6, 0))
+
+        self.assertEqual(window.seconds_until_open(datetime(2024, 1, 1, 23, 0)), 0.0)
+        self.assertEqual(window.seconds_until_open(datetime(2024, 1, 1, 3, 0)), 0.0)
+        self.assertEqual(window.seconds_until_open(datetime(2024, 1, 1, 21, 0)), 3600)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import shutil
+from pathlib import Path
+from modules.send_queue import PersistentSendQueue
+
+class TestPersistentSendQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/queue_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.path = self.test_dir / "queue.db"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _targets(self, count):
+        return ({"email": f"user{i}@test.com", "name": f"User {i}"} for i in range(count))
+
+    def test_enqueue_skips_known_recipients(self):
+        queue = PersistentSendQueue(self.path)
+        self.assertEqual(queue.enqueue(self._targets(10), batch_size=3), 10)
+        self.assertEqual(queue.enqueue(self._targets(12)), 2)
+        self.assertEqual(queue.counts()["pending"], 12)
+        queue.close()
+
+    def test_resume_after_crash(self):
+        queue = PersistentSendQueue(self.path, flush_every=1)
+        queue.enqueue(self._targets(5))
+        batch = queue.claim(3)
+        self.assertEqual(batch[0].variables["name"], "User 0")
+        queue.mark_sent(batch[0].id)
+        queue.mark_failed(batch[1].id, "550 rejected")
+        # Simulate a crash: batch[2] is never acknowledged and the queue is not closed
+        queue.conn.close()
+
+        reopened = PersistentSendQueue(self.path)
+        self.assertEqual(reopened.recovered, 1)
+        remaining = [item.recipient for item in reopened.claim()]
+        self.assertEqual(remaining, ["user2@test.com", "user3@test.com", "user4@test.com"])
+        counts = reopened.counts()
+        self.assertEqual((counts["sent"], counts["failed"]), (1, 1))
+        reopened.close()
+
+    def test_delivered_items_not_requeued_after_crash(self):
+        queue = PersistentSendQueue(self.path)
+        queue.enqueue(self._targets(10))
+        batch = queue.claim()
+        for item in batch[:5]:
+            queue.mark_sent(item.id)
+        queue.conn.close()
+
+        reopened = PersistentSendQueue(self.path)
+        self.assertEqual(reopened.recovered, 5)
+        remaining = [item.recipient for item in reopened.claim()]
+        self.assertEqual(remaining, [f"user{i}@test.com" for i in range(5, 10)])
+        self.assertEqual(reopened.counts()["sent"], 5)
+        reopened.close()
+
+    def test_link_tokens(self):
+        queue = PersistentSendQueue(self.path)
+        queue.enqueue(self._targets(3))
+        tokens = {item.recipient: item.token for item in queue.claim()}
+        self.assertEqual(len(set(tokens.values())), 3)
+        queue.close()
+
+        # A queue from before link tokens existed gets its rows backfilled
+        queue = PersistentSendQueue(self.path)
+        queue.conn.execute("DROP INDEX sends_token")
+        queue.conn.execute("UPDATE sends SET token = NULL")
+        queue.close()
+        reopened = PersistentSendQueue(self.path)
+        self.assertTrue(all(item.token for item in reopened.claim()))
+        reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
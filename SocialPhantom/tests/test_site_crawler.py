@@ -0,0 +1,124 @@
+import unittest
+import re
+import json
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from modules.web_cloner import WebCloner
+from modules.site_crawler import SiteCrawler, normalize_url, STATE_FILE
+
+SITE = {
+    '/': ('text/html', '<html><body><a href="/a">A</a> <a href="b?y=1&amp;x=2">B</a> '
+                       '<a href="/b?x=2&amp;y=1#top">B again</a> <a href="/private">P</a> '
+                       '<a href="https://elsewhere.example.com/">Out</a></body></html>'),
+    '/a': ('text/html', '<html><head><link rel="stylesheet" href="/site.css"></head>'
+                        '<body><a href="/c">C</a> <a href="/report.pdf">PDF</a> <a href="/export">CSV</a> '
+                        '<a href="https://{host}/c">C over TLS</a><img srcset="/small.png 1x, /large.png 2x"></body></html>'),
+    '/b?x=2&y=1': ('text/html', '<html><body><a href="/">home</a></body></html>'),
+    '/c': ('text/html', '<html><body><a href="/d">D</a></body></html>'),
+    '/d': ('text/html', '<html><body>too deep</body></html>'),
+    '/private': ('text/html', '<html><body>disallowed</body></html>'),
+    '/report.pdf': ('application/pdf', '%PDF-1.4'),
+    '/export': ('application/octet-stream', 'a,b'),
+    '/site.css': ('text/css', 'body { background: url("bg.png") }'),
+    '/bg.png': ('image/png', 'png'),
+    '/small.png': ('image/png', 'small'),
+    '/large.png': ('image/png', 'large'),
+    '/robots.txt': ('text/plain', 'User-agent: *\nDisallow: /private\n'),
+}
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path not in SITE:
+            self.send_error(404)
+            return
+        content_type, body = SITE[self.path]
+        body = body.replace('{host}', self.headers['Host']).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestSiteCrawler(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/crawler_test")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+        self.server.hits = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def crawler(self, **kwargs):
+        return SiteCrawler(WebCloner(min_delay=0), **kwargs)
+
+    def test_normalize_url(self):
+        self.assertEqual(normalize_url("HTTP://Example.COM:80/x?b=2&a=1#frag"), "http://example.com/x?a=1&b=2")
+        self.assertEqual(normalize_url("https://example.com"), "https://example.com/")
+
+    def test_bounded_same_origin_crawl(self):
+        stats = self.crawler(max_depth=2).crawl(self.url, str(self.test_dir), "demo")
+
+        pages = [hit for hit in self.server.hits if SITE.get(hit, ('',))[0] == 'text/html']
+        self.assertEqual(sorted(pages), ['/', '/a', '/b?x=2&y=1', '/c'])
+        self.assertEqual(stats['pages'], 4)
+        self.assertEqual(stats['robots_skipped'], 1)
+
+        index = (self.test_dir / "index.html").read_text()
+        b_page = SiteCrawler.page_filename(normalize_url(self.url + "b?x=2&y=1"), normalize_url(self.url))
+        self.assertIn(f'href="{b_page}"', index)
+        self.assertIn(f'href="{b_page}#top"', index)
+        self.assertIn(f'href="{self.url}private"', index)
+        self.assertIn('href="https://elsewhere.example.com/"', index)
+
+    def test_links_to_unwritten_pages_stay_absolute(self):
+        stats = self.crawler(max_depth=2).crawl(self.url, str(self.test_dir))
+
+        self.assertNotIn('/report.pdf', self.server.hits)
+        self.assertIn('/export', self.server.hits)
+        self.assertEqual(stats['skipped'], 1)
+        a_page = (self.test_dir / SiteCrawler.page_filename(normalize_url(self.url + "a"),
+                                                           normalize_url(self.url))).read_text()
+        self.assertIn(f'href="{self.url}report.pdf"', a_page)
+        self.assertIn(f'href="{self.url}export"', a_page)
+        self.assertIn(f'href="https://127.0.0.1:{self.server.server_address[1]}/c"', a_page)
+        for page in self.test_dir.glob("*.html"):
+            for target in re.findall(r'href="(page_[0-9a-f]+\.html)', page.read_text()):
+                self.assertTrue((self.test_dir / target).exists(), target)
+
+    def test_css_urls_and_srcset_fetched(self):
+        self.crawler(max_depth=1).crawl(self.url, str(self.test_dir))
+
+        for asset in ('/site.css', '/bg.png', '/small.png', '/large.png'):
+            self.assertIn(asset, self.server.hits)
+        assets = self.test_dir / "assets"
+        css = next(assets.glob("*.css")).read_text()
+        self.assertNotIn("bg.png", css)
+        self.assertTrue((assets / css.split('"')[1]).exists())
+
+    def test_resume_skips_finished_pages(self):
+        start = normalize_url(self.url)
+        pending = normalize_url(self.url + "c")
+        self.test_dir.mkdir(parents=True)
+        with open(self.test_dir / STATE_FILE, "w") as f:
+            json.dump({"start_url": start, "seen": {start: 0, pending: 2}, "done": [start], "failed": []}, f)
+
+        stats = self.crawler(max_depth=2).crawl(self.url, str(self.test_dir))
+
+        self.assertEqual(stats['resumed'], 1)
+        self.assertNotIn('/', self.server.hits)
+        self.assertIn('/c', self.server.hits)
+        with open(self.test_dir / STATE_FILE) as f:
+            self.assertIn(pending, json.load(f)["done"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import shutil
+import smtplib
+import ssl
+from email.message import EmailMessage
+from pathlib import Path
+from tools.smtp_sink import SMTPSink, generate_self_signed_cert
+from tools.load_test import LoadTest
+
+def message(body="Hello"):
+    msg = EmailMessage()
+    msg["From"] = "sender@example.com"
+    msg["To"] = "target@example.com"
+    msg["Subject"] = "Test"
+    msg.set_content(body)
+    return msg
+
+class TestSMTPSink(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/sink_test")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_accepts_and_stores_messages(self):
+        with SMTPSink(store=True) as sink:
+            with smtplib.SMTP("127.0.0.1", sink.port) as server:
+                server.login("user", "secret")
+                server.send_message(message(".leading dot\n.\nend"))
+                server.send_message(message())
+        metrics = sink.metrics()
+        self.assertEqual((metrics["messages"], metrics["recipients"], metrics["connections"]), (2, 2, 1))
+        self.assertIn(b"\r\n.leading dot\r\n.\r\nend\r\n", sink.messages[0])
+
+    def test_single_line_message(self):
+        with SMTPSink(store=True) as sink:
+            with smtplib.SMTP("127.0.0.1", sink.port, timeout=5) as server:
+                server.sendmail("sender@example.com", ["target@example.com"], "only line")
+                server.sendmail("sender@example.com", ["target@example.com"], ".dotted")
+        self.assertEqual(sink.messages, [b"only line\r\n", b".dotted\r\n"])
+
+    def test_injected_failures(self):
+        with SMTPSink(failure_rate=1.0) as sink:
+            with smtplib.SMTP("127.0.0.1", sink.port) as server:
+                with self.assertRaises(smtplib.SMTPDataError) as ctx:
+                    server.send_message(message())
+        self.assertEqual(ctx.exception.smtp_code, 451)
+        self.assertEqual(sink.metrics()["failures_injected"], 1)
+
+    @unittest.skipUnless(shutil.which("openssl"), "openssl CLI not available")
+    def test_implicit_tls(self):
+        certfile, keyfile = generate_self_signed_cert(self.test_dir)
+        with SMTPSink(certfile=str(certfile), keyfile=str(keyfile)) as sink:
+            context = ssl.create_default_context(cafile=str(certfile))
+            with smtplib.SMTP_SSL("127.0.0.1", sink.port, context=context) as server:
+                server.login("user", "secret")
+                server.send_message(message())
+        self.assertEqual(sink.metrics()["messages"], 1)
+
+    def test_load_test_report(self):
+        report = LoadTest("email_sender", 20, self.test_dir).run()
+        self.assertEqual(report["delivered"], 20)
+        self.assertEqual(report["sink_messages"], 20)
+        self.assertEqual(report["retries"], 0)
+        self.assertGreater(report["msgs_per_sec"], 0)
+        self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+
+if __name__ == '__main__':
+    unittest.main()
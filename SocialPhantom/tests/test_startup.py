@@ -0,0 +1,63 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+# Milliseconds for imports plus one `campaign list`, interpreter start-up excluded
+STARTUP_BUDGET_MS = 100
+
+PROBE = """
+import json, sys, threading, time
+started = time.perf_counter()
+import socialphantom
+socialphantom.main(['campaign', 'list'])
+cli = time.perf_counter() - started
+started = time.perf_counter()
+from core.campaign_manager import CampaignManager
+manager = CampaignManager('campaigns')
+manager.list_campaigns()
+manager.get_campaign('missing')
+manager.shutdown()
+library = time.perf_counter() - started
+print(json.dumps({
+    'cli_ms': cli * 1000,
+    'library_ms': library * 1000,
+    'heavy_modules': [name for name in ('requests', 'smtplib', 'asyncio', 'multiprocessing', 'email.mime')
+                      if name in sys.modules],
+    'threads': threading.active_count(),
+}))
+"""
+
+
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/startup_test")
+        self.test_dir.mkdir(exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _probe(self):
+        env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parent.parent))
+        result = subprocess.run([sys.executable, "-c", PROBE], cwd=self.test_dir, env=env,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_listing_stays_within_budget(self):
+        # Best of three so one slow run on a loaded machine does not fail the suite
+        runs = [self._probe() for _ in range(3)]
+        self.assertLess(min(run['cli_ms'] for run in runs), STARTUP_BUDGET_MS)
+        self.assertLess(min(run['library_ms'] for run in runs), STARTUP_BUDGET_MS)
+
+    def test_listing_loads_no_delivery_stack(self):
+        run = self._probe()
+        self.assertEqual(run['heavy_modules'], [])
+        self.assertEqual(run['threads'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import json
+import shutil
+import time
+from pathlib import Path
+from unittest.mock import patch
+from core import stats_writer
+from core.stats_writer import CampaignStatsWriter
+
+class TestCampaignStatsWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/stats_test")
+        (self.test_dir / "demo").mkdir(parents=True, exist_ok=True)
+        self.config_path = self.test_dir / "demo" / "config.json"
+        self.config_path.write_text(json.dumps({
+            "name": "demo",
+            "type": "PHISHING",
+            "stats": {"emails_sent": 2, "clicks": 0, "credentials_captured": 0, "success_rate": 0.0}
+        }))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_events_coalesced_into_one_write(self):
+        writer = CampaignStatsWriter(self.test_dir, flush_interval=3600, flush_events=10000)
+        with patch.object(stats_writer, 'atomic_write_json', wraps=stats_writer.atomic_write_json) as write:
+            for _ in range(98):
+                writer.record({"campaign": "demo", "type": "email_sent"})
+            writer.record({"campaign": "demo", "type": "credential"})
+            writer.record({"campaign": "demo", "type": "credential"})
+            writer.flush()
+
+        write.assert_called_once()
+        stats = json.loads(self.config_path.read_text())["stats"]
+        self.assertEqual(stats["emails_sent"], 100)
+        self.assertEqual(stats["credentials_captured"], 2)
+        self.assertAlmostEqual(stats["success_rate"], 0.02)
+        self.assertIsNotNone(stats["last_activity"])
+        self.assertEqual(list(self.config_path.parent.glob("*.tmp")), [])
+
+    def test_flush_due_on_event_count(self):
+        writer = CampaignStatsWriter(self.test_dir, flush_interval=3600, flush_events=3)
+        writer.last_flush = time.monotonic()
+        writer.record({"campaign": "demo", "type": "click"})
+        writer.record({"campaign": "demo", "type": "click"})
+        self.assertFalse(writer.due())
+        writer.record({"campaign": "demo", "type": "click"})
+        self.assertTrue(writer.due())
+
+if __name__ == '__main__':
+    unittest.main()
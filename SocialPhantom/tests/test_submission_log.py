@@ -0,0 +1,83 @@
+import unittest
+import json
+import shutil
+import time
+from pathlib import Path
+from unittest.mock import patch
+from core import submission_log as submission_module
+from core.submission_log import SubmissionLog
+
+class TestSubmissionLog(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/submission_test")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _entries(self):
+        lines = []
+        for path in sorted(self.test_dir.glob("*.jsonl")):
+            lines += [json.loads(line) for line in path.read_text().splitlines()]
+        return lines
+
+    def test_values_never_written(self):
+        log = SubmissionLog(self.test_dir, flush_every=1, salt="pepper")
+        log.record("demo", {"campaign": "demo", "username": "alice", "password": "hunter2"}, "10.0.0.1", "UA")
+        log.record("demo", {"campaign": "demo", "username": "", "password": " "})
+        log.close()
+
+        raw = (self.test_dir / next(self.test_dir.glob("demo_*.jsonl")).name).read_text()
+        self.assertNotIn("alice", raw)
+        self.assertNotIn("hunter2", raw)
+        self.assertNotIn("password", raw)
+        first, second = self._entries()
+        self.assertTrue(first["submitted"])
+        self.assertFalse(second["submitted"])
+        self.assertEqual(first["fields"], sorted([log.hash_field("username"), log.hash_field("password")]))
+        self.assertEqual(first["ip_address"], "10.0.0.1")
+
+    def test_buffered_until_flush(self):
+        log = SubmissionLog(self.test_dir, flush_every=10, flush_interval=3600, salt="pepper")
+        log.last_flush = float("inf")
+        log.record("demo", {"username": "a"})
+        self.assertEqual(self._entries(), [])
+        log.flush()
+        self.assertEqual(len(self._entries()), 1)
+        log.close()
+
+    def test_honeypot_posts_flagged_as_bots(self):
+        log = SubmissionLog(self.test_dir, flush_every=1, salt="pepper")
+        entry = log.record("c", {"campaign": "c", "username": "", "password": "", "honeypot": "bot"})
+        self.assertFalse(entry["submitted"])
+        self.assertTrue(entry["bot"])
+        self.assertEqual(entry["fields"], sorted([log.hash_field("username"), log.hash_field("password")]))
+        entry = log.record("c", {"campaign": "c", "username": "alex", "honeypot": ""})
+        self.assertTrue(entry["submitted"])
+        self.assertFalse(entry["bot"])
+        log.close()
+
+    def test_idle_buffer_flushed_by_timer(self):
+        log = SubmissionLog(self.test_dir, flush_every=10, flush_interval=0.05, salt="pepper")
+        log.record("demo", {"username": "a"})
+        log.record("demo", {"username": "b"})
+        for _ in range(100):
+            if len(self._entries()) == 2:
+                break
+            time.sleep(0.02)
+        self.assertEqual(len(self._entries()), 2)
+        log.close()
+
+    def test_daily_rotation_and_safe_names(self):
+        log = SubmissionLog(self.test_dir, flush_every=1, salt="pepper")
+        log.record("../escape", {"username": "a"})
+        self.assertTrue(list(self.test_dir.glob("_escape_*.jsonl")))
+
+        with patch.object(submission_module, "datetime") as fake:
+            fake.now.return_value.strftime.return_value = "20990101"
+            fake.now.return_value.isoformat.return_value = "2099-01-01T00:00:00"
+            log.record("demo", {"username": "a"})
+        self.assertTrue((self.test_dir / "demo_20990101.jsonl").exists())
+        log.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import json
+import shutil
+from itertools import count
+from pathlib import Path
+from modules.send_queue import PersistentSendQueue
+from modules.target_source import TargetFilter, read_targets
+
+class TestTargetSource(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/targets_test")
+        self.test_dir.mkdir(exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_read_csv_and_jsonl(self):
+        csv_path = self.test_dir / "targets.csv"
+        csv_path.write_text("email,name,department\nA@Example.com,Alex,Finance\nb@example.com,Bo,IT\n")
+        jsonl_path = self.test_dir / "targets.jsonl"
+        jsonl_path.write_text(json.dumps({"email": "c@example.com"}) + "\n\nnot json\n")
+
+        self.assertEqual(list(read_targets(str(csv_path))), [
+            {"email": "A@Example.com", "name": "Alex", "department": "Finance"},
+            {"email": "b@example.com", "name": "Bo", "department": "IT"}])
+        self.assertEqual(list(read_targets(jsonl_path)), [{"email": "c@example.com"}, {}])
+        with self.assertRaises(ValueError):
+            list(read_targets(self.test_dir / "targets.xlsx"))
+
+    def test_filter_validates_and_scopes(self):
+        targets = [{"email": " Alex@Example.COM ", "name": "Alex"}, {"email": "not-an-address"}, {"name": "x"},
+                   {"email": "bo@mail.example.com"}, {"email": "eve@example.com.evil.net"}]
+        target_filter = TargetFilter(["example.com"])
+
+        accepted = list(target_filter.filter(targets))
+
+        self.assertEqual([t["email"] for t in accepted], ["alex@example.com", "bo@mail.example.com"])
+        self.assertEqual(accepted[0]["name"], "Alex")
+        self.assertEqual(target_filter.stats, {"read": 5, "invalid": 2, "out_of_scope": 1, "accepted": 2})
+
+    def test_streams_into_queue_with_casefolded_dedupe(self):
+        path = self.test_dir / "targets.csv"
+        path.write_text("email\n" + "".join(f"user{i}@example.com\nUSER{i}@Example.com\n" for i in range(1500)))
+        queue = PersistentSendQueue(self.test_dir / "queue.db")
+
+        self.assertEqual(queue.enqueue(TargetFilter().filter(read_targets(path))), 1500)
+        self.assertEqual(queue.counts()["pending"], 1500)
+        queue.close()
+
+    def test_iterators_are_consumed_lazily(self):
+        endless = ({"email": f"user{i}@example.com"} for i in count())
+        first = next(TargetFilter().filter(read_targets(endless)))
+        self.assertEqual(first["email"], "user0@example.com")
+
+if __name__ == '__main__':
+    unittest.main()
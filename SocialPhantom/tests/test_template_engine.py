@@ -0,0 +1,62 @@
+import unittest
+import os
+import shutil
+import time
+from pathlib import Path
+from modules.template_engine import CompiledTemplate, TemplateCache, TemplateValidationError
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_render_single_pass(self):
+        template = CompiledTemplate("Hi {{name}}, pay {{amount}} to {{name}}")
+
+        self.assertEqual(template.placeholders, {"name", "amount"})
+        self.assertEqual(template.render({"name": "Ann", "amount": 5}), "Hi Ann, pay 5 to Ann")
+
+    def test_values_are_not_re_expanded(self):
+        template = CompiledTemplate("{{a}} {{b}}")
+
+        self.assertEqual(template.render({"a": "{{b}}", "b": "x"}), "{{b}} x")
+
+    def test_missing_placeholders(self):
+        template = CompiledTemplate("{{name}} {{account}}")
+
+        self.assertEqual(template.render({"name": "Ann"}), "Ann {{account}}")
+        with self.assertRaises(TemplateValidationError) as ctx:
+            template.render({"name": "Ann"}, strict=True)
+        self.assertEqual(ctx.exception.names, ["account"])
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/template_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.path = self.test_dir / "t.html"
+        self.path.write_text("Hello {{name}}")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_cached_until_modified(self):
+        cache = TemplateCache()
+        first = cache.get(self.path)
+        self.assertIs(cache.get(self.path), first)
+
+        self.path.write_text("Bye {{name}}")
+        later = time.time() + 5
+        os.utime(self.path, (later, later))
+        self.assertEqual(cache.get(self.path).render({"name": "Ann"}), "Bye Ann")
+
+    def test_lru_eviction(self):
+        cache = TemplateCache(maxsize=1)
+        other = self.test_dir / "other.html"
+        other.write_text("x")
+        cache.get(self.path)
+        cache.get(other)
+
+        self.assertEqual(list(cache.entries), [str(other)])
+
+    def test_unknown_placeholders_reported_at_compile_time(self):
+        with self.assertRaises(TemplateValidationError):
+            TemplateCache().get(self.path, known_variables=["email"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import http.client
+from modules.tracking_server import TrackingServer, PIXEL
+from modules.tracking_store import TrackingStore
+from core.event_bus import EventBus
+from core.ingest import EventIngestor
+
+class BlackHole:
+    def publish_many(self, events):
+        pass
+
+class TestTrackingServer(unittest.TestCase):
+    def setUp(self):
+        self.store = TrackingStore()
+        self.token = self.store.register("target@example.com")
+        self.server = TrackingServer(self.store, port=0, host="127.0.0.1")
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_pixel_hits_share_one_keep_alive_connection(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        for _ in range(3):
+            conn.request("GET", f"/track/{self.token}")
+            response = conn.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.getheader("Content-Type"), "image/png")
+            self.assertEqual(response.read(), PIXEL)
+        conn.close()
+
+        record = self.store.get("target@example.com")
+        self.assertTrue(record["opened"])
+        self.assertIn("open_time", record)
+
+    def test_unknown_path(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        conn.request("GET", "/other")
+        self.assertEqual(conn.getresponse().status, 404)
+        conn.close()
+
+    def test_opens_forwarded_to_ingestor(self):
+        bus = EventBus()
+        stats = bus.subscribe("stats")
+        ingestor = EventIngestor(bus, flush_interval=0.05)
+        server = TrackingServer(self.store, port=0, host="127.0.0.1", ingestor=ingestor, campaign="demo")
+        server.start()
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        for _ in range(3):
+            conn.request("GET", f"/track/{self.token}")
+            conn.getresponse().read()
+        conn.close()
+        server.stop()
+        ingestor.close()
+
+        events = stats.get_batch(timeout=5)
+        bus.close()
+        self.assertEqual(len(events), 1)
+        self.assertEqual((events[0]["campaign"], events[0]["type"]), ("demo", "open"))
+        # Opens join the delivery rows, which are keyed by address rather than token
+        self.assertEqual(events[0]["recipient"], "target@example.com")
+
+    def test_campaign_route_uses_that_campaigns_store(self):
+        bus = EventBus()
+        stats = bus.subscribe("stats")
+        ingestor = EventIngestor(bus, flush_interval=0.05)
+        server = TrackingServer(TrackingStore(), port=0, host="127.0.0.1", ingestor=ingestor)
+        server.add_campaign("q4", self.store)
+        server.start()
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        for path in (f"/track/other?r={self.token}&open=1", f"/track/q4?r={self.token}&open=1"):
+            conn.request("GET", path)
+            self.assertEqual(conn.getresponse().read(), PIXEL)
+        conn.close()
+        server.stop()
+        ingestor.close()
+
+        events = stats.get_batch(timeout=5)
+        bus.close()
+        self.assertEqual([(e["campaign"], e["recipient"]) for e in events], [("q4", "target@example.com")])
+        self.assertTrue(self.store.get("target@example.com")["opened"])
+
+    def test_unknown_tokens_are_not_forwarded(self):
+        ingestor = EventIngestor(BlackHole())
+        server = TrackingServer(self.store, port=0, host="127.0.0.1", ingestor=ingestor, campaign="demo")
+        server.httpd.record_open("forged")
+        ingestor.close()
+        server.httpd.server_close()
+        self.assertEqual(ingestor.metrics()["accepted"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import shutil
+import threading
+from pathlib import Path
+from modules.tracking_store import TrackingStore, REPLIED
+
+class TestTrackingStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/tracking_test")
+        self.test_dir.mkdir(exist_ok=True)
+        self.path = self.test_dir / "tracking.log"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_token_lookup(self):
+        store = TrackingStore()
+        token = store.register("a@example.com")
+
+        self.assertNotIn("a@example.com", token)
+        self.assertTrue(store.record_open(token))
+        self.assertFalse(store.record_open("unknown"))
+        record = store.get("a@example.com")
+        self.assertTrue(record["opened"])
+        self.assertFalse(record["replied"])
+        self.assertEqual(store.email_for(token), "a@example.com")
+
+    def test_concurrent_writers(self):
+        store = TrackingStore()
+        tokens = [store.register(f"user{i}@example.com") for i in range(200)]
+
+        def hammer():
+            for token in tokens:
+                store.record_open(token)
+                store.record_attachment_open(token)
+
+        threads = [threading.Thread(target=hammer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(store.get("user7@example.com")["attachments_opened"], 4)
+
+    def test_state_survives_restart(self):
+        store = TrackingStore(self.path)
+        token = store.register("a@example.com")
+        store.register("b@example.com")
+        store.record_open(token)
+        store.set_flag(token, REPLIED)
+        store.close()
+
+        reloaded = TrackingStore(self.path)
+        self.assertEqual(len(reloaded), 2)
+        record = reloaded.get("a@example.com")
+        self.assertTrue(record["opened"] and record["replied"])
+        self.assertFalse(reloaded.get("b@example.com")["opened"])
+        self.assertEqual(reloaded.token_for("a@example.com"), token)
+        reloaded.close()
+
+    def test_resend_keeps_earlier_tokens(self):
+        store = TrackingStore(self.path)
+        first = store.register("a@example.com")
+        second = store.register("a@example.com")
+        self.assertTrue(store.record_open(first))
+        store.close()
+
+        reloaded = TrackingStore(self.path)
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(reloaded.token_for("a@example.com"), second)
+        self.assertEqual(reloaded.email_for(first), "a@example.com")
+        self.assertTrue(reloaded.get("a@example.com")["opened"])
+        reloaded.close()
+
+if __name__ == '__main__':
+    unittest.main()
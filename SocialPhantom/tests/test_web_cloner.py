@@ -0,0 +1,133 @@
+import unittest
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from modules.web_cloner import WebCloner, HostLimiter
+from modules.asset_cache import AssetCache
+
+PAGE = """<html><head>
+<link rel="stylesheet" href="/style.css">
+<script src="/app.js"></script>
+</head><body>
+<img src="/a.png"><img src="/b.png"><img src="/c.png"><img src="/a.png">
+<form action="/login"><input name="user"></form>
+</body></html>"""
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Serves PAGE plus slow assets, counting how many requests overlap"""
+    def do_GET(self):
+        server = self.server
+        if self.path == '/':
+            body, content_type = PAGE.encode(), 'text/html'
+        elif self.headers.get('If-None-Match') == f'"{self.path}"':
+            server.revalidated.append(self.path)
+            self.send_response(304)
+            self.end_headers()
+            return
+        else:
+            with server.lock:
+                server.active += 1
+                server.peak = max(server.peak, server.active)
+                server.hits.append(self.path)
+            time.sleep(0.1)
+            with server.lock:
+                server.active -= 1
+            content_type = {'.css': 'text/css', '.js': 'application/javascript'}.get(
+                Path(self.path).suffix, 'image/png')
+            body = self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', f'"{self.path}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestWebCloner(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("tests/cloner_test")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+        self.server.lock = threading.Lock()
+        self.server.active = self.server.peak = 0
+        self.server.hits = []
+        self.server.revalidated = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_assets_fetched_concurrently_within_host_cap(self):
+        cloner = WebCloner(max_workers=8, connections_per_host=3, min_delay=0)
+        started = time.monotonic()
+        self.assertTrue(cloner.clone_site(self.url, str(self.test_dir), "demo"))
+        elapsed = time.monotonic() - started
+
+        # Five distinct assets, each fetched once
+        self.assertEqual(sorted(self.server.hits), ['/a.png', '/app.js', '/b.png', '/c.png', '/style.css'])
+        self.assertEqual(self.server.peak, 3)
+        self.assertLess(elapsed, 0.45)
+        html = (self.test_dir / "index.html").read_text()
+        self.assertNotIn('src="/a.png"', html)
+        self.assertEqual(len(list((self.test_dir / "assets").iterdir())), 5)
+
+    def test_cached_assets_hard_linked_across_clones(self):
+        cache = AssetCache(self.test_dir / "cache")
+        cloner = WebCloner(min_delay=0, asset_cache=cache)
+        self.assertTrue(cloner.clone_site(self.url, str(self.test_dir / "first"), "demo"))
+        self.assertTrue(cloner.clone_site(self.url, str(self.test_dir / "second"), "demo"))
+
+        # The second clone is served from the cache without touching the server
+        self.assertEqual(len(self.server.hits), 5)
+        first = sorted((self.test_dir / "first" / "assets").iterdir())
+        second = sorted((self.test_dir / "second" / "assets").iterdir())
+        self.assertEqual([p.name for p in first], [p.name for p in second])
+        self.assertTrue(all(a.samefile(b) for a, b in zip(first, second)))
+        cache.close()
+
+    def test_stale_entries_revalidated_with_etag(self):
+        cache = AssetCache(self.test_dir / "cache", max_age=0)
+        cloner = WebCloner(min_delay=0, asset_cache=cache)
+        cloner.clone_site(self.url, str(self.test_dir / "first"), "demo")
+        cloner.clone_site(self.url, str(self.test_dir / "second"), "demo")
+
+        self.assertEqual(len(self.server.hits), 5)
+        self.assertEqual(len(self.server.revalidated), 5)
+        self.assertEqual(len(list((self.test_dir / "second" / "assets").iterdir())), 5)
+        cache.close()
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = AssetCache(self.test_dir / "cache", max_bytes=20)
+        cloner = WebCloner(min_delay=0, asset_cache=cache)
+        cloner.clone_site(self.url, str(self.test_dir / "first"), "demo")
+
+        self.assertLessEqual(cache.size(), 20)
+        self.assertEqual(len(list((self.test_dir / "first" / "assets").iterdir())), 5)
+        cache.close()
+
+    def test_min_delay_spaces_requests(self):
+        limiter = HostLimiter(connections_per_host=10, min_delay=0.05)
+        starts = []
+
+        def fetch():
+            with limiter.slot("example.com"):
+                starts.append(time.monotonic())
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        starts.sort()
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        self.assertTrue(all(gap >= 0.04 for gap in gaps), gaps)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""End-to-end delivery load test against the local SMTP sink
+
+Drives EmailSender, AsyncEmailSender, BECSimulator or CampaignManager.run_campaign
+at a chosen recipient count and reports messages/sec, p50/p99 delivery latency,
+retries and peak RSS, e.g.
+
+    python -m tools.load_test --target email_sender --recipients 2000 --tls --latency 0.005
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from core.event_bus import LatencyTracker
+from tools.smtp_sink import SMTPSink, generate_self_signed_cert
+
+TARGETS = ('email_sender', 'async', 'bec', 'campaign')
+TEMPLATE = "<html><body><p>Hello {{name}},</p><p>Please review the attached notice.</p></body></html>"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, or None where resource is unavailable"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class LoadTest:
+    """One load-test run: a sink, a throwaway config and one delivery engine"""
+
+    def __init__(self, target: str, recipients: int, workdir: Path, tls: bool = False,
+                 latency: float = 0.0, failure_rate: float = 0.0, pool_size: int = 5,
+                 max_concurrency: int = 100, seed: Optional[int] = 1):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown target: {target}")
+        self.target = target
+        self.recipients = recipients
+        self.workdir = Path(workdir)
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.tls = tls
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        certfile = keyfile = None
+        if tls:
+            certfile, keyfile = generate_self_signed_cert(self.workdir / "tls")
+        self.sink = SMTPSink(certfile=certfile, keyfile=keyfile, latency=latency,
+                             failure_rate=failure_rate, seed=seed)
+        self.certfile = certfile
+        self.latency = LatencyTracker(window=max(recipients, 1))
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def _write_config(self, port: int) -> Path:
+        config = {
+            "smtp_server": "127.0.0.1",
+            "smtp_port": port,
+            "smtp_ssl": self.tls,
+            "smtp_cafile": str(self.certfile) if self.certfile else None,
+            "username": "loadtest@example.com",
+            "password": "loadtest",
+            "sender_email": "no-reply@example.com",
+            "sender_name": "Load Test",
+            "subject": "Load test",
+            "pool_size": self.pool_size,
+            "queue_size": 1000,
+            "max_messages_per_connection": 1000,
+            "delivery_engine": "async" if self.target == 'async' else "threaded",
+            "max_concurrency": self.max_concurrency,
+            "rate_limits": {"global_per_minute": 0, "per_domain_per_minute": 0}
+        }
+        path = self.workdir / "email_config.json"
+        path.write_text(json.dumps(config, indent=2))
+        return path
+
+    def _targets(self):
+        return [{"email": f"user{i}@example.com", "name": f"User {i}"} for i in range(self.recipients)]
+
+    def _record(self, started: float, success: bool, attempts: int):
+        with self.lock:
+            if success:
+                self.delivered += 1
+                self.latency.add(time.monotonic() - started)
+            else:
+                self.failed += 1
+            self.retries += max(attempts - 1, 0)
+
+    def _run_email_sender(self, config: Path, template: Path):
+        from modules.email_sender import EmailSender
+        sender = EmailSender(str(config))
+        try:
+            for target in self._targets():
+                started = time.monotonic()
+                sender.send_phishing_email(
+                    str(template), target["email"], "loadtest", target,
+                    on_done=lambda success, attempts, error, started=started: self._record(started, success, attempts))
+            sender.email_queue.join()
+        finally:
+            sender.shutdown()
+
+    def _run_async(self, config: Path, template: Path):
+        from modules.async_email_sender import AsyncEmailSender
+        sender = AsyncEmailSender(str(config), max_concurrency=self.max_concurrency)
+
+        async def deliver(target):
+            started = time.monotonic()
+            result = await sender.send_phishing_email(str(template), target["email"], "loadtest", target)
+            self._record(started, result["success"], result["attempts"])
+
+        async def run():
+            try:
+                await asyncio.gather(*(deliver(target) for target in self._targets()))
+            finally:
+                await sender.close()
+
+        asyncio.run(run())
+
+    def _run_bec(self, config: Path, template: Path):
+        from modules.bec_simulator import BECSimulator
+        bec = BECSimulator(str(config), templates_dir=str(template.parent))
+        for target in self._targets():
+            started = time.monotonic()
+            self._record(started, bec.send_bec_email(template.stem, target, "ceo@example.com"), 1)
+
+    def _run_campaign(self, config: Path, template: Path):
+        from core.campaign_manager import CampaignManager
+        manager = CampaignManager(str(self.workdir / "campaigns"), email_config=str(config))
+        try:
+            manager.create_campaign("loadtest", "PHISHING")
+            manager.run_campaign("loadtest", self._targets(), str(template))
+        finally:
+            manager.shutdown()
+        # Outcomes are only recorded in the campaign's send queue; no per-message latency
+        conn = sqlite3.connect(str(self.workdir / "campaigns" / "loadtest" / "queue.db"))
+        sent, failed, attempts = conn.execute(
+            "SELECT SUM(state = 'sent'), SUM(state = 'failed'), SUM(attempts) FROM sends").fetchone()
+        conn.close()
+        self.delivered, self.failed = sent or 0, failed or 0
+        self.retries = (attempts or 0) - self.delivered - self.failed
+
+    def run(self) -> Dict:
+        template = self.workdir / "loadtest_template.html"
+        template.write_text(TEMPLATE)
+        with self.sink:
+            config = self._write_config(self.sink.port)
+            started = time.monotonic()
+            getattr(self, f"_run_{self.target}")(config, template)
+            elapsed = time.monotonic() - started
+            sink = self.sink.metrics()
+
+        latency = self.latency.summary()
+        return {
+            "target": self.target,
+            "recipients": self.recipients,
+            "tls": self.tls,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "seconds": round(elapsed, 3),
+            "msgs_per_sec": round(self.delivered / elapsed, 1) if elapsed else None,
+            "p50_ms": round(latency["p50_ms"], 2) if latency["p50_ms"] is not None else None,
+            "p99_ms": round(latency["p99_ms"], 2) if latency["p99_ms"] is not None else None,
+            "retries": self.retries,
+            "sink_messages": sink["messages"],
+            "sink_connections": sink["connections"],
+            "injected_failures": sink["failures_injected"],
+            "peak_rss_mb": peak_rss_mb()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SocialPhantom delivery load test")
+    parser.add_argument('--target', choices=TARGETS, default='email_sender')
+    parser.add_argument('--recipients', type=int, default=1000)
+    parser.add_argument('--tls', action='store_true', help="Deliver over implicit TLS instead of plain SMTP")
+    parser.add_argument('--latency', type=float, default=0.0, help="Sink reply latency in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of messages the sink rejects with 451")
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--max-concurrency', type=int, default=100)
+    parser.add_argument('--output', help="Also write the report to this JSON file")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="socialphantom-loadtest-") as workdir:
+        report = LoadTest(args.target, args.recipients, Path(workdir), args.tls, args.latency,
+                          args.failure_rate, args.pool_size, args.max_concurrency).run()
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
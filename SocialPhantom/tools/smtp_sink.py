@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Local SMTP stand-in for measuring delivery without a live relay
+
+Accepts mail over implicit TLS (pass a certificate) or plain TCP, counts and
+optionally stores every message, and can inject reply latency and transient
+failures. Run standalone with `python -m tools.smtp_sink --port 2525` or embed
+SMTPSink in a test or load test.
+"""
+import argparse
+import asyncio
+import base64
+import logging
+import random
+import ssl
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+def generate_self_signed_cert(directory: Path, hostname: str = 'localhost') -> Tuple[Path, Path]:
+    """Create a throwaway certificate for localhost/127.0.0.1 with the openssl CLI"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    certfile, keyfile = directory / 'sink.crt', directory / 'sink.key'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '2',
+                    '-subj', f'/CN={hostname}', '-addext', f'subjectAltName=DNS:{hostname},IP:127.0.0.1',
+                    '-keyout', str(keyfile), '-out', str(certfile)],
+                   check=True, capture_output=True)
+    return certfile, keyfile
+
+
+class SMTPSink:
+    """In-process asyncio SMTP server running on its own thread
+
+    latency delays each end-of-DATA reply, failure_rate answers that fraction of
+    messages with a transient 451, and store keeps the raw messages in memory.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, certfile: Optional[str] = None,
+                 keyfile: Optional[str] = None, latency: float = 0.0, failure_rate: float = 0.0,
+                 store: bool = False, seed: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.host = host
+        self.port = port
+        self.ssl_context = None
+        if certfile:
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(certfile, keyfile)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.store = store
+        self.random = random.Random(seed)
+        self.messages = []
+        self.stats = {'connections': 0, 'messages': 0, 'recipients': 0, 'bytes': 0, 'failures_injected': 0}
+        self.lock = threading.Lock()
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def _count(self, **deltas):
+        with self.lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def metrics(self) -> Dict:
+        with self.lock:
+            return dict(self.stats)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._count(connections=1)
+        writer.write(b"220 socialphantom-sink ESMTP\r\n")
+        recipients = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                verb = line[:4].upper()
+                if verb in (b'EHLO', b'HELO'):
+                    writer.write(b"250-socialphantom-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n"
+                                 if verb == b'EHLO' else b"250 socialphantom-sink\r\n")
+                elif verb == b'AUTH':
+                    await self._auth(line, reader, writer)
+                elif verb == b'MAIL':
+                    recipients = 0
+                    writer.write(b"250 2.1.0 OK\r\n")
+                elif verb == b'RCPT':
+                    recipients += 1
+                    writer.write(b"250 2.1.5 OK\r\n")
+                elif verb == b'DATA':
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    writer.write(await self._receive(reader, recipients))
+                    recipients = 0
+                elif verb == b'QUIT':
+                    writer.write(b"221 2.0.0 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:  # RSET, NOOP and anything else
+                    recipients = 0 if verb == b'RSET' else recipients
+                    writer.write(b"250 OK\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _auth(self, line: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Accept any credentials for AUTH PLAIN (inline or continued) and AUTH LOGIN"""
+        parts = line.split()
+        mechanism = parts[1].upper() if len(parts) > 1 else b''
+        if mechanism == b'PLAIN' and len(parts) < 3:
+            writer.write(b"334 \r\n")
+            await writer.drain()
+            await reader.readline()
+        elif mechanism == b'LOGIN':
+            for prompt in (b"Username:", b"Password:"):
+                writer.write(b"334 " + base64.b64encode(prompt) + b"\r\n")
+                await writer.drain()
+                await reader.readline()
+        writer.write(b"235 2.7.0 Authentication successful\r\n")
+
+    async def _receive(self, reader: asyncio.StreamReader, recipients: int) -> bytes:
+        """Read one DATA section up to its lone "." line, undo dot-stuffing and decide the reply"""
+        lines = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise asyncio.IncompleteReadError(b''.join(lines), None)
+            if line.rstrip(b'\r\n') == b'.':
+                break
+            lines.append(line)
+        data = b''.join(lines)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            self._count(failures_injected=1)
+            return b"451 4.3.0 Injected transient failure\r\n"
+        self._count(messages=1, recipients=recipients, bytes=len(data))
+        if self.store:
+            message = b''.join(line[1:] if line.startswith(b'.') else line for line in lines)
+            with self.lock:
+                self.messages.append(message)
+        return b"250 2.0.0 Queued\r\n"
+
+    def start(self) -> int:
+        """Start serving on a background thread; returns the bound port"""
+        started = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.server = self.loop.run_until_complete(asyncio.start_server(
+                self._handle, self.host, self.port, ssl=self.ssl_context, limit=64 * 1024 * 1024))
+            self.port = self.server.sockets[0].getsockname()[1]
+            started.set()
+            self.loop.run_forever()
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait()
+        self.logger.info(f"SMTP sink listening on {self.host}:{self.port} "
+                         f"({'TLS' if self.ssl_context else 'plain'})")
+        return self.port
+
+    def stop(self, timeout: Optional[float] = 5):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+            self.loop = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink for SocialPhantom delivery testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--tls', action='store_true', help="Implicit TLS with a generated self-signed certificate")
+    parser.add_argument('--certfile', help="Certificate for implicit TLS (with --keyfile)")
+    parser.add_argument('--keyfile')
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds to delay each end-of-DATA reply")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of messages answered with 451")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    certfile, keyfile = args.certfile, args.keyfile
+    if args.tls and not certfile:
+        certfile, keyfile = generate_self_signed_cert(Path('tools/.sink_tls'))
+        print(f"Trust the sink with \"smtp_cafile\": \"{certfile}\" in the email config")
+    sink = SMTPSink(args.host, args.port, certfile, keyfile, args.latency, args.failure_rate)
+    sink.start()
+    try:
+        while True:
+            time.sleep(10)
+            print(sink.metrics())
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()